@@ -9,5 +9,56 @@ class Config:
     HOST = os.getenv("HOST", "127.0.0.1")
     PORT = int(os.getenv("PORT", 8000))
     UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'uploads')
+    WORKER_PROCESSES = int(os.getenv('WORKER_PROCESSES', 2))
+    WORKER_PREFETCH = int(os.getenv('WORKER_PREFETCH', 1))
+    WORKER_DRAIN_TIMEOUT = int(os.getenv('WORKER_DRAIN_TIMEOUT', 600))
+    TASK_VISIBILITY_TIMEOUT = int(os.getenv('TASK_VISIBILITY_TIMEOUT', 300))
+    TASK_MAX_ATTEMPTS = int(os.getenv('TASK_MAX_ATTEMPTS', 3))
+    TASK_RETRY_BACKOFF = int(os.getenv('TASK_RETRY_BACKOFF', 30))
+    TASK_RETRY_BACKOFF_MAX = int(os.getenv('TASK_RETRY_BACKOFF_MAX', 900))
+    PROCESS_EVENTS_CHANNEL = os.getenv('PROCESS_EVENTS_CHANNEL', 'process:events')
+    PROCESS_EVENTS_HEARTBEAT = int(os.getenv('PROCESS_EVENTS_HEARTBEAT', 15))
+    UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))
+    UPLOAD_STALL_TIMEOUT = int(os.getenv('UPLOAD_STALL_TIMEOUT', 300))
+    CSV_BLOCK_SIZE = int(os.getenv('CSV_BLOCK_SIZE', 1024 * 1024))
+    CSV_NEWLINES_IN_VALUES = os.getenv('CSV_NEWLINES_IN_VALUES', 'true').lower() in ('1', 'true', 'yes')
+    INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', 1000))
+    INGEST_MAX_INFLIGHT_BATCHES = int(os.getenv('INGEST_MAX_INFLIGHT_BATCHES', 4))
+    INGEST_WRITERS = int(os.getenv('INGEST_WRITERS', 4))
+    INGEST_PROCESSES = int(os.getenv('INGEST_PROCESSES', os.cpu_count() or 1))
+    INGEST_PARALLEL_MIN_BYTES = int(os.getenv('INGEST_PARALLEL_MIN_BYTES', 64 * 1024 * 1024))
+    INGEST_RANGE_WRITERS = int(os.getenv('INGEST_RANGE_WRITERS', 2))
+    INGEST_ORDERED_INSERTS = os.getenv('INGEST_ORDERED_INSERTS', 'false').lower() in ('1', 'true', 'yes')
+    INGEST_WRITE_CONCERN_W = os.getenv('INGEST_WRITE_CONCERN_W')  # e.g. 1, majority; unset uses the server default
+    INGEST_WRITE_CONCERN_J = os.getenv('INGEST_WRITE_CONCERN_J')  # true/false; unset uses the server default
+    INGEST_MAX_BATCH_DOCS = int(os.getenv('INGEST_MAX_BATCH_DOCS', 1000))
+    INGEST_MAX_BATCH_BYTES = int(os.getenv('INGEST_MAX_BATCH_BYTES', 8 * 1024 * 1024))
+    INGEST_CHECKPOINT_INTERVAL = float(os.getenv('INGEST_CHECKPOINT_INTERVAL', 1.0))
+    INGEST_PROGRESS_INTERVAL = float(os.getenv('INGEST_PROGRESS_INTERVAL', 1.0))
     CACHE_TYPE = 'RedisCache'
+    MOVIES_CACHE_TTL = int(os.getenv('MOVIES_CACHE_TTL', 300))
+    MOVIES_CACHE_STALE_TTL = int(os.getenv('MOVIES_CACHE_STALE_TTL', 30))
+    CACHE_LOCK_TIMEOUT = int(os.getenv('CACHE_LOCK_TIMEOUT', 10))
+    CACHE_LOCK_WAIT = float(os.getenv('CACHE_LOCK_WAIT', 2))
+    CACHE_REDIS_ENABLED = os.getenv('CACHE_REDIS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    CACHE_LOCAL_ENABLED = os.getenv('CACHE_LOCAL_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    LOCAL_CACHE_MAX_ENTRIES = int(os.getenv('LOCAL_CACHE_MAX_ENTRIES', 1024))
+    LOCAL_CACHE_MAX_BYTES = int(os.getenv('LOCAL_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    LOCAL_CACHE_TTL = int(os.getenv('LOCAL_CACHE_TTL', 60))
+    CACHE_INVALIDATION_CHANNEL = os.getenv('CACHE_INVALIDATION_CHANNEL', 'movies:invalidate')
+    CACHE_GENERATION_REFRESH = float(os.getenv('CACHE_GENERATION_REFRESH', 1))
+    CACHE_WARM_ENABLED = os.getenv('CACHE_WARM_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    CACHE_WARM_PAGES = int(os.getenv('CACHE_WARM_PAGES', 3))
+    CACHE_WARM_LIMIT = int(os.getenv('CACHE_WARM_LIMIT', 10))
+    CACHE_WARM_MAX_KEYS = int(os.getenv('CACHE_WARM_MAX_KEYS', 5000))
+    CACHE_WARM_MAX_SECONDS = float(os.getenv('CACHE_WARM_MAX_SECONDS', 60))
+    CACHE_WARM_FLUSH_SIZE = int(os.getenv('CACHE_WARM_FLUSH_SIZE', 500))
+    MOVIES_BATCH_MAX_QUERIES = int(os.getenv('MOVIES_BATCH_MAX_QUERIES', 50))
+    MOVIES_BATCH_WORKERS = int(os.getenv('MOVIES_BATCH_WORKERS', 8))
+    STATS_RUNTIME_BUCKET = int(os.getenv('STATS_RUNTIME_BUCKET', 30))
+    STATS_RUNTIME_MAX = int(os.getenv('STATS_RUNTIME_MAX', 240))
+    EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 10000))
+    MOVIES_COUNT_MODE = os.getenv('MOVIES_COUNT_MODE', 'approx')  # exact, approx or none
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+    METRICS_WORKER_PORT = int(os.getenv('METRICS_WORKER_PORT', 9100))
     DEBUG = bool(os.getenv("DEBUG", False))
@@ -0,0 +1,22 @@
+import time
+from flask import Response, g, request
+from app.utils.metrics import CONTENT_TYPE, HTTP_REQUEST_SECONDS, REGISTRY
+
+def get_metrics():
+    """Expose the API process's metrics in the Prometheus text format"""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+def start_request_timer():
+    g.metrics_started = time.perf_counter()
+
+def observe_request(response):
+    """Record the request's duration against its route, not its raw path"""
+    started = g.pop('metrics_started', None)
+    if started is not None and request.endpoint != 'metrics.api_get_metrics':
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            endpoint=request.endpoint or 'unmatched',
+            method=request.method,
+            status=response.status_code
+        )
+    return response
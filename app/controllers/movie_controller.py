@@ -1,10 +1,12 @@
-from flask import jsonify, request
-from app.models.movie import Movie
-from app.services.csv_service import save_uploaded_file
-from app.services.cache_service import get_cached_movies, cache_movies_response
-from app.zmq_instance import get_push_socket
-from app.tasks import serialize_task
+from flask import Response, current_app, jsonify, request, stream_with_context
+from app.models.movie import Movie, MOVIES_COUNT_MODES
+from app.services.csv_service import save_uploaded_file, INGEST_MODES
+from app.database import get_db
+from app.services.export_service import EXPORT_FORMATS, stream_movies_export
+from app.services.cache_service import get_or_compute_movies, get_or_compute_many_movies
+from app.tasks import enqueue_task
 from app.utils.error_handler import APIError, error_response
+from app.utils.encoding import encoded_response, DOCUMENT_FORMATS
 
 def upload_csv():
     """Handle CSV file upload and processing"""
@@ -19,11 +21,12 @@ def upload_csv():
         if not file.filename.endswith('.csv'):
             raise APIError("File must be a CSV", 400)
         
-        file_path = save_uploaded_file(file)
-        task_data, task_id = serialize_task('process_csv_task', file_path=file_path)
+        mode = request.form.get('mode', 'append')
+        if mode not in INGEST_MODES:
+            raise APIError(f"Mode must be one of: {', '.join(INGEST_MODES)}", 400)
         
-        socket = get_push_socket()
-        socket.send_json(task_data)
+        file_path = save_uploaded_file(file)
+        task_id = enqueue_task('process_csv_task', file_path=file_path, mode=mode)
         
         return jsonify({
             "message": "File uploaded successfully and queued for processing",
@@ -37,31 +40,145 @@ def upload_csv():
 def get_movies():
     """Get movies with pagination, filtering, and sorting"""
     try:
-        page = request.args.get('page', 1, type=int)
-        limit = request.args.get('limit', 10, type=int)
-        year = request.args.get('year')
-        language = request.args.get('language')
-        sort_by = request.args.get('sort_by', 'release_date')
-        order = request.args.get('order', 1, type=int)
+        params = _validate_movies_query(
+            request.args.get('page', 1, type=int),
+            request.args.get('limit', 10, type=int),
+            request.args.get('year'),
+            request.args.get('language'),
+            request.args.get('sort_by', 'release_date'),
+            request.args.get('order', 1, type=int),
+            request.args.get('cursor'),
+            request.args.get('count', current_app.config['MOVIES_COUNT_MODE']),
+            request.args.get('fields')
+        )
+        
+        result = get_or_compute_movies(lambda: Movie.get_movies(*params), *params)
+        
+        return encoded_response(result)
+    except APIError as e:
+        return error_response(e.message, e.status_code)
+    except Exception as e:
+        return error_response("Internal Server Error: " + str(e), 500)
+
+def get_movies_batch():
+    """Run several movies queries in one request"""
+    try:
+        body = request.get_json(silent=True)
+        queries = body.get('queries') if isinstance(body, dict) else None
+        if not isinstance(queries, list) or not queries:
+            raise APIError("Body must be a JSON object with a non-empty 'queries' list", 400)
         
-        if page < 1:
-            raise APIError("Page number must be 1 or greater", 400)
-        if limit < 1 or limit > 100:
-            raise APIError("Limit must be between 1 and 100", 400)
-        if sort_by not in ['release_date', 'rating', 'title']:
-            raise APIError("Invalid sort_by value", 400)
-        if order not in [1, -1]:
-            raise APIError("Order must be 1 (ascending) or -1 (descending)", 400)
+        max_queries = current_app.config['MOVIES_BATCH_MAX_QUERIES']
+        if len(queries) > max_queries:
+            raise APIError(f"At most {max_queries} queries per batch", 400)
         
-        cached_response = get_cached_movies(page, limit, year, language, sort_by, order)
-        if cached_response:
-            return jsonify(cached_response), 200
+        params = []
+        for index, spec in enumerate(queries):
+            try:
+                params.append(_parse_movies_spec(spec))
+            except APIError as e:
+                raise APIError(f"queries[{index}]: {e.message}", 400)
         
-        result = Movie.get_movies(page, limit, year, language, sort_by, order)
-        cache_movies_response(result, page, limit, year, language, sort_by, order)
+        db = get_db()
+        results = get_or_compute_many_movies(lambda *query: Movie.get_movies(*query, db=db), params)
         
-        return jsonify(result), 200
+        return encoded_response({"results": results}, formats=DOCUMENT_FORMATS)
     except APIError as e:
         return error_response(e.message, e.status_code)
     except Exception as e:
         return error_response("Internal Server Error: " + str(e), 500)
+
+def export_movies():
+    """Stream every movie matching the filters as NDJSON, CSV, Arrow IPC or Parquet"""
+    try:
+        export_format = request.args.get('format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            raise APIError(f"Format must be one of: {', '.join(EXPORT_FORMATS)}", 400)
+        year = request.args.get('year')
+        if year:
+            try:
+                int(year)
+            except ValueError:
+                raise APIError("Year must be an integer", 400)
+        fields = _parse_fields(request.args.get('fields'))
+        
+        chunks = stream_movies_export(
+            export_format, year, request.args.get('language'), fields,
+            current_app.config['EXPORT_BATCH_SIZE']
+        )
+        mimetype, extension = EXPORT_FORMATS[export_format]
+        return Response(
+            stream_with_context(chunks),
+            mimetype=mimetype,
+            headers={"Content-Disposition": f"attachment; filename=movies.{extension}"}
+        )
+    except APIError as e:
+        return error_response(e.message, e.status_code)
+    except Exception as e:
+        return error_response("Internal Server Error: " + str(e), 500)
+
+def _parse_movies_spec(spec):
+    """Validate one query of a batch, given as a JSON object of /movies parameters"""
+    if not isinstance(spec, dict):
+        raise APIError("Query must be an object", 400)
+    try:
+        page = int(spec.get('page', 1))
+        limit = int(spec.get('limit', 10))
+        order = int(spec.get('order', 1))
+    except (TypeError, ValueError):
+        raise APIError("page, limit and order must be integers", 400)
+    
+    # Years arrive as strings on GET /movies; keep cache keys identical
+    year = spec.get('year')
+    if year is not None:
+        year = str(year)
+    
+    return _validate_movies_query(
+        page, limit, year, spec.get('language'), spec.get('sort_by', 'release_date'), order,
+        spec.get('cursor'), spec.get('count', current_app.config['MOVIES_COUNT_MODE']), spec.get('fields')
+    )
+
+def _validate_movies_query(page, limit, year, language, sort_by, order, cursor, count, fields=None):
+    """
+    Check /movies parameters and return them as Movie.get_movies arguments
+    
+    Raises:
+        APIError: If a parameter is out of range
+    """
+    if page < 1:
+        raise APIError("Page number must be 1 or greater", 400)
+    if limit < 1 or limit > 100:
+        raise APIError("Limit must be between 1 and 100", 400)
+    if sort_by not in ['release_date', 'rating', 'title']:
+        raise APIError("Invalid sort_by value", 400)
+    if order not in [1, -1]:
+        raise APIError("Order must be 1 (ascending) or -1 (descending)", 400)
+    if count not in MOVIES_COUNT_MODES:
+        raise APIError(f"Count must be one of: {', '.join(MOVIES_COUNT_MODES)}", 400)
+    if cursor:
+        try:
+            Movie.decode_cursor(cursor, sort_by, order)
+        except ValueError as e:
+            raise APIError(str(e), 400)
+        page = None
+    
+    return page, limit, year, language, sort_by, order, cursor, count, _parse_fields(fields)
+
+def _parse_fields(fields):
+    """
+    Normalise a fields parameter (comma-separated string or list)
+    
+    Returned as a sorted tuple so equivalent projections share a cache key,
+    or None for all fields.
+    """
+    if isinstance(fields, str):
+        fields = fields.split(',')
+    if not fields:
+        return None
+    if not isinstance(fields, list):
+        raise APIError("fields must be a comma-separated string or a list", 400)
+    fields = tuple(sorted({str(field).strip() for field in fields} - {'', '_id'}))
+    unknown = [field for field in fields if field not in Movie.PROJECTABLE_FIELDS]
+    if unknown:
+        raise APIError(f"Unknown fields: {', '.join(unknown)}", 400)
+    return fields or None
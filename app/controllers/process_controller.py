@@ -1,5 +1,7 @@
-from flask import jsonify
+from flask import Response, jsonify, stream_with_context
 from app.models.process import Process
+from app.services.progress_service import stream_process_events
+from app.tasks import resume_task
 from app.utils.error_handler import APIError, error_response
 
 def get_process_status(task_id):
@@ -20,6 +22,24 @@ def get_process_status(task_id):
     except Exception as e:
         return error_response(f"Failed to retrieve process: {str(e)}", 500)
 
+def stream_process_status(task_id):
+    """Push a process's progress and status changes as Server-Sent Events"""
+    try:
+        if not Process.get_process_by_task_id(task_id):
+            raise APIError("Process not found", 404)
+
+        return Response(
+            stream_with_context(stream_process_events(task_id)),
+            mimetype="text/event-stream",
+            # Keep proxies from buffering the stream
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    except APIError as e:
+        return error_response(e.message, e.status_code)
+    except Exception as e:
+        return error_response(f"Failed to stream process events: {str(e)}", 500)
+
 def get_all_processes():
     """Retrieve the status of all processes"""
     try:
@@ -32,3 +52,23 @@ def get_all_processes():
 
     except Exception as e:
         return error_response(f"Failed to retrieve processes: {str(e)}", 500)
+
+def resume_process(task_id):
+    """Queue a failed task again, continuing from its last checkpoint"""
+    try:
+        process = resume_task(task_id)
+        if not process:
+            raise APIError("Process not found", 404)
+
+        return jsonify({
+            "message": "Task queued to resume from its last checkpoint",
+            "task_id": task_id,
+            "status": process["status"]
+        }), 202
+
+    except ValueError as e:
+        return error_response(str(e), 409)
+    except APIError as e:
+        return error_response(e.message, e.status_code)
+    except Exception as e:
+        return error_response(f"Failed to resume process: {str(e)}", 500)
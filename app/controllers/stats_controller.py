@@ -0,0 +1,38 @@
+from flask import jsonify, request
+from app.models.movie_stats import MovieStats
+from app.utils.error_handler import APIError, error_response
+
+def get_stats():
+    """Stats over all movies matching optional year/language filters"""
+    try:
+        year = _parse_year(request.args.get('year'))
+        return jsonify(MovieStats.summary(year, request.args.get('language'))), 200
+    except APIError as e:
+        return error_response(e.message, e.status_code)
+    except Exception as e:
+        return error_response(f"Failed to retrieve stats: {str(e)}", 500)
+
+def get_stats_by_year():
+    """Stats for each year, optionally for one language"""
+    try:
+        return jsonify(MovieStats.by_year(request.args.get('language'))), 200
+    except Exception as e:
+        return error_response(f"Failed to retrieve stats: {str(e)}", 500)
+
+def get_stats_by_language():
+    """Stats for each language, optionally for one year"""
+    try:
+        year = _parse_year(request.args.get('year'))
+        return jsonify(MovieStats.by_language(year)), 200
+    except APIError as e:
+        return error_response(e.message, e.status_code)
+    except Exception as e:
+        return error_response(f"Failed to retrieve stats: {str(e)}", 500)
+
+def _parse_year(year):
+    if year:
+        try:
+            int(year)
+        except ValueError:
+            raise APIError("Year must be an integer", 400)
+    return year
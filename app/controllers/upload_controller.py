@@ -0,0 +1,118 @@
+from flask import jsonify, request
+from app.models.upload import Upload
+from app.services.csv_service import INGEST_MODES
+from app.services.upload_service import create_upload, append_upload, abandon_upload
+from app.tasks import enqueue_task
+from app.utils.error_handler import APIError, error_response
+
+def stream_upload():
+    """Stream a raw (optionally compressed) CSV request body to disk and process it as it arrives"""
+    try:
+        mode = _parse_mode(request.args.get('mode', 'append'))
+        filename = _parse_filename(request.args.get('filename'))
+        
+        upload = create_upload(mode, filename)
+        try:
+            upload = append_upload(
+                upload, request.stream, 0, request.headers.get('Content-Encoding'),
+                complete=True, enqueue=_enqueue(mode)
+            )
+        except Exception:
+            abandon_upload(upload["upload_id"])
+            raise
+        
+        return jsonify({
+            "message": "File uploaded successfully and queued for processing",
+            "task_id": upload["task_id"],
+            "upload_id": upload["upload_id"],
+            "bytes": upload["offset"]
+        }), 202
+    except ValueError as e:
+        return error_response(str(e), 400)
+    except APIError as e:
+        return error_response(e.message, e.status_code)
+    except Exception as e:
+        return error_response("Internal Server Error: " + str(e), 500)
+
+def start_upload():
+    """Start a resumable upload"""
+    try:
+        body = request.get_json(silent=True) or request.form
+        mode = _parse_mode(body.get('mode', 'append'))
+        filename = _parse_filename(body.get('filename'))
+        
+        upload = create_upload(mode, filename)
+        return jsonify(_upload_response(upload)), 201
+    except APIError as e:
+        return error_response(e.message, e.status_code)
+    except Exception as e:
+        return error_response("Internal Server Error: " + str(e), 500)
+
+def append_to_upload(upload_id):
+    """Append the request body to a resumable upload at Upload-Offset"""
+    try:
+        upload = Upload.get_upload(upload_id)
+        if not upload:
+            raise APIError("Upload not found", 404)
+        if upload["status"] != "receiving":
+            raise APIError("Upload is already complete", 409)
+        
+        try:
+            offset = int(request.headers['Upload-Offset'])
+        except (KeyError, ValueError):
+            raise APIError("Upload-Offset header is required", 400)
+        if offset != upload["offset"]:
+            return jsonify({"error": "Upload-Offset does not match", "offset": upload["offset"]}), 409
+        complete = request.headers.get('Upload-Complete', '').lower() in ('1', 'true', 'yes')
+        
+        try:
+            upload = append_upload(
+                upload, request.stream, offset, request.headers.get('Content-Encoding'),
+                complete=complete, enqueue=_enqueue(upload["mode"])
+            )
+        except FileNotFoundError:
+            raise APIError("Upload is no longer available", 409)
+        return jsonify(_upload_response(upload)), 200
+    except ValueError as e:
+        return error_response(str(e), 400)
+    except APIError as e:
+        return error_response(e.message, e.status_code)
+    except Exception as e:
+        return error_response("Internal Server Error: " + str(e), 500)
+
+def get_upload_status(upload_id):
+    """Current offset and status of a resumable upload"""
+    try:
+        upload = Upload.get_upload(upload_id)
+        if not upload:
+            raise APIError("Upload not found", 404)
+        return jsonify(_upload_response(upload)), 200
+    except APIError as e:
+        return error_response(e.message, e.status_code)
+    except Exception as e:
+        return error_response(f"Failed to retrieve upload: {str(e)}", 500)
+
+def _enqueue(mode):
+    """Queue processing of a file that is still being uploaded"""
+    def enqueue(file_path):
+        return enqueue_task('process_csv_task', file_path=file_path, mode=mode, streaming=True)
+    return enqueue
+
+def _parse_mode(mode):
+    if mode not in INGEST_MODES:
+        raise APIError(f"Mode must be one of: {', '.join(INGEST_MODES)}", 400)
+    return mode
+
+def _parse_filename(filename):
+    if filename and not filename.endswith('.csv'):
+        raise APIError("File must be a CSV", 400)
+    return filename
+
+def _upload_response(upload):
+    return {
+        "upload_id": upload["upload_id"],
+        "offset": upload["offset"],
+        "status": upload["status"],
+        "mode": upload["mode"],
+        "task_id": upload["task_id"]
+    }
@@ -1,7 +1,10 @@
+import redis
 from pymongo import MongoClient
-from flask import current_app, g
+from flask import current_app, g, has_app_context
 from app.config import Config 
 
+_redis_client = None
+
 def get_db():
     """
     Get database connection from Flask g object or create a new one
@@ -12,14 +15,29 @@ def get_db():
     
     return g.db
 
-def get_db_connection():
+def get_db_connection(**client_options):
     """
     Get a database connection (for use outside Flask context)
+    
+    Extra keyword arguments are passed to MongoClient, e.g. maxPoolSize
     """
-    mongo_client = MongoClient(Config.MONGO_URI)  
+    mongo_client = MongoClient(Config.MONGO_URI, **client_options)  
     db = mongo_client[Config.MONGO_DB]  
     return mongo_client, db
 
+def get_redis_client():
+    """
+    Get the process-wide Redis client, for use inside or outside Flask context
+    
+    Used for cache generations, invalidations, refresh locks and progress
+    events; flask-caching keeps its own connection.
+    """
+    global _redis_client
+    if _redis_client is None:
+        url = current_app.config['REDIS_URL'] if has_app_context() else Config.REDIS_URL
+        _redis_client = redis.StrictRedis.from_url(url)
+    return _redis_client
+
 def init_db(app):
     """
     Initialize database connection with the Flask app
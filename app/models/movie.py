@@ -1,66 +1,473 @@
+import base64
+import hashlib
+import json
+from itertools import combinations
+import bson
+from bson import ObjectId
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
 from app.database import get_db
+from app.models.movie_count import MovieCount
+from app.utils.metrics import MOVIES_STAGE_SECONDS
+
+# How get_movies computes total_docs
+MOVIES_COUNT_MODES = ("exact", "approx", "none")
+
+# Rounds bulk_upsert retries rows another writer changed concurrently
+UPSERT_ATTEMPTS = 3
 
 class Movie:
+    COLLECTION = "movies"
+    # Fields identifying the same movie across uploads
+    DEDUP_FIELDS = ("title", "release_date", "original_title")
+    # Bookkeeping fields added by upsert loads, hidden from API responses
+    INTERNAL_FIELDS = ("dedup_key", "content_hash")
+    # Fields movie counts and stats are computed from
+    SUMMARY_FIELDS = ("year", "original_language", "vote_average", "revenue", "runtime")
+    # Equality filters get_movies can apply
+    FILTER_FIELDS = ("year", "original_language")
+    # Single-field indexes superseded by the compound query shape indexes
+    REDUNDANT_INDEXES = ("release_date_1", "vote_average_-1", "original_language_1", "year_1")
+    # Fields a get_movies response can be narrowed to; _id is always returned
+    PROJECTABLE_FIELDS = (
+        "homepage", "original_language", "original_title", "overview", "release_date", "year",
+        "revenue", "runtime", "status", "title", "vote_average", "vote_count",
+        "production_company_id", "genre_id", "languages"
+    )
+    # API sort_by values and the document fields they sort on
+    SORT_FIELDS = {"release_date": "release_date", "rating": "vote_average", "title": "title"}
+    
     @classmethod
-    def get_collection(cls):
-        """Get the MongoDB collection for movies"""
-        db = get_db()
-        return db.movies
+    def get_collection(cls, db=None, name=None):
+        """Get the MongoDB collection for movies, or a staging collection by name"""
+        if db is None:
+            db = get_db()
+        return db[name or cls.COLLECTION]
     
     @classmethod
-    def create_indexes(cls):
-        """Create necessary indexes for efficient querying"""
-        collection = cls.get_collection()
-        collection.create_index([("release_date", 1)])
-        collection.create_index([("vote_average", -1)])
+    def get_staging_collection_name(cls, task_id):
+        """Name of the collection a bulk load for task_id is staged in"""
+        return f"{cls.COLLECTION}_staging_{task_id}"
+    
+    @classmethod
+    def swap_in(cls, staging_name, db=None):
+        """
+        Atomically replace the movies collection with a staging collection
+        
+        Readers keep seeing the previous dataset until renameCollection
+        completes, and the old collection is dropped in the same step.
+        """
+        cls.get_collection(db, staging_name).rename(cls.COLLECTION, dropTarget=True)
+    
+    @classmethod
+    def drop_staging(cls, staging_name, db=None):
+        """Drop a staging collection left by an aborted bulk load"""
+        cls.get_collection(db, staging_name).drop()
+    
+    @classmethod
+    def create_indexes(cls, name=None, db=None):
+        """
+        Create necessary indexes for efficient querying
+        
+        One compound index per query shape get_movies can emit, ordered by
+        the ESR rule: equality filters, then the sort field, then _id for
+        the keyset range. Legacy single-field indexes that are now prefixes
+        of a compound index are dropped.
+        """
+        collection = cls.get_collection(db, name)
+        for keys in cls.index_specs():
+            collection.create_index(keys)
         collection.create_index([("revenue", -1)])
-        collection.create_index([("original_language", 1)])
-        collection.create_index([("year", 1)])
+        # Only documents loaded in upsert mode carry a dedup key
+        collection.create_index(
+            [("dedup_key", 1)],
+            unique=True,
+            partialFilterExpression={"dedup_key": {"$exists": True}}
+        )
+        
+        existing = collection.index_information()
+        for index_name in cls.REDUNDANT_INDEXES:
+            if index_name in existing:
+                collection.drop_index(index_name)
+    
+    @classmethod
+    def query_shapes(cls):
+        """Every (equality filter fields, sort field) combination get_movies can emit"""
+        return [
+            (filters, sort_field)
+            for size in range(len(cls.FILTER_FIELDS) + 1)
+            for filters in combinations(cls.FILTER_FIELDS, size)
+            for sort_field in cls.SORT_FIELDS.values()
+        ]
     
     @classmethod
-    def bulk_insert(cls, movies):
+    def index_specs(cls):
+        """Index keys serving each query shape without an in-memory sort"""
+        return [
+            [(field, 1) for field in filters] + [(sort_field, 1), ("_id", 1)]
+            for filters, sort_field in cls.query_shapes()
+        ]
+    
+    @classmethod
+    def find_blocking_sorts(cls, db=None):
+        """
+        Explain every query shape and report those that sort in memory
+        
+        Both the page (skip) and the keyset (cursor) form of each shape are
+        checked, in both sort directions.
+        
+        Returns:
+            list: Descriptions of the shapes whose winning plan has a SORT stage
+        """
+        collection = cls.get_collection(db)
+        sample_values = {"year": 2000, "original_language": "en"}
+        sort_samples = {"release_date": "2000-01-01T00:00:00", "vote_average": 5.0, "title": "M"}
+        
+        blocking = []
+        for filters, sort_field in cls.query_shapes():
+            query = {field: sample_values[field] for field in filters}
+            for direction in (1, -1):
+                sort = [(sort_field, direction), ("_id", direction)]
+                keyset = _keyset_predicate(sort_field, direction, sort_samples[sort_field], ObjectId(), query)
+                for form, find_query in (("page", query), ("cursor", keyset)):
+                    plan = collection.find(find_query).sort(sort).skip(10).limit(10).explain()
+                    if _has_stage(plan.get("queryPlanner", {}).get("winningPlan", {}), "SORT"):
+                        blocking.append(f"{form}: filter={list(filters)} sort={sort_field} order={direction}")
+        return blocking
+    
+    @classmethod
+    def bulk_insert(cls, movies, db=None):
         """Insert multiple movie documents"""
         if not movies:
             return 0
         
-        collection = cls.get_collection()
+        collection = cls.get_collection(db)
         result = collection.insert_many(movies)
         return len(result.inserted_ids)
     
     @classmethod
-    def get_movies(cls, page=1, limit=10, year=None, language=None, sort_by="release_date", order=1):
-        """Get movies with pagination, filtering and sorting"""
-        collection = cls.get_collection()
+    def bulk_load(cls, movies, ordered=False, write_concern=None, max_batch_docs=None, max_batch_bytes=None, db=None, name=None):
+        """
+        Insert movie documents in bulk-load mode
+        
+        Documents are sent in sub-batches capped by count and encoded size.
+        Per-document failures are counted instead of raised, and with
+        ordered=False the rest of a sub-batch is still inserted.
+        
+        Args:
+            movies: List of movie documents
+            ordered: Stop each sub-batch at its first failing document
+            write_concern: pymongo WriteConcern to insert with, or None for the collection default
+            max_batch_docs: Maximum documents per insert_many call
+            max_batch_bytes: Maximum BSON bytes per insert_many call
+            db: Database to use instead of the request database
+            name: Staging collection to insert into instead of movies
+            
+        Returns:
+            dict: Number of documents inserted and failed, how many of the
+            failures were duplicate keys, and the list of inserted_documents
+        """
+        result = {"inserted": 0, "failed": 0, "duplicates": 0, "inserted_documents": []}
+        if not movies:
+            return result
+        
+        collection = cls.get_collection(db, name)
+        if write_concern is not None:
+            collection = collection.with_options(write_concern=write_concern)
+        
+        for chunk in _chunk_documents(movies, max_batch_docs, max_batch_bytes):
+            try:
+                collection.insert_many(chunk, ordered=ordered)
+                inserted_documents = chunk
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                failed = {error["index"] for error in errors}
+                result["duplicates"] += sum(1 for error in errors if error.get("code") == 11000)
+                if ordered and failed:
+                    # Nothing after the first error was attempted
+                    failed = set(range(min(failed), len(chunk)))
+                inserted_documents = [doc for index, doc in enumerate(chunk) if index not in failed]
+                result["failed"] += len(failed)
+            result["inserted"] += len(inserted_documents)
+            result["inserted_documents"].extend(inserted_documents)
+        return result
+    
+    @classmethod
+    def bulk_upsert(cls, movies, write_concern=None, db=None, name=None):
+        """
+        Upsert movie documents keyed on a hash of DEDUP_FIELDS
+        
+        Existing keys, content hashes and SUMMARY_FIELDS are fetched in one
+        indexed query, so rows identical to what is stored are skipped
+        without a write. New rows are inserted and changed rows updated in a
+        single unordered bulk_write. Updates are conditional on the content
+        hash that was read, so the version each one replaced is known; rows
+        another writer inserted or changed in the meantime are retried.
+        
+        Args:
+            movies: List of movie documents
+            write_concern: pymongo WriteConcern to write with, or None for the collection default
+            db: Database to use instead of the request database
+            name: Staging collection to write into instead of movies
+            
+        Returns:
+            dict: Number of documents inserted, updated, skipped and failed,
+            the list of newly inserted_documents, the updated_documents with
+            the previous_documents they replaced (SUMMARY_FIELDS only), and
+            how many updates are unattributed: a concurrent writer stored
+            the same content, so which of them replaced what is unknown
+        """
+        result = {
+            "inserted": 0, "updated": 0, "skipped": 0, "failed": 0, "unattributed": 0,
+            "inserted_documents": [], "updated_documents": [], "previous_documents": []
+        }
+        if not movies:
+            return result
+        
+        # Later rows win when a batch repeats a key
+        by_key = {}
+        for movie in movies:
+            movie["dedup_key"] = _hash_values([movie.get(field) for field in cls.DEDUP_FIELDS])
+            movie["content_hash"] = _hash_values(sorted((k, v) for k, v in movie.items() if k not in cls.INTERNAL_FIELDS))
+            by_key[movie["dedup_key"]] = movie
+        result["skipped"] += len(movies) - len(by_key)
+        
+        collection = cls.get_collection(db, name)
+        if write_concern is not None:
+            collection = collection.with_options(write_concern=write_concern)
         
+        for _ in range(UPSERT_ATTEMPTS):
+            by_key = cls._upsert_round(collection, by_key, result)
+            if not by_key:
+                break
+        result["failed"] += len(by_key)
+        return result
+    
+    @classmethod
+    def _upsert_round(cls, collection, by_key, result):
+        """Write one round of bulk_upsert, returning the rows to retry by key"""
+        projection = dict.fromkeys(cls.INTERNAL_FIELDS + cls.SUMMARY_FIELDS, 1)
+        projection["_id"] = 0
+        stored = {doc["dedup_key"]: doc for doc in collection.find({"dedup_key": {"$in": list(by_key)}}, projection)}
+        
+        inserts = []
+        updates = []
+        for key, movie in by_key.items():
+            previous = stored.get(key)
+            if previous is None:
+                inserts.append(movie)
+            elif previous.get("content_hash") == movie["content_hash"]:
+                result["skipped"] += 1
+            else:
+                updates.append((movie, previous))
+        if not inserts and not updates:
+            return {}
+        
+        # InsertOne sets _id on the document it is given; a row retried as an update must not carry one
+        operations = [InsertOne(dict(movie)) for movie in inserts] + [
+            UpdateOne({"dedup_key": movie["dedup_key"], "content_hash": previous.get("content_hash")}, {"$set": movie})
+            for movie, previous in updates
+        ]
+        errors = []
+        try:
+            matched = collection.bulk_write(operations, ordered=False).matched_count
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            matched = e.details.get("nMatched", 0)
+        
+        retry = {}
+        failed = set()
+        for error in errors:
+            failed.add(error["index"])
+            movie = inserts[error["index"]] if error["index"] < len(inserts) else None
+            if movie is not None and error.get("code") == 11000:
+                # Another writer inserted the key since it was read; update it instead
+                retry[movie["dedup_key"]] = movie
+            else:
+                result["failed"] += 1
+        inserted = [movie for index, movie in enumerate(inserts) if index not in failed]
+        result["inserted"] += len(inserted)
+        result["inserted_documents"].extend(inserted)
+        
+        updates = [update for index, update in enumerate(updates, len(inserts)) if index not in failed]
+        if matched < len(updates):
+            # Another writer changed some of these documents first; the ones
+            # not carrying this row's content hash are retried
+            keys = [movie["dedup_key"] for movie, _ in updates]
+            current = {
+                doc["dedup_key"]: doc.get("content_hash")
+                for doc in collection.find({"dedup_key": {"$in": keys}}, {"_id": 0, "dedup_key": 1, "content_hash": 1})
+            }
+            applied = []
+            for movie, previous in updates:
+                if current.get(movie["dedup_key"]) == movie["content_hash"]:
+                    applied.append((movie, previous))
+                else:
+                    retry[movie["dedup_key"]] = movie
+            if len(applied) != matched:
+                result["unattributed"] += len(applied)
+            updates = applied
+        result["updated"] += len(updates)
+        result["updated_documents"].extend(movie for movie, _ in updates)
+        result["previous_documents"].extend(previous for _, previous in updates)
+        return retry
+    
+    @classmethod
+    def filter_query(cls, year=None, language=None):
+        """MongoDB filter for the year/language parameters of /movies"""
         query = {}
         if year:
             query["year"] = int(year)
         if language:
             query["original_language"] = language
+        return query
+    
+    @classmethod
+    def iter_movie_batches(cls, year=None, language=None, fields=None, batch_size=10000, db=None):
+        """
+        Yield every movie matching the filters, batch_size documents at a time
+        
+        Reads with a single cursor in natural order and a matching network
+        batch size, so memory stays bounded by one batch however many
+        movies match.
+        """
+        collection = cls.get_collection(db)
+        if fields:
+            projection = dict.fromkeys(fields, 1)
+        else:
+            projection = {field: 0 for field in cls.INTERNAL_FIELDS}
+        
+        batch = []
+        for movie in collection.find(cls.filter_query(year, language), projection, batch_size=batch_size):
+            movie['_id'] = str(movie['_id'])
+            batch.append(movie)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    @classmethod
+    def get_movies(cls, page=1, limit=10, year=None, language=None, sort_by="release_date", order=1, cursor=None, count="exact", fields=None, db=None):
+        """
+        Get movies with pagination, filtering and sorting
+        
+        With a cursor from a previous response the page is resumed with a
+        range predicate on (sort field, _id) instead of skip, so deep pages
+        cost the same as the first one.
+        
+        count selects how total_docs is computed: "exact" runs
+        count_documents, "approx" reads the pre-aggregated MovieCount totals
+        (estimated_document_count when unfiltered) and "none" skips it.
+        
+        fields limits each movie to those PROJECTABLE_FIELDS (plus _id);
+        the projection is applied by MongoDB, so unrequested fields such as
+        overview are never read off the wire.
+        
+        Pass db to run outside the request's app context, e.g. from a
+        thread pool.
+        """
+        collection = cls.get_collection(db)
+        query = cls.filter_query(year, language)
         
-        sort_field = sort_by
+        sort_field = cls.SORT_FIELDS.get(sort_by, sort_by)
         sort_direction = int(order)  
         
-        skip = (page - 1) * limit
+        with MOVIES_STAGE_SECONDS.time(stage="count"):
+            total_docs = cls.count_movies(query, count, year, language, collection)
+        total_pages = (total_docs + limit - 1) // limit if total_docs is not None else None
         
-        cursor = collection.find(query).sort(sort_field, sort_direction).skip(skip).limit(limit)
+        # _id breaks ties so every page boundary is a unique position
+        sort = [(sort_field, sort_direction), ("_id", sort_direction)]
+        if fields:
+            # The sort field is read for next_cursor even when not requested
+            projection = dict.fromkeys(fields, 1)
+            projection[sort_field] = 1
+            drop_sort_field = sort_field not in fields
+        else:
+            projection = {field: 0 for field in cls.INTERNAL_FIELDS}
+            drop_sort_field = False
         
-        total_docs = collection.count_documents(query)
-        total_pages = (total_docs + limit - 1) // limit  
+        if cursor:
+            last_value, last_id = cls.decode_cursor(cursor, sort_by, sort_direction)
+            keyset = _keyset_predicate(sort_field, sort_direction, last_value, last_id, query)
+            results = collection.find(keyset, projection).sort(sort).limit(limit)
+        else:
+            skip = (page - 1) * limit
+            results = collection.find(query, projection).sort(sort).skip(skip).limit(limit)
 
         movies = []
-        for movie in cursor:
-            movie['_id'] = str(movie['_id']) 
-            movies.append(movie)
+        next_cursor = None
+        # The query runs when the cursor is first iterated
+        with MOVIES_STAGE_SECONDS.time(stage="find"):
+            for movie in results:
+                next_cursor = (movie.get(sort_field), movie['_id'])
+                movie['_id'] = str(movie['_id']) 
+                if drop_sort_field:
+                    movie.pop(sort_field, None)
+                movies.append(movie)
+        
+        if len(movies) == limit:
+            next_cursor = cls.encode_cursor(sort_by, sort_direction, *next_cursor)
+        else:
+            next_cursor = None
         
         return {
             "movies": movies,
-            "page": page,
+            "page": None if cursor else page,
             "limit": limit,
             "total_docs": total_docs,
-            "total_pages": total_pages
+            "total_pages": total_pages,
+            "next_cursor": next_cursor
         }
     
+    @classmethod
+    def count_movies(cls, query, count, year=None, language=None, collection=None):
+        """Total documents matching a get_movies query for the given count mode"""
+        if collection is None:
+            collection = cls.get_collection()
+        
+        if count == "none":
+            return None
+        if count == "approx":
+            if not query:
+                return collection.estimated_document_count()
+            total = MovieCount.total(year, language, db=collection.database)
+            if total is not None:
+                return total
+        return collection.count_documents(query)
+    
+    @classmethod
+    def encode_cursor(cls, sort_by, order, last_value, last_id):
+        """Encode the position after a document as an opaque cursor string"""
+        payload = {"s": sort_by, "o": order, "v": last_value, "id": str(last_id)}
+        return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode("utf-8")).decode("ascii").rstrip("=")
+    
+    @classmethod
+    def decode_cursor(cls, cursor, sort_by, order):
+        """
+        Decode a cursor produced by encode_cursor
+        
+        Returns:
+            tuple: (last sort value, last _id)
+            
+        Raises:
+            ValueError: If the cursor is malformed or was issued for another sort
+        """
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+            last_value, last_id = payload["v"], payload["id"]
+        except (ValueError, TypeError, KeyError, UnicodeEncodeError):
+            raise ValueError("Invalid cursor")
+        
+        if payload.get("s") != sort_by or payload.get("o") != order:
+            raise ValueError("Cursor does not match sort_by and order")
+        
+        if ObjectId.is_valid(last_id):
+            last_id = ObjectId(last_id)
+        return last_value, last_id
+    
     @classmethod
     def get_languages(cls):
         """Get unique languages in the collection"""
@@ -71,4 +478,61 @@ class Movie:
     def get_years(cls):
         """Get unique years in the collection"""
         collection = cls.get_collection()
-        return sorted(collection.distinct("year"))
+        return sorted(collection.distinct("year", {"year": {"$ne": None}}))
+
+def _keyset_predicate(field, direction, last_value, last_id, query=None):
+    """
+    Match documents of a query that sort after (last_value, last_id)
+    
+    MongoDB sorts null before any value, and $gt/$lt never match null, so
+    the null side of the sort order is handled explicitly. The equality
+    filters are repeated in every $or branch, so each branch is an index
+    range scan and the planner can merge them in sort order.
+    """
+    if direction == 1:
+        if last_value is None:
+            branches = [{field: None, "_id": {"$gt": last_id}}, {field: {"$ne": None}}]
+        else:
+            branches = [{field: {"$gt": last_value}}, {field: last_value, "_id": {"$gt": last_id}}]
+    elif last_value is None:
+        branches = [{field: None, "_id": {"$lt": last_id}}]
+    else:
+        branches = [{field: {"$lt": last_value}}, {field: last_value, "_id": {"$lt": last_id}}, {field: None}]
+    
+    branches = [dict(query or {}, **branch) for branch in branches]
+    return branches[0] if len(branches) == 1 else {"$or": branches}
+
+def _has_stage(plan, stage):
+    """Whether an explain plan tree contains a stage of the given name"""
+    if isinstance(plan, dict):
+        if plan.get("stage") == stage:
+            return True
+        return any(_has_stage(value, stage) for value in plan.values())
+    if isinstance(plan, list):
+        return any(_has_stage(value, stage) for value in plan)
+    return False
+
+def _hash_values(values):
+    """Stable hex digest of a JSON-serializable value"""
+    return hashlib.sha1(json.dumps(values, separators=(",", ":"), default=str).encode("utf-8")).hexdigest()
+
+def _chunk_documents(documents, max_docs=None, max_bytes=None):
+    """Split documents into sub-batches capped by count and BSON size"""
+    if not max_bytes:
+        step = max_docs or len(documents)
+        for start in range(0, len(documents), step):
+            yield documents[start:start + step]
+        return
+    
+    chunk = []
+    chunk_bytes = 0
+    for document in documents:
+        size = len(bson.encode(document))
+        if chunk and (chunk_bytes + size > max_bytes or (max_docs and len(chunk) >= max_docs)):
+            yield chunk
+            chunk = []
+            chunk_bytes = 0
+        chunk.append(document)
+        chunk_bytes += size
+    if chunk:
+        yield chunk
@@ -0,0 +1,113 @@
+from collections import Counter
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from app.database import get_db
+
+class MovieCount:
+    """
+    Pre-aggregated movie counts per (year, language)
+    
+    Maintained incrementally at ingest time so filtered totals in
+    Movie.get_movies are a sum over a few small documents instead of a
+    count_documents over the movies collection.
+    """
+    COLLECTION = "movie_counts"
+    
+    @classmethod
+    def get_collection(cls, db=None, name=None):
+        """Get the MongoDB collection for movie counts, or a staging collection by name"""
+        if db is None:
+            db = get_db()
+        return db[name or cls.COLLECTION]
+    
+    @classmethod
+    def get_staging_collection_name(cls, task_id):
+        """Name of the collection counts for a bulk load of task_id are staged in"""
+        return f"{cls.COLLECTION}_staging_{task_id}"
+    
+    @classmethod
+    def create_indexes(cls, name=None, db=None):
+        """Create the unique (year, language) index upserts rely on"""
+        collection = cls.get_collection(db, name)
+        collection.create_index([("year", 1), ("language", 1)], unique=True)
+    
+    @classmethod
+    def increment(cls, movies, db=None, name=None, removed=()):
+        """
+        Add movie documents to the counts and take removed ones away
+        
+        Args:
+            movies: Movie documents that were inserted, or the new versions of updated ones
+            db: Database to use instead of the request database
+            name: Staging collection to update instead of movie_counts
+            removed: Movie documents to take away, such as the previous
+                versions of updated ones
+        """
+        counts = Counter((movie.get("year"), movie.get("original_language")) for movie in movies)
+        counts.subtract((movie.get("year"), movie.get("original_language")) for movie in removed)
+        operations = [
+            UpdateOne({"year": year, "language": language}, {"$inc": {"count": count}}, upsert=True)
+            for (year, language), count in counts.items() if count
+        ]
+        if not operations:
+            return
+        
+        collection = cls.get_collection(db, name)
+        try:
+            collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # Writers upserting the same new key race on the unique index;
+            # by the time the loser retries, the key exists and $inc applies
+            errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != 11000 for error in errors):
+                raise
+            collection.bulk_write([operations[error["index"]] for error in errors], ordered=False)
+    
+    @classmethod
+    def total(cls, year=None, language=None, db=None):
+        """
+        Total movies for a year and/or language filter
+        
+        Returns:
+            int or None: The total, or None if counts have never been built
+        """
+        collection = cls.get_collection(db)
+        
+        match = {}
+        if year:
+            match["year"] = int(year)
+        if language:
+            match["language"] = language
+        
+        result = list(collection.aggregate([
+            {"$match": match},
+            {"$group": {"_id": None, "count": {"$sum": "$count"}}}
+        ]))
+        if result:
+            return result[0]["count"]
+        return 0 if collection.estimated_document_count() else None
+    
+    @classmethod
+    def rebuild(cls, movies_collection, db=None):
+        """Recompute all counts from a movies collection"""
+        movies_collection.aggregate([
+            {"$group": {"_id": {"year": "$year", "language": "$original_language"}, "count": {"$sum": 1}}},
+            {"$project": {"_id": 0, "year": "$_id.year", "language": "$_id.language", "count": 1}},
+            {"$out": cls.COLLECTION}
+        ])
+        cls.create_indexes(db=db)
+    
+    @classmethod
+    def is_built(cls, db=None):
+        """Whether counts exist yet"""
+        return cls.get_collection(db).estimated_document_count() > 0
+    
+    @classmethod
+    def swap_in(cls, staging_name, db=None):
+        """Atomically replace the counts with a staging collection"""
+        cls.get_collection(db, staging_name).rename(cls.COLLECTION, dropTarget=True)
+    
+    @classmethod
+    def drop_staging(cls, staging_name, db=None):
+        """Drop a staging collection left by an aborted bulk load"""
+        cls.get_collection(db, staging_name).drop()
@@ -0,0 +1,251 @@
+import pyarrow as pa
+import pyarrow.compute as pc
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from app.config import Config
+from app.database import get_db
+
+class MovieStats:
+    """
+    Materialized summaries of the movies collection per (year, language)
+
+    Each document holds the movie count, the sum and number of vote_average
+    values, the revenue total and a runtime histogram. They are maintained
+    incrementally at ingest time from per-batch partial aggregates computed
+    in Arrow, so /stats reads a few small documents instead of aggregating
+    the movies collection.
+    """
+    COLLECTION = "movie_stats"
+    # Runtime histogram buckets are RUNTIME_BUCKET minutes wide; the one at
+    # RUNTIME_MAX holds everything longer
+    RUNTIME_BUCKET = Config.STATS_RUNTIME_BUCKET
+    RUNTIME_MAX = Config.STATS_RUNTIME_MAX
+
+    @classmethod
+    def get_collection(cls, db=None, name=None):
+        """Get the MongoDB collection for movie stats, or a staging collection by name"""
+        if db is None:
+            db = get_db()
+        return db[name or cls.COLLECTION]
+
+    @classmethod
+    def get_staging_collection_name(cls, task_id):
+        """Name of the collection stats for a bulk load of task_id are staged in"""
+        return f"{cls.COLLECTION}_staging_{task_id}"
+
+    @classmethod
+    def create_indexes(cls, name=None, db=None):
+        """Create the unique (year, language) index upserts rely on"""
+        collection = cls.get_collection(db, name)
+        collection.create_index([("year", 1), ("language", 1)], unique=True)
+
+    @classmethod
+    def partials(cls, movies):
+        """
+        Partial aggregates of a batch of movie documents, computed in Arrow
+
+        Returns:
+            dict: (year, language) -> {count, vote_sum, vote_n, revenue_sum, runtime_hist}
+        """
+        table = pa.table({
+            "year": pa.array([movie.get("year") for movie in movies], pa.int64()),
+            "language": pa.array([movie.get("original_language") for movie in movies], pa.string()),
+            "vote": pa.array([movie.get("vote_average") for movie in movies], pa.float64()),
+            "revenue": pa.array([movie.get("revenue") for movie in movies], pa.float64()),
+            "runtime": pa.array([movie.get("runtime") for movie in movies], pa.float64())
+        })
+
+        partials = {}
+        totals = table.group_by(["year", "language"]).aggregate([
+            ([], "count_all"), ("vote", "sum"), ("vote", "count"), ("revenue", "sum")
+        ])
+        for row in totals.to_pylist():
+            partials[(row["year"], row["language"])] = {
+                "count": row["count_all"],
+                "vote_sum": row["vote_sum"] or 0.0,
+                "vote_n": row["vote_count"],
+                "revenue_sum": row["revenue_sum"] or 0.0,
+                "runtime_hist": {}
+            }
+
+        timed = table.filter(pc.is_valid(table["runtime"]))
+        buckets = pc.multiply(pc.floor(pc.divide(timed["runtime"], cls.RUNTIME_BUCKET)), cls.RUNTIME_BUCKET)
+        buckets = pc.max_element_wise(pc.min_element_wise(buckets, cls.RUNTIME_MAX), 0)
+        timed = timed.append_column("bucket", pc.cast(buckets, pa.int64()))
+        for row in timed.group_by(["year", "language", "bucket"]).aggregate([([], "count_all")]).to_pylist():
+            partials[(row["year"], row["language"])]["runtime_hist"][str(row["bucket"])] = row["count_all"]
+
+        return partials
+
+    @classmethod
+    def increment(cls, movies, db=None, name=None, removed=()):
+        """
+        Add movie documents to the stats and take removed ones away
+
+        Args:
+            movies: Movie documents that were inserted, or the new versions of updated ones
+            db: Database to use instead of the request database
+            name: Staging collection to update instead of movie_stats
+            removed: Movie documents to take away, such as the previous
+                versions of updated ones
+        """
+        partials = cls.partials(movies) if movies else {}
+        if removed:
+            _merge_partials(partials, _negate_partials(cls.partials(removed)))
+
+        operations = []
+        for (year, language), partial in partials.items():
+            inc = {
+                "count": partial["count"],
+                "vote_sum": partial["vote_sum"],
+                "vote_n": partial["vote_n"],
+                "revenue_sum": partial["revenue_sum"]
+            }
+            for bucket, count in partial["runtime_hist"].items():
+                inc[f"runtime_hist.{bucket}"] = count
+            # An update that moved nothing between groups or buckets cancels out
+            inc = {field: amount for field, amount in inc.items() if amount}
+            if inc:
+                operations.append(UpdateOne({"year": year, "language": language}, {"$inc": inc}, upsert=True))
+        if not operations:
+            return
+
+        collection = cls.get_collection(db, name)
+        try:
+            collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # Same unique-index race as MovieCount.increment
+            errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != 11000 for error in errors):
+                raise
+            collection.bulk_write([operations[error["index"]] for error in errors], ordered=False)
+
+    @classmethod
+    def rebuild(cls, movies_collection, db=None, batch_size=10000):
+        """
+        Recompute all stats from a movies collection
+
+        Uses the same Arrow partials as ingest, so bucketing and null
+        handling match the incremental path exactly. The result is built in
+        a side collection and swapped in.
+        """
+        projection = {"_id": 0, "year": 1, "original_language": 1, "vote_average": 1, "revenue": 1, "runtime": 1}
+        stats = {}
+        batch = []
+        for movie in movies_collection.find({}, projection, batch_size=batch_size):
+            batch.append(movie)
+            if len(batch) >= batch_size:
+                _merge_partials(stats, cls.partials(batch))
+                batch = []
+        if batch:
+            _merge_partials(stats, cls.partials(batch))
+
+        rebuild_name = f"{cls.COLLECTION}_rebuild"
+        collection = cls.get_collection(db, rebuild_name)
+        collection.drop()
+        if not stats:
+            cls.get_collection(db).drop()
+            return
+        collection.insert_many([dict(partial, year=year, language=language) for (year, language), partial in stats.items()])
+        cls.create_indexes(rebuild_name, db)
+        cls.swap_in(rebuild_name, db)
+
+    @classmethod
+    def summary(cls, year=None, language=None):
+        """
+        Stats over every movie matching a year and/or language filter
+
+        Returns:
+            dict: count, avg_vote, total_revenue and runtime_histogram
+        """
+        return _summarize(cls.get_collection().find(_stats_filter(year, language), {"_id": 0}))
+
+    @classmethod
+    def by_year(cls, language=None):
+        """Stats for each year, optionally for one language"""
+        return cls._grouped("year", cls.get_collection().find(_stats_filter(None, language), {"_id": 0}))
+
+    @classmethod
+    def by_language(cls, year=None):
+        """Stats for each language, optionally for one year"""
+        return cls._grouped("language", cls.get_collection().find(_stats_filter(year, None), {"_id": 0}))
+
+    @classmethod
+    def _grouped(cls, key, documents):
+        groups = {}
+        for document in documents:
+            groups.setdefault(document.get(key), []).append(document)
+        keys = sorted(groups, key=lambda value: (value is None, value))
+        summaries = [dict(_summarize(groups[value]), **{key: value}) for value in keys]
+        # Groups every movie was updated out of are left at zero
+        return [summary for summary in summaries if summary["count"]]
+
+    @classmethod
+    def is_built(cls, db=None):
+        """Whether stats exist yet"""
+        return cls.get_collection(db).estimated_document_count() > 0
+
+    @classmethod
+    def swap_in(cls, staging_name, db=None):
+        """Atomically replace the stats with a staging collection"""
+        cls.get_collection(db, staging_name).rename(cls.COLLECTION, dropTarget=True)
+
+    @classmethod
+    def drop_staging(cls, staging_name, db=None):
+        """Drop a staging collection left by an aborted bulk load"""
+        cls.get_collection(db, staging_name).drop()
+
+def _stats_filter(year, language):
+    query = {}
+    if year:
+        query["year"] = int(year)
+    if language:
+        query["language"] = language
+    return query
+
+def _merge_partials(stats, partials):
+    """Fold one batch's partial aggregates into running totals"""
+    for key, partial in partials.items():
+        total = stats.get(key)
+        if total is None:
+            stats[key] = partial
+            continue
+        for field in ("count", "vote_sum", "vote_n", "revenue_sum"):
+            total[field] += partial.get(field, 0)
+        for bucket, count in partial.get("runtime_hist", {}).items():
+            total["runtime_hist"][bucket] = total["runtime_hist"].get(bucket, 0) + count
+
+def _negate_partials(partials):
+    """Partial aggregates that take a batch back out of the totals"""
+    return {
+        key: {
+            "count": -partial["count"],
+            "vote_sum": -partial["vote_sum"],
+            "vote_n": -partial["vote_n"],
+            "revenue_sum": -partial["revenue_sum"],
+            "runtime_hist": {bucket: -count for bucket, count in partial["runtime_hist"].items()}
+        }
+        for key, partial in partials.items()
+    }
+
+def _summarize(documents):
+    """Combine stats documents into one summary"""
+    totals = {"count": 0, "vote_sum": 0.0, "vote_n": 0, "revenue_sum": 0.0, "runtime_hist": {}}
+    for document in documents:
+        _merge_partials({None: totals}, {None: document})
+
+    histogram = []
+    for bucket in sorted(totals["runtime_hist"], key=int):
+        if not totals["runtime_hist"][bucket]:
+            # Emptied by updates that moved its movies to other buckets
+            continue
+        low = int(bucket)
+        high = low + MovieStats.RUNTIME_BUCKET if low < MovieStats.RUNTIME_MAX else None
+        histogram.append({"min": low, "max": high, "count": totals["runtime_hist"][bucket]})
+
+    return {
+        "count": totals["count"],
+        "avg_vote": round(totals["vote_sum"] / totals["vote_n"], 4) if totals["vote_n"] else None,
+        "total_revenue": totals["revenue_sum"],
+        "runtime_histogram": histogram
+    }
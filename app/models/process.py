@@ -3,8 +3,9 @@ from app.database import get_db
 
 class Process:
     @classmethod
-    def get_collection(cls):
-        db = get_db()
+    def get_collection(cls, db=None):
+        if db is None:
+            db = get_db()
         return db.processes
 
     @classmethod
@@ -26,6 +27,89 @@ class Process:
             {"$set": {"status": status, "updated_at": datetime.now()}}
         )
     
+    @classmethod
+    def mark_started(cls, task_id, queued_at=None, attempt=None):
+        """Set a task processing, recording how long it waited in the queue"""
+        now = datetime.now()
+        update = {"status": "processing", "started_at": now, "updated_at": now}
+        if queued_at is not None:
+            update["queue_wait_seconds"] = round(max(0.0, now.timestamp() - queued_at), 3)
+        if attempt is not None:
+            update["attempts"] = attempt
+        collection = cls.get_collection()
+        collection.update_one({"task_id": task_id}, {"$set": update})
+    
+    @classmethod
+    def mark_retrying(cls, task_id, error, retry_at):
+        """Record a failed attempt that will be retried at retry_at"""
+        collection = cls.get_collection()
+        collection.update_one(
+            {"task_id": task_id},
+            {"$set": {"status": "retrying", "last_error": error, "retry_at": retry_at, "updated_at": datetime.now()}}
+        )
+    
+    @classmethod
+    def mark_dead(cls, task_id, error):
+        """Record that a task failed for good and was dead-lettered"""
+        collection = cls.get_collection()
+        collection.update_one(
+            {"task_id": task_id},
+            {"$set": {"status": "failed", "last_error": error, "dead_lettered": True, "updated_at": datetime.now()}}
+        )
+    
+    @classmethod
+    def mark_resumed(cls, task_id):
+        """Queue a dead-lettered task again"""
+        collection = cls.get_collection()
+        collection.update_one(
+            {"task_id": task_id},
+            {"$set": {"status": "pending", "dead_lettered": False, "updated_at": datetime.now()}}
+        )
+    
+    @classmethod
+    def get_checkpoint(cls, task_id):
+        """The ingest plan and per-stream checkpoints of a task, or None"""
+        collection = cls.get_collection()
+        process = collection.find_one({"task_id": task_id}, {"checkpoint": 1})
+        return process.get("checkpoint") if process else None
+    
+    @classmethod
+    def set_checkpoint(cls, task_id, plan):
+        """Store a task's ingest plan before its first batch is written"""
+        collection = cls.get_collection()
+        collection.update_one({"task_id": task_id}, {"$set": {"checkpoint": plan}})
+    
+    @classmethod
+    def save_stream_checkpoint(cls, task_id, stream, state, db=None):
+        """Store the checkpoint of one input stream of a task"""
+        collection = cls.get_collection(db)
+        collection.update_one(
+            {"task_id": task_id},
+            {"$set": {f"checkpoint.streams.{stream}": state, "updated_at": datetime.now()}}
+        )
+    
+    @classmethod
+    def update_progress(cls, task_id, progress, db=None):
+        """Merge fields into a task's progress; keys may be dotted paths"""
+        update = {f"progress.{key}": value for key, value in progress.items()}
+        update["updated_at"] = datetime.now()
+        collection = cls.get_collection(db)
+        collection.update_one({"task_id": task_id}, {"$set": update})
+    
+    @classmethod
+    def get_progress(cls, task_id, db=None):
+        collection = cls.get_collection(db)
+        process = collection.find_one({"task_id": task_id}, {"progress": 1})
+        return (process or {}).get("progress") or {}
+    
+    @classmethod
+    def update_result(cls, task_id, result):
+        collection = cls.get_collection()
+        collection.update_one(
+            {"task_id": task_id},
+            {"$set": {"result": result, "updated_at": datetime.now()}}
+        )
+    
     @classmethod
     def get_process_by_task_id(cls, task_id):
         collection = cls.get_collection()
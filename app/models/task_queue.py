@@ -0,0 +1,204 @@
+import uuid
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from app.config import Config
+from app.database import get_db
+
+class TaskQueue:
+    """
+    Durable queue of worker tasks
+
+    Tasks are stored before they are announced over ZeroMQ, so nothing is
+    lost while the worker is down. The worker pool leases a task for
+    TASK_VISIBILITY_TIMEOUT seconds and renews the lease while it holds the
+    task; a lease that runs out (the worker died) makes the task available
+    again. Failed attempts are retried after an exponential backoff and
+    dead-lettered after TASK_MAX_ATTEMPTS.
+
+    status is one of queued, leased, done or dead.
+    """
+
+    @classmethod
+    def get_collection(cls):
+        db = get_db()
+        return db.task_queue
+
+    @classmethod
+    def create_indexes(cls):
+        collection = cls.get_collection()
+        collection.create_index("task_id", unique=True)
+        collection.create_index([("status", 1), ("available_at", 1)])
+        collection.create_index([("status", 1), ("lease_expires_at", 1)])
+
+    @classmethod
+    def enqueue(cls, task_data):
+        """Store a serialized task, making it available immediately"""
+        now = datetime.now()
+        collection = cls.get_collection()
+        collection.insert_one({
+            "task_id": task_data["task_id"],
+            "task": task_data,
+            "status": "queued",
+            "attempts": 0,
+            "available_at": now,
+            "lease_id": None,
+            "lease_expires_at": None,
+            "last_error": None,
+            "created_at": now,
+            "updated_at": now
+        })
+
+    @classmethod
+    def lease(cls, visibility_timeout=None):
+        """
+        Lease the oldest available task
+
+        A task is available when it is queued and its backoff has passed, or
+        when its previous lease expired without an ack and it has attempts
+        left (see dead_letter_expired).
+
+        Returns:
+            dict: The queue entry, with the lease_id needed to ack it, or None
+        """
+        now = datetime.now()
+        timeout = visibility_timeout or Config.TASK_VISIBILITY_TIMEOUT
+        collection = cls.get_collection()
+        return collection.find_one_and_update(
+            {"$or": [
+                {"status": "queued", "available_at": {"$lte": now}},
+                {"status": "leased", "lease_expires_at": {"$lte": now}, "attempts": {"$lt": Config.TASK_MAX_ATTEMPTS}}
+            ]},
+            {
+                "$set": {
+                    "status": "leased",
+                    "lease_id": uuid.uuid4().hex,
+                    "lease_expires_at": now + timedelta(seconds=timeout),
+                    "updated_at": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("available_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    @classmethod
+    def renew(cls, lease_ids, visibility_timeout=None):
+        """Extend leases that are still held"""
+        if not lease_ids:
+            return
+        now = datetime.now()
+        timeout = visibility_timeout or Config.TASK_VISIBILITY_TIMEOUT
+        collection = cls.get_collection()
+        collection.update_many(
+            {"lease_id": {"$in": list(lease_ids)}, "status": "leased"},
+            {"$set": {"lease_expires_at": now + timedelta(seconds=timeout), "updated_at": now}}
+        )
+
+    @classmethod
+    def ack(cls, task_id, lease_id):
+        """
+        Mark a leased task done
+
+        Returns:
+            bool: False if the lease had already been lost to another worker
+        """
+        collection = cls.get_collection()
+        result = collection.update_one(
+            {"task_id": task_id, "lease_id": lease_id, "status": "leased"},
+            {"$set": {"status": "done", "lease_id": None, "updated_at": datetime.now()}}
+        )
+        return result.modified_count == 1
+
+    @classmethod
+    def release(cls, task_id, lease_id):
+        """Return a leased task that was never started, without using up an attempt"""
+        now = datetime.now()
+        collection = cls.get_collection()
+        collection.update_one(
+            {"task_id": task_id, "lease_id": lease_id, "status": "leased"},
+            {
+                "$set": {"status": "queued", "available_at": now, "lease_id": None, "updated_at": now},
+                "$inc": {"attempts": -1}
+            }
+        )
+
+    @classmethod
+    def fail(cls, task_id, lease_id, error, retry=True):
+        """
+        Record a failed attempt: schedule a retry, or dead-letter the task
+        once it has used TASK_MAX_ATTEMPTS
+
+        Args:
+            retry: False for errors that would fail the same way again, to
+                dead-letter the task straight away
+
+        Returns:
+            dict: The updated queue entry, or None if the lease was lost
+        """
+        collection = cls.get_collection()
+        entry = collection.find_one({"task_id": task_id, "lease_id": lease_id, "status": "leased"})
+        if not entry:
+            return None
+
+        now = datetime.now()
+        update = {"lease_id": None, "last_error": error, "updated_at": now}
+        if not retry or entry["attempts"] >= Config.TASK_MAX_ATTEMPTS:
+            update["status"] = "dead"
+        else:
+            backoff = min(Config.TASK_RETRY_BACKOFF * 2 ** (entry["attempts"] - 1), Config.TASK_RETRY_BACKOFF_MAX)
+            update["status"] = "queued"
+            update["available_at"] = now + timedelta(seconds=backoff)
+        return collection.find_one_and_update(
+            {"task_id": task_id, "lease_id": lease_id, "status": "leased"},
+            {"$set": update},
+            return_document=ReturnDocument.AFTER
+        )
+
+    @classmethod
+    def requeue(cls, task_id):
+        """
+        Give a dead-lettered task a fresh set of attempts
+
+        Returns:
+            dict: The updated queue entry, or None if the task isn't dead-lettered
+        """
+        now = datetime.now()
+        collection = cls.get_collection()
+        return collection.find_one_and_update(
+            {"task_id": task_id, "status": "dead"},
+            {"$set": {"status": "queued", "attempts": 0, "available_at": now, "updated_at": now}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    @classmethod
+    def count_by_status(cls):
+        """Number of tasks in each status, including statuses with none"""
+        counts = dict.fromkeys(("queued", "leased", "done", "dead"), 0)
+        collection = cls.get_collection()
+        for group in collection.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+            counts[group["_id"]] = group["count"]
+        return counts
+
+    @classmethod
+    def dead_letter_expired(cls):
+        """
+        Dead-letter tasks whose lease expired on their last attempt
+
+        Their worker died mid-task every time, so leasing them again would
+        only crash another worker.
+
+        Returns:
+            list: The dead-lettered queue entries
+        """
+        now = datetime.now()
+        collection = cls.get_collection()
+        query = {"status": "leased", "lease_expires_at": {"$lte": now}, "attempts": {"$gte": Config.TASK_MAX_ATTEMPTS}}
+        dead = []
+        for entry in collection.find(query):
+            result = collection.update_one(
+                {"_id": entry["_id"], "lease_id": entry["lease_id"], "status": "leased"},
+                {"$set": {"status": "dead", "lease_id": None, "last_error": "Lease expired on the last attempt", "updated_at": now}}
+            )
+            if result.modified_count:
+                dead.append(entry)
+        return dead
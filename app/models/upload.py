@@ -0,0 +1,71 @@
+from datetime import datetime
+from pymongo import ReturnDocument
+from app.database import get_db
+
+class Upload:
+    """
+    State of a resumable upload
+
+    offset counts the bytes of the (decompressed) file that are durable on
+    disk; clients resume by sending data from that offset.
+    """
+
+    @classmethod
+    def get_collection(cls):
+        db = get_db()
+        return db.uploads
+
+    @classmethod
+    def create_upload(cls, upload_id, file_path, mode):
+        collection = cls.get_collection()
+        upload = {
+            "upload_id": upload_id,
+            "file_path": file_path,
+            "mode": mode,
+            "offset": 0,
+            "status": "receiving",
+            "task_id": None,
+            "created_at": datetime.now(),
+            "updated_at": datetime.now()
+        }
+        collection.insert_one(upload)
+        return cls._serialize(upload)
+
+    @classmethod
+    def get_upload(cls, upload_id):
+        collection = cls.get_collection()
+        return cls._serialize(collection.find_one({"upload_id": upload_id}))
+
+    @classmethod
+    def advance(cls, upload_id, offset, task_id=None):
+        """Record that the file is durable up to offset"""
+        update = {"offset": offset, "updated_at": datetime.now()}
+        if task_id:
+            update["task_id"] = task_id
+        collection = cls.get_collection()
+        collection.update_one({"upload_id": upload_id}, {"$set": update})
+
+    @classmethod
+    def complete(cls, upload_id):
+        """Mark an upload as fully received"""
+        collection = cls.get_collection()
+        return cls._serialize(collection.find_one_and_update(
+            {"upload_id": upload_id},
+            {"$set": {"status": "complete", "updated_at": datetime.now()}},
+            return_document=ReturnDocument.AFTER
+        ))
+
+    @classmethod
+    def abort(cls, upload_id):
+        """Mark an upload as abandoned"""
+        collection = cls.get_collection()
+        collection.update_one(
+            {"upload_id": upload_id},
+            {"$set": {"status": "aborted", "updated_at": datetime.now()}}
+        )
+
+    @classmethod
+    def _serialize(cls, upload):
+        if upload:
+            upload["_id"] = str(upload["_id"])
+        return upload
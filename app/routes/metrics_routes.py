@@ -0,0 +1,12 @@
+from flask import Blueprint
+from app.controllers.metrics_controller import get_metrics, start_request_timer, observe_request
+
+metrics_bp = Blueprint('metrics', __name__)
+
+# App-wide hooks: every request is timed while the blueprint is registered
+metrics_bp.before_app_request(start_request_timer)
+metrics_bp.after_app_request(observe_request)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def api_get_metrics():
+    return get_metrics()
@@ -1,5 +1,5 @@
 from flask import Blueprint
-from app.controllers.movie_controller import upload_csv, get_movies
+from app.controllers.movie_controller import upload_csv, get_movies, get_movies_batch, export_movies
 
 movie_bp = Blueprint('movie', __name__)
 
@@ -11,3 +11,11 @@ def api_upload_csv():
 def api_get_movies():
     return get_movies()
 
+
+@movie_bp.route('/movies/batch', methods=['POST'])
+def api_get_movies_batch():
+    return get_movies_batch()
+
+@movie_bp.route('/movies/export', methods=['GET'])
+def api_export_movies():
+    return export_movies()
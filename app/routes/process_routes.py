@@ -1,5 +1,5 @@
 from flask import Blueprint
-from app.controllers.process_controller import get_process_status, get_all_processes
+from app.controllers.process_controller import get_process_status, get_all_processes, resume_process, stream_process_status
 
 
 process_bp = Blueprint('process', __name__)
@@ -7,6 +7,14 @@ process_bp = Blueprint('process', __name__)
 @process_bp.route('/process/<task_id>', methods=['GET'])
 def api_get_process_status(task_id):
     return get_process_status(task_id)
+
+@process_bp.route('/process/<task_id>/events', methods=['GET'])
+def api_stream_process_status(task_id):
+    return stream_process_status(task_id)
+
+@process_bp.route('/process/<task_id>/resume', methods=['POST'])
+def api_resume_process(task_id):
+    return resume_process(task_id)
     
 
 @process_bp.route('/processes', methods=['GET'])
@@ -0,0 +1,16 @@
+from flask import Blueprint
+from app.controllers.stats_controller import get_stats, get_stats_by_year, get_stats_by_language
+
+stats_bp = Blueprint('stats', __name__)
+
+@stats_bp.route('/stats', methods=['GET'])
+def api_get_stats():
+    return get_stats()
+
+@stats_bp.route('/stats/years', methods=['GET'])
+def api_get_stats_by_year():
+    return get_stats_by_year()
+
+@stats_bp.route('/stats/languages', methods=['GET'])
+def api_get_stats_by_language():
+    return get_stats_by_language()
@@ -0,0 +1,20 @@
+from flask import Blueprint
+from app.controllers.upload_controller import stream_upload, start_upload, append_to_upload, get_upload_status
+
+upload_bp = Blueprint('upload', __name__)
+
+@upload_bp.route('/upload/stream', methods=['POST'])
+def api_stream_upload():
+    return stream_upload()
+
+@upload_bp.route('/uploads', methods=['POST'])
+def api_start_upload():
+    return start_upload()
+
+@upload_bp.route('/uploads/<upload_id>', methods=['PATCH'])
+def api_append_to_upload(upload_id):
+    return append_to_upload(upload_id)
+
+@upload_bp.route('/uploads/<upload_id>', methods=['GET'])
+def api_get_upload_status(upload_id):
+    return get_upload_status(upload_id)
@@ -1,6 +1,78 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import redis
 from flask import current_app
+from app.config import Config
+from app.database import get_redis_client
+from app.services.local_cache import LocalCache
+from app.utils.metrics import MOVIES_STAGE_SECONDS, REGISTRY
 
-def get_movies_cache_key(page, limit, year, language, sort_by, order):
+# In-process tier in front of the flask-caching Redis backend
+local_cache = LocalCache(Config.LOCAL_CACHE_MAX_ENTRIES, Config.LOCAL_CACHE_MAX_BYTES, Config.LOCAL_CACHE_TTL)
+
+_redis_stats = {"hits": 0, "misses": 0}
+_redis_stats_lock = threading.Lock()
+
+# Bumped after every successful ingest; part of every movies cache key
+GENERATION_KEY = "movies:generation"
+_generation = {"value": 0, "checked_at": 0.0}
+_generation_lock = threading.Lock()
+
+def get_dataset_generation():
+    """
+    Current dataset generation as seen by this process
+    
+    Re-read from Redis at most every CACHE_GENERATION_REFRESH seconds; the
+    invalidation listener also pushes new values as soon as they are
+    published. If Redis is unreachable the last known value is kept.
+    
+    Returns:
+        int: Dataset generation
+    """
+    now = time.monotonic()
+    with _generation_lock:
+        if now - _generation["checked_at"] < current_app.config['CACHE_GENERATION_REFRESH']:
+            return _generation["value"]
+        _generation["checked_at"] = now
+    try:
+        value = int(get_redis_client().get(GENERATION_KEY) or 0)
+    except redis.RedisError as e:
+        print(f"Failed to read dataset generation: {str(e)}")
+        return _generation["value"]
+    _set_generation(value)
+    return value
+
+def bump_dataset_generation():
+    """
+    Start a new dataset generation after the movies collection changes
+    
+    Every movies cache key embeds the generation, so entries from earlier
+    generations are never read again and simply age out of Redis. The new
+    value is published so API processes switch over (and drop their local
+    tier) without waiting for their next refresh.
+    
+    Returns:
+        int: The new generation, or None if Redis is unreachable
+    """
+    local_cache.clear()
+    try:
+        client = get_redis_client()
+        generation = client.incr(GENERATION_KEY)
+        client.publish(current_app.config['CACHE_INVALIDATION_CHANNEL'], generation)
+    except redis.RedisError as e:
+        print(f"Failed to bump dataset generation: {str(e)}")
+        return None
+    _set_generation(generation)
+    return generation
+
+def _set_generation(value):
+    """Move the local generation forward, never back"""
+    with _generation_lock:
+        if value > _generation["value"]:
+            _generation["value"] = value
+
+def get_movies_cache_key(page, limit, year, language, sort_by, order, cursor=None, count=None, fields=None, generation=None):
     """
     Generate a cache key for movies query
     
@@ -11,36 +83,374 @@ def get_movies_cache_key(page, limit, year, language, sort_by, order):
         language: Filter by language
         sort_by: Field to sort by
         order: Sort order (1 for ascending, -1 for descending)
+        cursor: Keyset pagination cursor
+        count: Count mode for total_docs
+        fields: Projected fields, as a sorted tuple
+        generation: Dataset generation (defaults to the current one)
         
     Returns:
         str: Cache key
     """
-    return f"movies:page={page}:limit={limit}:year={year}:language={language}:sort_by={sort_by}:order={order}"
+    if generation is None:
+        generation = get_dataset_generation()
+    return f"movies:gen={generation}:page={page}:limit={limit}:year={year}:language={language}:sort_by={sort_by}:order={order}:cursor={cursor}:count={count}:fields={','.join(fields) if fields else None}"
 
-def cache_movies_response(response, page, limit, year, language, sort_by, order):
+def cache_movies_response(response, page, limit, year, language, sort_by, order, cursor=None, count=None, fields=None):
     """
     Cache a movies response
     
     Args:
         response: Response data to cache
-        page, limit, year, language, sort_by, order: Query parameters
+        page, limit, year, language, sort_by, order, cursor, count, fields: Query parameters
         
     Returns:
         The cached response
     """
-    key = get_movies_cache_key(page, limit, year, language, sort_by, order)
-    current_app.cache.set(key, response, timeout=5)
+    key = get_movies_cache_key(page, limit, year, language, sort_by, order, cursor, count, fields)
+    _write_entry(key, response)
     return response
 
-def get_cached_movies(page, limit, year, language, sort_by, order):
+def cache_movies_responses(responses):
+    """
+    Cache many movies responses in one round trip
+    
+    Written to Redis with a single pipelined set_many; the local tier is
+    left alone since this is used from the worker to warm the shared tier.
+    
+    Args:
+        responses: Mapping of cache key (see get_movies_cache_key) to response
+    """
+    if not responses or not current_app.config['CACHE_REDIS_ENABLED']:
+        return
+    ttl = current_app.config['MOVIES_CACHE_TTL']
+    fresh_until = time.time() + ttl
+    entries = {key: {"data": response, "fresh_until": fresh_until} for key, response in responses.items()}
+    current_app.cache.set_many(entries, timeout=ttl + current_app.config['MOVIES_CACHE_STALE_TTL'])
+
+def get_cached_movies(page, limit, year, language, sort_by, order, cursor=None, count=None, fields=None):
     """
     Get cached movies response if available
     
+    Checks the in-process LRU first and falls back to Redis, copying Redis
+    hits into the local tier. Entries past MOVIES_CACHE_TTL are treated as
+    misses here; use get_or_compute_movies to serve them while refreshing.
+    
     Args:
-        page, limit, year, language, sort_by, order: Query parameters
+        page, limit, year, language, sort_by, order, cursor, count, fields: Query parameters
         
     Returns:
         Cached response or None if not in cache
     """
-    key = get_movies_cache_key(page, limit, year, language, sort_by, order)
-    return current_app.cache.get(key)
+    key = get_movies_cache_key(page, limit, year, language, sort_by, order, cursor, count, fields)
+    entry = _read_entry(key)
+    if entry is None or not _is_fresh(entry):
+        return None
+    return entry["data"]
+
+def get_or_compute_movies(compute, page, limit, year, language, sort_by, order, cursor=None, count=None, fields=None):
+    """
+    Serve a movies response from cache, computing it at most once per key
+    
+    Fresh entries are returned as is. Stale entries (older than
+    MOVIES_CACHE_TTL but within MOVIES_CACHE_STALE_TTL) are returned
+    immediately while a single background thread refreshes them. On a miss
+    one caller per key runs compute(); concurrent callers in this process
+    wait for its result, and other processes wait on a Redis lock for the
+    entry to appear instead of querying Mongo themselves.
+    
+    Args:
+        compute: Callable returning the response, e.g. a Movie.get_movies call
+        page, limit, year, language, sort_by, order, cursor, count, fields: Query parameters
+        
+    Returns:
+        dict: The movies response
+    """
+    key = get_movies_cache_key(page, limit, year, language, sort_by, order, cursor, count, fields)
+    with MOVIES_STAGE_SECONDS.time(stage="cache"):
+        entry = _read_entry(key)
+    if entry is not None:
+        if not _is_fresh(entry):
+            _refresh_in_background(key, compute)
+        return entry["data"]
+    return _single_flight(key, lambda: _compute_and_store(key, compute))
+
+def get_or_compute_many_movies(compute, queries):
+    """
+    Resolve several movies queries with one cache round trip
+    
+    Hits are read from the local tier and then a single Redis MGET; stale
+    hits are refreshed in the background as in get_or_compute_movies.
+    Identical queries are computed once, and the distinct misses run
+    concurrently (MOVIES_BATCH_WORKERS threads) with the same single-flight
+    and Redis locking as a single request.
+    
+    Args:
+        compute: Callable taking the query parameters and returning a response
+        queries: List of (page, limit, year, language, sort_by, order, cursor, count, fields)
+        
+    Returns:
+        list: Responses in the same order as queries
+    """
+    keys = [get_movies_cache_key(*params) for params in queries]
+    with MOVIES_STAGE_SECONDS.time(stage="cache"):
+        entries = _read_entries(keys)
+    results = [None] * len(queries)
+    misses = {}
+    
+    for index, (key, params) in enumerate(zip(keys, queries)):
+        entry = entries.get(key)
+        if entry is None:
+            misses.setdefault(key, []).append(index)
+            continue
+        if not _is_fresh(entry):
+            _refresh_in_background(key, lambda params=params: compute(*params))
+        results[index] = entry["data"]
+    
+    if misses:
+        app = current_app._get_current_object()
+        
+        def resolve(key):
+            params = queries[misses[key][0]]
+            with app.app_context():
+                return _single_flight(key, lambda: _compute_and_store(key, lambda: compute(*params)))
+        
+        with ThreadPoolExecutor(max_workers=min(len(misses), current_app.config['MOVIES_BATCH_WORKERS'])) as executor:
+            for key, response in zip(misses, executor.map(resolve, misses)):
+                for index in misses[key]:
+                    results[index] = response
+    return results
+
+def _is_fresh(entry):
+    return entry["fresh_until"] > time.time()
+
+def _read_entry(key, local=True):
+    """Look up a cache envelope in the local tier, then Redis"""
+    local_enabled = local and current_app.config['CACHE_LOCAL_ENABLED']
+    
+    if local_enabled:
+        entry = local_cache.get(key)
+        if entry is not None:
+            return entry
+    
+    if not current_app.config['CACHE_REDIS_ENABLED']:
+        return None
+    
+    entry = current_app.cache.get(key)
+    with _redis_stats_lock:
+        _redis_stats["hits" if entry is not None else "misses"] += 1
+    
+    if entry is not None and local_enabled:
+        local_cache.set(key, entry)
+    return entry
+
+def _read_entries(keys):
+    """Look up many cache envelopes: local tier first, then one Redis MGET"""
+    local_enabled = current_app.config['CACHE_LOCAL_ENABLED']
+    entries = {}
+    
+    if local_enabled:
+        for key in keys:
+            entry = local_cache.get(key)
+            if entry is not None:
+                entries[key] = entry
+    
+    remaining = list(dict.fromkeys(key for key in keys if key not in entries))
+    if not remaining or not current_app.config['CACHE_REDIS_ENABLED']:
+        return entries
+    
+    found = current_app.cache.get_many(*remaining)
+    hits = 0
+    for key, entry in zip(remaining, found):
+        if entry is None:
+            continue
+        hits += 1
+        entries[key] = entry
+        if local_enabled:
+            local_cache.set(key, entry)
+    with _redis_stats_lock:
+        _redis_stats["hits"] += hits
+        _redis_stats["misses"] += len(remaining) - hits
+    return entries
+
+def _write_entry(key, response):
+    """
+    Store a response in both tiers wrapped in a {data, fresh_until} envelope
+    
+    Redis keeps the entry for MOVIES_CACHE_STALE_TTL past its fresh window
+    so it can still be served while a refresh runs.
+    """
+    ttl = current_app.config['MOVIES_CACHE_TTL']
+    entry = {"data": response, "fresh_until": time.time() + ttl}
+    if current_app.config['CACHE_REDIS_ENABLED']:
+        current_app.cache.set(key, entry, timeout=ttl + current_app.config['MOVIES_CACHE_STALE_TTL'])
+    if current_app.config['CACHE_LOCAL_ENABLED']:
+        local_cache.set(key, entry)
+    return entry
+
+class _Flight:
+    """A computation in progress for one cache key"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+def _single_flight(key, compute):
+    """
+    Run compute() once per key at a time within this process
+    
+    The first caller computes; callers arriving while it runs wait for and
+    share its result. A waiter that times out computes on its own, as does
+    one whose leader came back empty-handed: a background refresh returns
+    None when another process holds the key's Redis lock.
+    """
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+    
+    if not leader:
+        if flight.done.wait(current_app.config['CACHE_LOCK_TIMEOUT']):
+            if flight.error is not None:
+                raise flight.error
+            if flight.result is not None:
+                return flight.result
+        return compute()
+    
+    try:
+        flight.result = compute()
+        return flight.result
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.done.set()
+
+def _compute_and_store(key, compute, wait=True):
+    """
+    Compute and cache a response while holding the key's Redis lock
+    
+    If another process holds the lock, waits up to CACHE_LOCK_WAIT for it to
+    publish the entry (or returns None straight away when wait is False)
+    and only computes itself if nothing shows up.
+    """
+    lock = _acquire_lock(key)
+    if lock is False:
+        if not wait:
+            return None
+        entry = _wait_for_entry(key)
+        if entry is not None:
+            return entry["data"]
+    
+    try:
+        response = compute()
+        _write_entry(key, response)
+        return response
+    finally:
+        if lock:
+            try:
+                lock.release()
+            except redis.RedisError:
+                pass
+
+def _acquire_lock(key):
+    """
+    Try to take the cross-process refresh lock for a key
+    
+    Returns:
+        The held lock, False if another process holds it, or None when Redis
+        is disabled or unreachable (the caller then proceeds without one)
+    """
+    if not current_app.config['CACHE_REDIS_ENABLED']:
+        return None
+    try:
+        lock = get_redis_client().lock(f"lock:{key}", timeout=current_app.config['CACHE_LOCK_TIMEOUT'])
+        return lock if lock.acquire(blocking=False) else False
+    except redis.RedisError as e:
+        print(f"Cache lock unavailable for {key}: {str(e)}")
+        return None
+
+def _wait_for_entry(key):
+    """Poll Redis for a fresh entry written by the lock holder"""
+    deadline = time.monotonic() + current_app.config['CACHE_LOCK_WAIT']
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = _read_entry(key, local=False)
+        if entry is not None and _is_fresh(entry):
+            return entry
+    return None
+
+def _refresh_in_background(key, compute):
+    """Recompute a stale key on a daemon thread unless a refresh is already running"""
+    with _flights_lock:
+        if key in _flights:
+            return
+    app = current_app._get_current_object()
+    
+    def refresh():
+        with app.app_context():
+            try:
+                _single_flight(key, lambda: _compute_and_store(key, compute, wait=False))
+            except Exception as e:
+                print(f"Background refresh failed for {key}: {str(e)}")
+    
+    threading.Thread(target=refresh, name="cache-refresh", daemon=True).start()
+
+def start_invalidation_listener(app):
+    """
+    Pick up new dataset generations as soon as they are published
+    
+    Runs on a daemon thread, clearing the in-process tier on every message,
+    and reconnects if Redis goes away; until it does, get_dataset_generation
+    still polls Redis every CACHE_GENERATION_REFRESH seconds.
+    """
+    channel = app.config['CACHE_INVALIDATION_CHANNEL']
+    
+    def listen():
+        while True:
+            try:
+                pubsub = redis.StrictRedis.from_url(app.config['REDIS_URL']).pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(channel)
+                for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        try:
+                            _set_generation(int(message["data"]))
+                        except ValueError:
+                            pass
+                        local_cache.clear()
+            except redis.RedisError as e:
+                print(f"Cache invalidation listener disconnected: {str(e)}")
+            time.sleep(5)
+    
+    threading.Thread(target=listen, name="cache-invalidation", daemon=True).start()
+
+def get_cache_stats():
+    """
+    Hit/miss counters for each cache tier
+    
+    Returns:
+        dict: Stats for the local and redis tiers
+    """
+    with _redis_stats_lock:
+        lookups = _redis_stats["hits"] + _redis_stats["misses"]
+        redis_stats = dict(_redis_stats, hit_rate=round(_redis_stats["hits"] / lookups, 4) if lookups else 0.0)
+    return {"local": local_cache.stats(), "redis": redis_stats}
+
+def _collect_cache_metrics():
+    """get_cache_stats as metrics, read only when they are scraped"""
+    stats = get_cache_stats()
+    return [
+        ("cache_hits_total", "counter", "Movies cache hits by tier", [({"tier": tier}, stats[tier]["hits"]) for tier in stats]),
+        ("cache_misses_total", "counter", "Movies cache misses by tier", [({"tier": tier}, stats[tier]["misses"]) for tier in stats]),
+        ("cache_evictions_total", "counter", "Entries evicted from the local cache tier", [({"tier": "local"}, stats["local"]["evictions"])]),
+        ("cache_entries", "gauge", "Entries held in the local cache tier", [({"tier": "local"}, stats["local"]["entries"])]),
+        ("cache_bytes", "gauge", "Approximate size of the local cache tier", [({"tier": "local"}, stats["local"]["bytes"])])
+    ]
+
+REGISTRY.register_collector(_collect_cache_metrics)
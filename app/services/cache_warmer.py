@@ -0,0 +1,82 @@
+import time
+from flask import current_app
+from app.models.movie import Movie
+from app.services.cache_service import get_movies_cache_key, cache_movies_responses
+
+def warm_movies_cache(generation, pages=None, limit=None, max_keys=None, max_seconds=None):
+    """
+    Precompute the first pages of /movies for every filter/sort combination
+    
+    Covers the unfiltered listing, every year, every language and every
+    year/language pair, for each sort_by and order, using the default
+    limit and count mode so the keys match what clients request. Filters
+    are warmed broadest first, so the most shared pages are done before
+    the budget runs out. Pages past the last one are skipped.
+    
+    Args:
+        generation: Dataset generation to warm the keys for
+        pages: Pages per combination (default CACHE_WARM_PAGES)
+        limit: Page size (default CACHE_WARM_LIMIT)
+        max_keys: Stop after this many keys (default CACHE_WARM_MAX_KEYS)
+        max_seconds: Stop after this long (default CACHE_WARM_MAX_SECONDS)
+        
+    Returns:
+        dict: Keys warmed, elapsed seconds and whether the budget cut it short
+    """
+    config = current_app.config
+    pages = pages or config['CACHE_WARM_PAGES']
+    limit = limit or config['CACHE_WARM_LIMIT']
+    max_keys = max_keys or config['CACHE_WARM_MAX_KEYS']
+    max_seconds = max_seconds or config['CACHE_WARM_MAX_SECONDS']
+    flush_size = config['CACHE_WARM_FLUSH_SIZE']
+    count = config['MOVIES_COUNT_MODE']
+    
+    start_time = time.time()
+    deadline = time.monotonic() + max_seconds
+    pending = {}
+    warmed = 0
+    truncated = False
+    
+    for year, language, sort_by, order in _query_combinations():
+        for page in range(1, pages + 1):
+            if warmed >= max_keys or time.monotonic() >= deadline:
+                truncated = True
+                break
+            response = Movie.get_movies(page, limit, year, language, sort_by, order, None, count)
+            key = get_movies_cache_key(page, limit, year, language, sort_by, order, None, count, generation=generation)
+            pending[key] = response
+            warmed += 1
+            if len(pending) >= flush_size:
+                cache_movies_responses(pending)
+                pending = {}
+            if len(response["movies"]) < limit or (response["total_pages"] is not None and page >= response["total_pages"]):
+                break
+        if truncated:
+            break
+    
+    cache_movies_responses(pending)
+    return {
+        "warmed_keys": warmed,
+        "elapsed_seconds": round(time.time() - start_time, 3),
+        "truncated": truncated
+    }
+
+def _query_combinations():
+    """
+    (year, language, sort_by, order) in warming order, as the controller sees them
+    
+    Years are strings because that is how they arrive in the query string
+    and therefore how they appear in cache keys.
+    """
+    years = [str(year) for year in Movie.get_years()]
+    languages = [language for language in Movie.get_languages() if language]
+    
+    filters = [(None, None)]
+    filters += [(year, None) for year in years]
+    filters += [(None, language) for language in languages]
+    filters += [(year, language) for year in years for language in languages]
+    
+    for year, language in filters:
+        for sort_by in Movie.SORT_FIELDS:
+            for order in (1, -1):
+                yield year, language, sort_by, order
@@ -1,112 +1,405 @@
+import io
 import os
 import uuid
 import re
+import time
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import repeat
+import numpy as np
 import pyarrow as pa
+import pyarrow.compute as pc
 import pyarrow.csv as csv
 from datetime import datetime
+from app.config import Config
 from app.models.movie import Movie
+from app.models.movie_count import MovieCount
+from app.models.movie_stats import MovieStats
+from app.models.process import Process
+from app.services.ingest_checkpoint import IngestCheckpoint, new_ingest_plan
+from app.services.ingest_pipeline import IngestPipeline
+from app.services.progress_service import IngestProgress
+from app.utils.csv_ranges import read_csv_header, split_csv_ranges
+from app.utils.growing_file import GrowingFile
+from app.utils.metrics import REGISTRY
 from flask import current_app
+from pymongo.errors import ConnectionFailure
 
-def process_csv_file(file_path):
+# Column types for efficient parsing
+MOVIE_COLUMN_TYPES = {
+    'homepage': pa.string(),
+    'original_language': pa.string(),
+    'original_title': pa.string(),
+    'overview': pa.string(),
+    'release_date': pa.string(),
+    'revenue': pa.float64(),
+    'runtime': pa.float32(),
+    'status': pa.string(),
+    'title': pa.string(),
+    'vote_average': pa.float32(),
+    'vote_count': pa.float32(),
+    'production_company_id': pa.string(),
+    'genre_id': pa.string(),
+    'languages': pa.string()
+}
+
+# Fields of a cleaned movie document, in order, with the value used when the
+# column is absent from the CSV
+MOVIE_FIELD_DEFAULTS = {
+    'homepage': '',
+    'original_language': '',
+    'original_title': '',
+    'overview': '',
+    'release_date': None,
+    'year': None,
+    'revenue': 0,
+    'runtime': 0,
+    'status': '',
+    'title': '',
+    'vote_average': 0.0,
+    'vote_count': 0,
+    'production_company_id': '',
+    'genre_id': '',
+    'languages': []
+}
+
+# append adds rows to the movies collection, replace swaps in a new dataset,
+# upsert adds new rows and updates changed ones without duplicating
+INGEST_MODES = ('append', 'replace', 'upsert')
+
+# Errors worth retrying the task for; anything else fails the same way again
+RETRYABLE_ERRORS = (ConnectionFailure,)
+
+_ISO_DATE_PATTERN = r'^[0-9]{4}-[0-9]{2}-[0-9]{2}$'
+_EMPTY_LANGUAGES = pa.scalar([], pa.list_(pa.string()))
+
+def process_csv_file(file_path, mode='append', task_id=None, streaming=False):
     """
     Process a CSV file using PyArrow and insert data into MongoDB
     
+    The file is streamed block by block through an IngestPipeline, so memory
+    use is bounded by INGEST_MAX_INFLIGHT_BATCHES rather than by the size of
+    the file, and parsing overlaps with INGEST_WRITERS concurrent inserts.
+    Files of at least INGEST_PARALLEL_MIN_BYTES are split into byte ranges
+    ingested by INGEST_PROCESSES worker processes.
+    
+    In 'replace' mode the rows are loaded into an unindexed staging
+    collection, indexes are built once at the end and the staging collection
+    is swapped in, so readers see the previous dataset until the swap.
+    In 'upsert' mode rows are keyed on a content hash, so re-importing the
+    same or an overlapping file only writes new and changed rows.
+    
+    With streaming the file is an upload still in progress: it is parsed as
+    it grows, until the upload's done marker appears.
+    
+    With a task_id, progress is checkpointed batch by batch on the task's
+    Process document (see IngestCheckpoint). Running the same task again
+    continues after the last committed batch without inserting any row
+    twice, so the file and a replace mode staging collection are left in
+    place when ingestion fails; the task removes the file once it succeeds.
+    Live progress is reported on the Process document as well (see
+    IngestProgress).
+    
     Args:
         file_path: Path to the CSV file
+        mode: One of INGEST_MODES
+        task_id: ID of the task, used to name the staging collection and
+            to checkpoint progress
+        streaming: Read the file while it is still being uploaded
         
     Returns:
         dict: Processing statistics
     """
+    staging_name = None
+    counts_name = None
+    stats_name = None
+    plan = None
     try:
         with current_app.app_context():
-            print(f"Starting to process CSV file: {file_path}")
+            print(f"Starting to process CSV file: {file_path} (mode: {mode})")
             
-            # Define column types for efficient parsing
-            column_types = {
-                'homepage': pa.string(),
-                'original_language': pa.string(),
-                'original_title': pa.string(),
-                'overview': pa.string(),
-                'release_date': pa.string(),
-                'revenue': pa.float64(),
-                'runtime': pa.float32(),
-                'status': pa.string(),
-                'title': pa.string(),
-                'vote_average': pa.float32(),
-                'vote_count': pa.float32(),
-                'production_company_id': pa.string(),
-                'genre_id': pa.string(),
-                'languages': pa.string()
-            }
-
-            # Read CSV with PyArrow for efficient processing
-            read_options = csv.ReadOptions(block_size=1024 * 1024)  # 1MB chunks
-            parse_options = csv.ParseOptions(delimiter=',')
-            convert_options = csv.ConvertOptions(column_types=column_types)
+            if mode not in INGEST_MODES:
+                raise ValueError(f"Unknown ingest mode: {mode}")
+            plan = Process.get_checkpoint(task_id) if task_id else None
+            resumed = plan is not None
+            if resumed:
+                print(f"Resuming task {task_id} from its checkpoint")
+            if mode == 'replace':
+                staging_id = task_id or uuid.uuid4().hex
+                staging_name = Movie.get_staging_collection_name(staging_id)
+                counts_name = MovieCount.get_staging_collection_name(staging_id)
+                stats_name = MovieStats.get_staging_collection_name(staging_id)
+                if not resumed:
+                    # Nothing is written before the plan is saved, so these are stale
+                    Movie.drop_staging(staging_name)
+                    MovieCount.drop_staging(counts_name)
+                    MovieStats.drop_staging(stats_name)
+                print(f"Loading into staging collection: {staging_name}")
+            elif Movie.get_collection().estimated_document_count():
+                # Counts and stats are incremental, so they must start from the current data
+                if not MovieCount.is_built():
+                    print("Building movie counts...")
+                    MovieCount.rebuild(Movie.get_collection())
+                if not MovieStats.is_built():
+                    print("Building movie stats...")
+                    MovieStats.rebuild(Movie.get_collection())
+            MovieCount.create_indexes(counts_name)
+            MovieStats.create_indexes(stats_name)
             
-            print("Reading CSV file with PyArrow...")
-            table = csv.read_csv(file_path, read_options=read_options, parse_options=parse_options, convert_options=convert_options)
+            if mode == 'upsert':
+                # The unique dedup_key index must exist before concurrent upserts
+                Movie.create_indexes()
             
-            print(f"CSV file read successfully. Total rows: {table.num_rows}")
+            processes = Config.INGEST_PROCESSES
+            if plan:
+                ranges = plan["ranges"]
+            else:
+                ranges = None
+                # A growing file can't be split into byte ranges up front
+                if not streaming and processes > 1 and os.path.getsize(file_path) >= Config.INGEST_PARALLEL_MIN_BYTES:
+                    ranges = _plan_ranges(file_path, processes)
+                if task_id:
+                    plan = new_ingest_plan(mode, ranges)
+                    Process.set_checkpoint(task_id, plan)
             
-            # Convert Arrow Table to list of dictionaries (batch processing)
-            batch_size = 1000
-            total_rows = table.num_rows
-            processed_rows = 0
-            inserted_count = 0
+            if ranges:
+                stats = _ingest_parallel(file_path, ranges, processes, collection_name=staging_name, counts_name=counts_name, stats_name=stats_name, upsert=mode == 'upsert', task_id=task_id, plan=plan)
+            else:
+                print("Streaming CSV file with PyArrow...")
+                checkpoint = IngestCheckpoint(task_id, plan) if plan else None
+                # A growing file's final size isn't known yet
+                progress = IngestProgress(task_id, total_bytes=None if streaming else os.path.getsize(file_path)) if task_id else None
+                pipeline = IngestPipeline(clean_movie_batch, collection_name=staging_name, counts_name=counts_name, stats_name=stats_name, upsert=mode == 'upsert', checkpoint=checkpoint, progress=progress)
+                batches = read_csv_batches(
+                    file_path,
+                    batch_size=plan and plan["batch_size"],
+                    block_size=plan and plan["block_size"],
+                    growing=streaming,
+                    progress=progress
+                )
+                stats = pipeline.run(batches)
             
-            for batch_start in range(0, total_rows, batch_size):
-                batch_end = min(batch_start + batch_size, total_rows)
-                batch = table.slice(batch_start, batch_end - batch_start)
-                
-                print(f"Processing batch {batch_start}-{batch_end} of {total_rows}")
-                
-                # Convert batch to Python dictionaries
-                records = batch.to_pylist()
-                
-                # Process and transform each record
-                movies = []
-                for record in records:
-                    # Clean and transform the record
-                    movie = clean_movie_record(record)
-                    if movie:  # Only add valid records
-                        movies.append(movie)
-                
-                print(f"Cleaned {len(movies)} valid records in this batch")
-                
-                # Bulk insert the batch
-                if movies:
-                    inserted = Movie.bulk_insert(movies)
-                    inserted_count += inserted
-                    print(f"Inserted {inserted} records into MongoDB")
-                
-                processed_rows += (batch_end - batch_start)
-                print(f"Progress: {processed_rows}/{total_rows} rows processed")
+            # Rows replayed after an interruption may or may not have been
+            # counted already, and a resumed upsert skips rows an interrupted
+            # attempt wrote before counting them. Concurrent upserts of the
+            # same movie can leave which version each replaced unknown.
+            rebuild = stats["replayed_count"] or (mode == 'upsert' and resumed) or stats["unattributed_count"]
+            if rebuild and not staging_name:
+                print("Rebuilding movie counts and stats...")
+                MovieCount.rebuild(Movie.get_collection())
+                MovieStats.rebuild(Movie.get_collection())
             
             # Ensure indexes are created for efficient querying
             print("Creating indexes...")
-            Movie.create_indexes()
+            Movie.create_indexes(staging_name)
+            
+            if staging_name:
+                print(f"Swapping {staging_name} in as the movies collection...")
+                Movie.swap_in(staging_name)
+                if rebuild:
+                    MovieCount.drop_staging(counts_name)
+                    MovieStats.drop_staging(stats_name)
+                    print("Rebuilding movie counts and stats...")
+                    MovieCount.rebuild(Movie.get_collection())
+                    MovieStats.rebuild(Movie.get_collection())
+                else:
+                    MovieCount.swap_in(counts_name)
+                    MovieStats.swap_in(stats_name)
+                staging_name = None
             
             result = {
                 "success": True,
-                "total_rows": total_rows,
-                "processed_rows": processed_rows,
-                "inserted_count": inserted_count
+                "total_rows": stats["total_rows"],
+                "processed_rows": stats["total_rows"],
+                "inserted_count": stats["inserted_count"],
+                "updated_count": stats["updated_count"],
+                "skipped_count": stats["skipped_count"],
+                "failed_count": stats["failed_count"],
+                "replayed_count": stats["replayed_count"],
+                "resumed": resumed,
+                "rows_per_sec": stats["rows_per_sec"]
             }
             print(f"CSV processing completed: {result}")
             return result
     
     except Exception as e:
         print(f"Error processing CSV file: {str(e)}")
+        # A checkpointed task keeps its staging collection to resume into
+        if staging_name and not plan:
+            Movie.drop_staging(staging_name)
+            MovieCount.drop_staging(counts_name)
+            MovieStats.drop_staging(stats_name)
         return {
             "success": False,
-            "error": str(e)
+            "error": str(e),
+            "retryable": isinstance(e, RETRYABLE_ERRORS)
         }
-    finally:
-        # Clean up the temporary file
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            print(f"Temporary file removed: {file_path}")
+
+def read_csv_batches(file_path, batch_size=None, block_size=None, byte_range=None, column_names=None, growing=False, progress=None):
+    """
+    Stream a CSV file as Arrow record batches
+    
+    Uses pyarrow.csv.open_csv so only one block of the file is decoded at a
+    time; each block is sliced into batches of at most batch_size rows.
+    
+    Args:
+        file_path: Path to the CSV file
+        batch_size: Maximum rows per yielded batch
+        block_size: Bytes of CSV decoded per read
+        byte_range: Optional (start, end) range of whole records to read
+        column_names: Column names for a byte_range, which has no header row
+        growing: The file is still being uploaded; keep reading until its
+            done marker appears
+        progress: IngestProgress whose bytes_read follows the reader
+        
+    Yields:
+        pyarrow.RecordBatch: The next batch of rows
+    """
+    batch_size = batch_size or Config.INGEST_BATCH_SIZE
+    read_options = csv.ReadOptions(block_size=block_size or Config.CSV_BLOCK_SIZE, column_names=column_names)
+    parse_options = csv.ParseOptions(delimiter=',', newlines_in_values=Config.CSV_NEWLINES_IN_VALUES)
+    convert_options = csv.ConvertOptions(column_types=MOVIE_COLUMN_TYPES)
+    
+    if byte_range:
+        start, end = byte_range
+        with pa.OSFile(file_path) as source:
+            stream = source.get_stream(start, end - start)
+            if progress:
+                # A sliced stream can't tell its position
+                stream = _CountingReader(stream)
+                yield from _read_batches(stream, batch_size, read_options, parse_options, convert_options, progress, lambda: stream.bytes_read)
+            else:
+                yield from _read_batches(stream, batch_size, read_options, parse_options, convert_options)
+    elif growing:
+        source = GrowingFile(file_path, stall_timeout=Config.UPLOAD_STALL_TIMEOUT)
+        with io.BufferedReader(source, buffer_size=read_options.block_size) as buffered:
+            yield from _read_batches(buffered, batch_size, read_options, parse_options, convert_options, progress, lambda: source.bytes_read)
+    else:
+        with pa.OSFile(file_path) as source:
+            yield from _read_batches(source, batch_size, read_options, parse_options, convert_options, progress, source.tell)
+
+def _read_batches(source, batch_size, read_options, parse_options, convert_options, progress=None, position=None):
+    """
+    Slice the record batches of an Arrow CSV reader into batch_size rows,
+    updating progress.bytes_read from position() after each block
+    """
+    reader = csv.open_csv(source, read_options=read_options, parse_options=parse_options, convert_options=convert_options)
+    for record_batch in reader:
+        if progress:
+            progress.bytes_read = position()
+        for offset in range(0, record_batch.num_rows, batch_size):
+            yield record_batch.slice(offset, batch_size)
+
+class _CountingReader(io.RawIOBase):
+    """Count the bytes read from a pyarrow input stream"""
+    
+    def __init__(self, stream):
+        super().__init__()
+        self._stream = stream
+        self.bytes_read = 0
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        read = self._stream.readinto(buffer)
+        self.bytes_read += read
+        return read
+
+def ingest_csv_range(file_path, byte_range, column_names, collection_name=None, counts_name=None, stats_name=None, upsert=False, task_id=None, plan=None, stream=0):
+    """
+    Parse, clean and insert one byte range of a CSV file
+    
+    Runs in a worker process of the parallel ingest pool, outside any Flask
+    app context, with its own IngestPipeline and MongoDB connection.
+    
+    Args:
+        file_path: Path to the CSV file
+        byte_range: (start, end) range of whole records
+        column_names: Column names from the file's header row
+        collection_name: Collection to load into instead of movies
+        counts_name: Collection to keep counts in instead of movie_counts
+        stats_name: Collection to keep stats in instead of movie_stats
+        upsert: Upsert on a content hash instead of inserting every row
+        task_id: Task to checkpoint the range's progress for
+        plan: The task's ingest plan, if it is checkpointed
+        stream: Index of the range in the plan
+        
+    Returns:
+        dict: Pipeline statistics for the range, plus the metrics recorded
+        while ingesting it under "metrics", for the parent process to merge
+    """
+    checkpoint = IngestCheckpoint(task_id, plan, stream=stream) if plan else None
+    progress = IngestProgress(task_id, total_bytes=byte_range[1] - byte_range[0], stream=stream) if task_id else None
+    pipeline = IngestPipeline(clean_movie_batch, collection_name=collection_name, counts_name=counts_name, stats_name=stats_name, upsert=upsert, writers=Config.INGEST_RANGE_WRITERS, checkpoint=checkpoint, progress=progress)
+    batches = read_csv_batches(
+        file_path,
+        batch_size=plan and plan["batch_size"],
+        block_size=plan and plan["block_size"],
+        byte_range=byte_range,
+        column_names=column_names,
+        progress=progress
+    )
+    stats = pipeline.run(batches)
+    stats["metrics"] = REGISTRY.drain()
+    return stats
+
+def _plan_ranges(file_path, processes):
+    """Newline-aligned byte ranges for ingesting a file with a process pool"""
+    _, header_end = read_csv_header(file_path)
+    return [list(byte_range) for byte_range in split_csv_ranges(file_path, processes, start=header_end)]
+
+def _ingest_parallel(file_path, ranges, processes, collection_name=None, counts_name=None, stats_name=None, upsert=False, task_id=None, plan=None):
+    """
+    Ingest a large CSV file by handing its byte ranges to a process pool,
+    merging the per-range statistics as ranges finish
+    
+    Each range reports its progress under progress.ranges on the task's
+    Process document; they are combined into the task's progress every
+    INGEST_PROGRESS_INTERVAL seconds.
+    """
+    column_names, _ = read_csv_header(file_path)
+    print(f"Ingesting {len(ranges)} byte ranges with {processes} processes")
+    
+    stats = {
+        "total_rows": 0,
+        "cleaned_rows": 0,
+        "inserted_count": 0,
+        "updated_count": 0,
+        "skipped_count": 0,
+        "failed_count": 0,
+        "replayed_count": 0,
+        "unattributed_count": 0
+    }
+    started = time.perf_counter()
+    progress = IngestProgress(task_id, total_bytes=sum(end - start for start, end in ranges)) if task_id else None
+    
+    # spawn avoids forking the parent's MongoClient and threads
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as pool:
+        futures = [
+            pool.submit(ingest_csv_range, file_path, tuple(byte_range), column_names, collection_name, counts_name, stats_name, upsert, task_id, plan, stream)
+            for stream, byte_range in enumerate(ranges)
+        ]
+        pending = set(futures)
+        completed = 0
+        while pending:
+            done, pending = wait(pending, timeout=Config.INGEST_PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in done:
+                range_stats = future.result()
+                REGISTRY.merge(range_stats.get("metrics"))
+                for key in stats:
+                    stats[key] += range_stats.get(key, 0)
+                completed += 1
+                print(f"Range {completed}/{len(ranges)} done: {range_stats['total_rows']} rows")
+            if progress:
+                progress.update_from_ranges(completed, len(ranges))
+    
+    elapsed = time.perf_counter() - started
+    stats["elapsed_seconds"] = round(elapsed, 3)
+    stats["rows_per_sec"] = round(stats["total_rows"] / elapsed, 1) if elapsed > 0 else 0.0
+    print(f"Ingest throughput: {stats['rows_per_sec']} rows/sec with {processes} processes")
+    return stats
 
 def clean_movie_record(record):
     """
@@ -120,20 +413,7 @@ def clean_movie_record(record):
     """
     try:
         # Extract release date and convert to proper format
-        release_date = None
-        year = None
-        
-        if record.get('release_date'):
-            try:
-                release_date_obj = datetime.strptime(str(record['release_date']), '%Y-%m-%d')
-                release_date = release_date_obj.isoformat()
-                year = release_date_obj.year
-            except ValueError:
-                # If date parsing fails, try to extract just the year
-                year_match = re.match(r'(\d{4})', str(record['release_date']))
-                if year_match:
-                    year = int(year_match.group(1))
-                    release_date = f"{year}-01-01T00:00:00"
+        release_date, year = parse_release_date(record.get('release_date'))
 
         # Build the cleaned record
         movie = {
@@ -163,6 +443,157 @@ def clean_movie_record(record):
         print(f"Error cleaning record: {str(e)}")
         return None
 
+def parse_release_date(value):
+    """
+    Parse a raw release date into an ISO timestamp and year
+    
+    Args:
+        value: Raw release_date value from the CSV
+        
+    Returns:
+        tuple: (release_date, year), both None if no year can be found
+    """
+    if not value:
+        return None, None
+    
+    try:
+        release_date_obj = datetime.strptime(str(value), '%Y-%m-%d')
+        return release_date_obj.isoformat(), release_date_obj.year
+    except ValueError:
+        # If date parsing fails, try to extract just the year
+        year_match = re.match(r'(\d{4})', str(value))
+        if year_match:
+            year = int(year_match.group(1))
+            return f"{year}-01-01T00:00:00", year
+    return None, None
+
+def clean_movie_table(batch):
+    """
+    Clean a batch of movie rows column by column with pyarrow.compute
+    
+    Well-formed YYYY-MM-DD dates are parsed with Arrow kernels; any other
+    non-empty release_date falls back to parse_release_date, so the result
+    matches clean_movie_record exactly.
+    
+    Args:
+        batch: pyarrow.RecordBatch or Table of raw CSV rows
+        
+    Returns:
+        pyarrow.Table: Cleaned columns present in the batch (release_date and
+        year only when the batch has release dates, languages always),
+        restricted to rows with a title
+    """
+    names = batch.schema.names
+    if 'title' not in names:
+        # Every row would have an empty title
+        return pa.table({'languages': pa.array([], _EMPTY_LANGUAGES.type)})
+    
+    columns = {
+        field: batch.column(field)
+        for field in MOVIE_FIELD_DEFAULTS
+        if field in names and field not in ('release_date', 'year', 'languages')
+    }
+    
+    if 'release_date' in names:
+        columns['release_date'], columns['year'] = _clean_release_dates(batch.column('release_date'))
+    
+    if 'languages' in names:
+        languages = batch.column('languages')
+        present = pc.fill_null(pc.greater(pc.utf8_length(languages), 0), False)
+        columns['languages'] = pc.if_else(present, pc.split_pattern(languages, ','), _EMPTY_LANGUAGES)
+    else:
+        columns['languages'] = pa.array([[]] * batch.num_rows, _EMPTY_LANGUAGES.type)
+    
+    keep = pc.fill_null(pc.greater(pc.utf8_length(batch.column('title')), 0), False)
+    return pa.table(columns).filter(keep)
+
+def clean_movie_batch(batch):
+    """
+    Clean and transform a batch of movie rows from CSV
+    
+    Args:
+        batch: pyarrow.RecordBatch or Table of raw CSV rows
+        
+    Returns:
+        list: Cleaned movie records, equal to applying clean_movie_record
+        to every row and dropping the rows it rejects
+    """
+    return movies_from_table(clean_movie_table(batch))
+
+def movies_from_table(table):
+    """
+    Convert a cleaned movie table into movie documents
+    
+    Args:
+        table: pyarrow.Table returned by clean_movie_table
+        
+    Returns:
+        list: Movie documents with every field in MOVIE_FIELD_DEFAULTS
+    """
+    names = table.column_names
+    columns = [
+        _to_pylist(table.column(field)) if field in names else repeat(default)
+        for field, default in MOVIE_FIELD_DEFAULTS.items()
+    ]
+    fields = list(MOVIE_FIELD_DEFAULTS)
+    return [dict(zip(fields, values)) for values in zip(*columns)]
+
+def _to_pylist(array):
+    """
+    Array.to_pylist through NumPy, which is several times faster for the
+    flat and list-of-string columns a movie table holds
+    """
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    
+    if pa.types.is_list(array.type):
+        offsets = array.offsets.to_numpy()
+        values = _to_pylist(array.flatten())
+        starts = (offsets[:-1] - offsets[0]).tolist()
+        ends = (offsets[1:] - offsets[0]).tolist()
+        lists = [values[start:end] for start, end in zip(starts, ends)]
+    elif pa.types.is_string(array.type) or not array.null_count:
+        return array.to_numpy(zero_copy_only=False).tolist()
+    else:
+        # Numeric nulls would come back as NaN, so convert filled values
+        # and put the None back afterwards
+        lists = pc.fill_null(array, 0).to_numpy(zero_copy_only=False).tolist()
+    
+    if array.null_count:
+        for index in np.flatnonzero(array.is_null().to_numpy(zero_copy_only=False)).tolist():
+            lists[index] = None
+    return lists
+
+def _clean_release_dates(raw):
+    """Vectorized parse_release_date, returning (release_date, year) arrays"""
+    if isinstance(raw, pa.ChunkedArray):
+        raw = raw.combine_chunks()
+    if not pa.types.is_string(raw.type):
+        raw = pc.cast(raw, pa.string())
+    
+    canonical = pc.fill_null(pc.match_substring_regex(raw, _ISO_DATE_PATTERN), False)
+    candidates = pc.if_else(canonical, raw, pa.scalar(None, pa.string()))
+    parsed = pc.strptime(candidates, format='%Y-%m-%d', unit='s', error_is_null=True)
+    
+    # Arrow rolls invalid days over (2010-02-30 -> 2010-03-02) and accepts
+    # year 0, so only trust values that survive a round trip
+    year_text = pc.utf8_slice_codeunits(raw, 0, 4)
+    fast = pc.and_(
+        pc.fill_null(pc.equal(pc.strftime(parsed, format='%Y-%m-%d'), raw), False),
+        pc.fill_null(pc.not_equal(year_text, '0000'), False)
+    )
+    release_date = pc.if_else(fast, pc.binary_join_element_wise(raw, 'T00:00:00', ''), pa.scalar(None, pa.string()))
+    year = pc.cast(pc.if_else(fast, year_text, pa.scalar(None, pa.string())), pa.int64())
+    
+    # Anything else that is non-empty goes through the Python parser
+    slow = pc.and_(pc.fill_null(pc.greater(pc.utf8_length(raw), 0), False), pc.invert(fast))
+    if pc.any(slow).as_py():
+        parsed_slow = [parse_release_date(value) for value in pc.filter(raw, slow).to_pylist()]
+        release_date = pc.replace_with_mask(release_date, slow, pa.array([r for r, _ in parsed_slow], pa.string()))
+        year = pc.replace_with_mask(year, slow, pa.array([y for _, y in parsed_slow], pa.int64()))
+    
+    return release_date, year
+
 def save_uploaded_file(file):
     """
     Save an uploaded file to a temporary location
@@ -0,0 +1,172 @@
+import orjson
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from app.models.movie import Movie
+from app.utils.encoding import ARROW_MIMETYPE
+
+# Export format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+    'arrow': (ARROW_MIMETYPE, 'arrows'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet')
+}
+
+# Column types of exported movies; fixed so every batch shares one schema
+MOVIE_EXPORT_TYPES = {
+    '_id': pa.string(),
+    'homepage': pa.string(),
+    'original_language': pa.string(),
+    'original_title': pa.string(),
+    'overview': pa.string(),
+    'release_date': pa.string(),
+    'year': pa.int64(),
+    'revenue': pa.float64(),
+    'runtime': pa.float64(),
+    'status': pa.string(),
+    'title': pa.string(),
+    'vote_average': pa.float64(),
+    'vote_count': pa.float64(),
+    'production_company_id': pa.string(),
+    'genre_id': pa.string(),
+    'languages': pa.list_(pa.string())
+}
+
+def export_schema(fields=None):
+    """
+    Arrow schema of an export, _id first and then fields in PROJECTABLE_FIELDS order
+
+    Args:
+        fields: Projected fields, or None for all of them
+
+    Returns:
+        pa.Schema: Export schema
+    """
+    names = ['_id'] + [field for field in Movie.PROJECTABLE_FIELDS if not fields or field in fields]
+    return pa.schema([(name, MOVIE_EXPORT_TYPES[name]) for name in names])
+
+def stream_movies_export(export_format, year=None, language=None, fields=None, batch_size=10000):
+    """
+    Encode the matching movies incrementally in an export format
+
+    Each batch read from MongoDB is encoded and handed out before the next
+    one is read: NDJSON line by line, CSV and Arrow IPC as record batches
+    and Parquet as one row group per batch. Memory use is bounded by the
+    batch size rather than the number of movies.
+
+    Args:
+        export_format: One of EXPORT_FORMATS
+        year, language: Filters as for /movies
+        fields: Projected fields, or None for all of them
+        batch_size: Movies per MongoDB batch and per encoded chunk
+
+    Yields:
+        bytes: Consecutive chunks of the encoded export
+    """
+    batches = Movie.iter_movie_batches(year, language, fields, batch_size)
+
+    if export_format == 'ndjson':
+        for movies in batches:
+            yield b"".join(orjson.dumps(movie, option=orjson.OPT_APPEND_NEWLINE) for movie in movies)
+        return
+
+    schema = export_schema(fields)
+    if export_format == 'csv':
+        # The CSV writer has no list type; languages are written comma-joined
+        schema = pa.schema([field.with_type(pa.string()) if pa.types.is_list(field.type) else field for field in schema])
+
+    sink = _ChunkSink()
+    writer = _open_writer(export_format, pa.PythonFile(sink, mode='w'), schema)
+    try:
+        for movies in batches:
+            writer.write_table(_movies_table(movies, schema))
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
+
+def _open_writer(export_format, sink, schema):
+    """Incremental Arrow writer for a format"""
+    if export_format == 'csv':
+        return pa_csv.CSVWriter(sink, schema)
+    if export_format == 'parquet':
+        return pq.ParquetWriter(sink, schema)
+    return pa.ipc.new_stream(sink, schema)
+
+def _movies_table(movies, schema):
+    """
+    Build a table with the export schema from movie documents
+
+    Documents loaded before cleaning was consistent can hold values of
+    another type (e.g. a numeric genre_id); those are coerced per column.
+    """
+    list_columns = [field.name for field in schema if field.type == pa.string() and pa.types.is_list(MOVIE_EXPORT_TYPES[field.name])]
+    arrow_schema = pa.schema([field.with_type(MOVIE_EXPORT_TYPES[field.name]) for field in schema])
+
+    try:
+        table = pa.Table.from_pylist(movies, schema=arrow_schema)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        table = pa.Table.from_pylist([_coerce_movie(movie, arrow_schema) for movie in movies], schema=arrow_schema)
+
+    for name in list_columns:
+        index = table.schema.get_field_index(name)
+        table = table.set_column(index, name, pc.binary_join(table[name], ','))
+    return table
+
+def _coerce_movie(movie, schema):
+    """Convert a movie's values to its export column types, nulling what doesn't fit"""
+    coerced = {}
+    for field in schema:
+        value = movie.get(field.name)
+        if value is None:
+            coerced[field.name] = None
+        elif pa.types.is_string(field.type):
+            coerced[field.name] = str(value)
+        elif pa.types.is_list(field.type):
+            coerced[field.name] = [str(item) for item in value] if isinstance(value, list) else [str(value)]
+        else:
+            try:
+                coerced[field.name] = int(value) if pa.types.is_integer(field.type) else float(value)
+            except (TypeError, ValueError):
+                coerced[field.name] = None
+    return coerced
+
+class _ChunkSink:
+    """
+    Write-only file object that buffers output until drained
+
+    Arrow writers only need write/tell/flush/close; tell is tracked here
+    because the Parquet writer records row group offsets from it.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def drain(self):
+        """Return and forget everything written since the last drain"""
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
@@ -0,0 +1,133 @@
+import threading
+import time
+import uuid
+from bson import ObjectId
+from pymongo.errors import PyMongoError
+from app.config import Config
+from app.models.process import Process
+
+# Pipeline counters kept in a checkpoint; total_rows is recounted on resume
+CHECKPOINT_STATS = ("cleaned_rows", "inserted_count", "updated_count", "skipped_count", "failed_count", "replayed_count")
+
+def new_ingest_plan(mode, ranges=None):
+    """
+    Everything a resumed task must reuse to see the same batches
+
+    Batch boundaries depend on the batch and block sizes and on the byte
+    ranges, so they are fixed when the task first starts rather than read
+    from the config again. id_prefix seeds the deterministic _ids.
+    """
+    seed = uuid.uuid4().bytes
+    return {
+        "mode": mode,
+        "batch_size": Config.INGEST_BATCH_SIZE,
+        "block_size": Config.CSV_BLOCK_SIZE,
+        "ranges": ranges,
+        "id_prefix": (int(time.time()).to_bytes(4, "big") + seed[:3]).hex(),
+        "streams": {}
+    }
+
+class IngestCheckpoint:
+    """
+    Batch-level progress of one input stream of an ingest task
+
+    Batches are numbered in file order. Writers commit them out of order,
+    so progress is a watermark (every batch up to it is committed) plus the
+    set of batches committed ahead of it. It is saved on the task's Process
+    document at most every INGEST_CHECKPOINT_INTERVAL seconds; a resumed
+    run skips every committed batch.
+
+    Inserted documents get _ids derived from the plan's id_prefix, the
+    stream and the row's position, so a batch that was written but not yet
+    checkpointed when the task died hits duplicate keys when it is replayed
+    instead of being inserted twice.
+    """
+
+    def __init__(self, task_id, plan, stream=0, interval=None):
+        """
+        Args:
+            task_id: Task whose Process document holds the checkpoint
+            plan: The task's ingest plan (see new_ingest_plan)
+            stream: Index of the byte range, 0 for a single stream
+            interval: Minimum seconds between saves
+        """
+        self.task_id = task_id
+        self.stream = stream
+        self.batch_size = plan["batch_size"]
+        self.interval = Config.INGEST_CHECKPOINT_INTERVAL if interval is None else interval
+        self._prefix = bytes.fromhex(plan["id_prefix"])
+        state = plan.get("streams", {}).get(str(stream), {})
+        self.watermark = state.get("watermark", -1)
+        self.ahead = set(state.get("ahead", []))
+        self.stats = {key: state.get("stats", {}).get(key, 0) for key in CHECKPOINT_STATS}
+        self.complete = state.get("complete", False)
+        self.total_rows = state.get("total_rows", 0)
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._saved_at = time.monotonic()
+        self._dirty = False
+
+    @property
+    def resumed(self):
+        return self.watermark >= 0 or bool(self.ahead)
+
+    def is_committed(self, index):
+        return index <= self.watermark or index in self.ahead
+
+    def document_id(self, index, position):
+        """Deterministic _id of the document at position in batch index"""
+        sequence = index * self.batch_size + position
+        return ObjectId(self._prefix + bytes([self.stream % 256]) + sequence.to_bytes(4, "big"))
+
+    def commit(self, index, counts, db=None):
+        """
+        Record a batch as written, saving the checkpoint if it is due
+
+        Args:
+            index: Batch number
+            counts: The batch's CHECKPOINT_STATS counters
+            db: Database to save to, for callers outside an app context
+        """
+        with self._lock:
+            for key, amount in counts.items():
+                self.stats[key] += amount
+            self.ahead.add(index)
+            while self.watermark + 1 in self.ahead:
+                self.watermark += 1
+                self.ahead.discard(self.watermark)
+            self._dirty = True
+            due = time.monotonic() - self._saved_at >= self.interval
+        if due:
+            self.save(db)
+
+    def finish(self, total_rows, db=None):
+        """Mark the whole stream as written"""
+        with self._lock:
+            self.complete = True
+            self.total_rows = total_rows
+            self._dirty = True
+        self.save(db)
+
+    def save(self, db=None):
+        """Write the checkpoint to the Process document if it changed"""
+        # One save at a time, so an older state never overwrites a newer one
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                state = {
+                    "watermark": self.watermark,
+                    "ahead": sorted(self.ahead),
+                    "stats": dict(self.stats),
+                    "complete": self.complete,
+                    "total_rows": self.total_rows
+                }
+                self._dirty = False
+                self._saved_at = time.monotonic()
+            try:
+                Process.save_stream_checkpoint(self.task_id, self.stream, state, db=db)
+            except PyMongoError as e:
+                # The next save includes this one; a lost save only costs replaying batches
+                print(f"Failed to save checkpoint for task {self.task_id}: {str(e)}")
+                with self._lock:
+                    self._dirty = True
@@ -0,0 +1,317 @@
+import threading
+import time
+from queue import Queue, Empty, Full
+from pymongo import WriteConcern
+from app.config import Config
+from app.database import get_db_connection
+from app.models.movie import Movie
+from app.models.movie_count import MovieCount
+from app.models.movie_stats import MovieStats
+from app.utils.metrics import INGEST_ROWS, INGEST_STAGE_SECONDS
+
+_END_OF_STREAM = object()
+
+# ingest_rows_total outcome for each pipeline counter
+_ROW_OUTCOMES = {
+    "total_rows": "parsed",
+    "cleaned_rows": "cleaned",
+    "inserted_count": "inserted",
+    "updated_count": "updated",
+    "skipped_count": "skipped",
+    "failed_count": "failed",
+    "replayed_count": "replayed"
+}
+
+def get_ingest_write_concern():
+    """
+    Build the write concern for ingestion from INGEST_WRITE_CONCERN_W/_J
+    
+    Returns:
+        WriteConcern or None to keep the collection default
+    """
+    w = Config.INGEST_WRITE_CONCERN_W
+    j = Config.INGEST_WRITE_CONCERN_J
+    if not w and not j:
+        return None
+    
+    options = {}
+    if w:
+        options["w"] = int(w) if w.isdigit() else w
+    if j:
+        options["j"] = j.lower() in ('1', 'true', 'yes')
+    return WriteConcern(**options)
+
+class IngestPipeline:
+    """
+    Staged parse -> clean -> insert pipeline for movie batches
+    
+    Each stage runs on its own thread and hands work to the next one through
+    a bounded queue. When MongoDB falls behind, the queues fill up and the
+    parse stage blocks, so memory stays bounded by the queue sizes.
+    
+    With an IngestCheckpoint, batches it has already committed are skipped
+    and every written batch is committed to it. With an IngestProgress, row
+    counts and the time spent in each stage are reported as batches are
+    written.
+    """
+    
+    def __init__(self, clean, collection_name=None, counts_name=None, stats_name=None, upsert=False, writers=None, queue_size=None, ordered=None, write_concern=None, max_batch_docs=None, max_batch_bytes=None, checkpoint=None, progress=None):
+        """
+        Args:
+            clean: Function turning a record batch into a list of movie documents
+            collection_name: Collection to load into instead of movies
+            counts_name: Collection to keep counts in instead of movie_counts
+            stats_name: Collection to keep stats in instead of movie_stats
+            upsert: Upsert on a content hash instead of inserting every row
+            writers: Number of concurrent bulk writer threads
+            queue_size: Maximum batches buffered between two stages
+            ordered: Use ordered inserts (defaults to INGEST_ORDERED_INSERTS;
+                always unordered with a checkpoint)
+            write_concern: WriteConcern for inserts (defaults to get_ingest_write_concern())
+            max_batch_docs: Maximum documents per insert_many call
+            max_batch_bytes: Maximum BSON bytes per insert_many call
+            checkpoint: IngestCheckpoint to resume from and record progress in
+            progress: IngestProgress to report live progress to
+        """
+        self.clean = clean
+        self.collection_name = collection_name
+        self.counts_name = counts_name
+        self.stats_name = stats_name
+        self.upsert = upsert
+        self.writers = max(1, writers or Config.INGEST_WRITERS)
+        self.queue_size = max(1, queue_size or Config.INGEST_MAX_INFLIGHT_BATCHES)
+        self.ordered = Config.INGEST_ORDERED_INSERTS if ordered is None else ordered
+        if checkpoint and not upsert:
+            # A replayed batch may hit a duplicate _id part way through; an
+            # ordered insert would stop there and drop the rows after it
+            self.ordered = False
+        self.write_concern = write_concern if write_concern is not None else get_ingest_write_concern()
+        self.max_batch_docs = max_batch_docs or Config.INGEST_MAX_BATCH_DOCS
+        self.max_batch_bytes = max_batch_bytes if max_batch_bytes is not None else Config.INGEST_MAX_BATCH_BYTES
+        self.stats = {
+            "total_rows": 0,
+            "cleaned_rows": 0,
+            "inserted_count": 0,
+            "updated_count": 0,
+            "skipped_count": 0,
+            "failed_count": 0,
+            "replayed_count": 0,
+            # Upserts whose previous version is unknown (see Movie.bulk_upsert)
+            "unattributed_count": 0
+        }
+        self.checkpoint = checkpoint
+        if checkpoint:
+            self.stats.update(checkpoint.stats)
+            if checkpoint.complete:
+                self.stats["total_rows"] = checkpoint.total_rows
+        self.progress = progress
+        # Seconds spent in each stage, summed across writer threads
+        self.stage_seconds = {"parse": 0.0, "clean": 0.0, "write": 0.0}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._errors = []
+    
+    def run(self, batches):
+        """
+        Run the pipeline over an iterable of record batches
+        
+        Args:
+            batches: Iterable of pyarrow record batches
+            
+        Returns:
+            dict: Row counts, elapsed seconds and end-to-end rows/sec
+        """
+        if self.checkpoint and self.checkpoint.complete:
+            print("Every batch was already written before the task was interrupted")
+            self.stats["elapsed_seconds"] = 0.0
+            self.stats["rows_per_sec"] = 0.0
+            return self.stats
+        
+        parsed = Queue(maxsize=self.queue_size)
+        cleaned = Queue(maxsize=self.queue_size)
+        
+        # One client for the run; each writer checks out its own pooled connection
+        mongo_client, db = get_db_connection(maxPoolSize=self.writers)
+        
+        threads = [
+            threading.Thread(target=self._stage, args=(self._parse, batches, parsed), name="ingest-parse"),
+            threading.Thread(target=self._stage, args=(self._clean, parsed, cleaned), name="ingest-clean")
+        ]
+        threads += [
+            threading.Thread(target=self._stage, args=(self._write, cleaned, db), name=f"ingest-write-{i}")
+            for i in range(self.writers)
+        ]
+        
+        started = time.perf_counter()
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            if self.checkpoint:
+                if self._errors:
+                    self.checkpoint.save(db)
+                else:
+                    self.checkpoint.finish(self.stats["total_rows"], db)
+            if self.progress:
+                self.progress.update(self.stats, self.stage_seconds, db=db, final=True)
+        finally:
+            mongo_client.close()
+        
+        if self._errors:
+            raise self._errors[0]
+        
+        elapsed = time.perf_counter() - started
+        self.stats["elapsed_seconds"] = round(elapsed, 3)
+        self.stats["rows_per_sec"] = round(self.stats["total_rows"] / elapsed, 1) if elapsed > 0 else 0.0
+        print(f"Ingest throughput: {self.stats['rows_per_sec']} rows/sec with {self.writers} writers")
+        return self.stats
+    
+    def _stage(self, target, source, sink):
+        """Run one stage, stopping the whole pipeline if it fails"""
+        try:
+            target(source, sink)
+        except Exception as e:
+            self._errors.append(e)
+            self._stop.set()
+    
+    def _parse(self, batches, parsed):
+        try:
+            for index, batch in enumerate(self._timed(batches, "parse")):
+                if self.checkpoint and self.checkpoint.is_committed(index):
+                    self._count("total_rows", batch.num_rows)
+                    continue
+                if not self._put(parsed, (index, batch)):
+                    return
+                self._count("total_rows", batch.num_rows)
+            self._put(parsed, _END_OF_STREAM)
+        finally:
+            close = getattr(batches, "close", None)
+            if close:
+                close()
+    
+    def _clean(self, parsed, cleaned):
+        while True:
+            batch = self._get(parsed)
+            if batch is None:
+                return
+            if batch is _END_OF_STREAM:
+                self._put(cleaned, _END_OF_STREAM)
+                return
+            
+            index, batch = batch
+            started = time.perf_counter()
+            movies = self.clean(batch)
+            if self.checkpoint and not self.upsert:
+                for position, movie in enumerate(movies):
+                    movie["_id"] = self.checkpoint.document_id(index, position)
+            elapsed = time.perf_counter() - started
+            self._time("clean", elapsed)
+            INGEST_STAGE_SECONDS.observe(elapsed, stage="clean")
+            self._count("cleaned_rows", len(movies))
+            print(f"Cleaned {len(movies)} valid records of {batch.num_rows} rows")
+            # Empty batches still go to a writer to be committed to the checkpoint
+            if (movies or self.checkpoint) and not self._put(cleaned, (index, movies)):
+                return
+    
+    def _write(self, cleaned, db):
+        while True:
+            movies = self._get(cleaned)
+            if movies is None:
+                return
+            if movies is _END_OF_STREAM:
+                # Pass the end marker on to the remaining writers
+                self._put(cleaned, _END_OF_STREAM)
+                return
+            
+            index, movies = movies
+            started = time.perf_counter()
+            replayed = 0
+            if self.upsert:
+                result = Movie.bulk_upsert(movies, write_concern=self.write_concern, db=db, name=self.collection_name)
+                self._count("updated_count", result["updated"])
+                self._count("skipped_count", result["skipped"])
+                if result["unattributed"]:
+                    with self._lock:
+                        self.stats["unattributed_count"] += result["unattributed"]
+                print(f"Upserted {result['inserted']} new and {result['updated']} changed records, skipped {result['skipped']} unchanged")
+            else:
+                result = Movie.bulk_load(
+                    movies,
+                    ordered=self.ordered,
+                    write_concern=self.write_concern,
+                    max_batch_docs=self.max_batch_docs,
+                    max_batch_bytes=self.max_batch_bytes,
+                    db=db,
+                    name=self.collection_name
+                )
+                if self.checkpoint:
+                    # Duplicate _ids are rows an interrupted attempt already wrote
+                    replayed = result["duplicates"]
+                print(f"Inserted {result['inserted']} records into MongoDB ({result['failed'] - replayed} failed, {replayed} already written)")
+            inserted_at = time.perf_counter()
+            INGEST_STAGE_SECONDS.observe(inserted_at - started, stage="insert")
+            self._count("inserted_count", result["inserted"] + replayed)
+            self._count("failed_count", result["failed"] - replayed)
+            self._count("replayed_count", replayed)
+            # Updated rows move from the previous version's figures to the new one's
+            added = result["inserted_documents"] + result.get("updated_documents", [])
+            removed = result.get("previous_documents", [])
+            MovieCount.increment(added, db=db, name=self.counts_name, removed=removed)
+            MovieStats.increment(added, db=db, name=self.stats_name, removed=removed)
+            INGEST_STAGE_SECONDS.observe(time.perf_counter() - inserted_at, stage="counts")
+            if self.checkpoint:
+                self.checkpoint.commit(index, {
+                    "cleaned_rows": len(movies),
+                    "inserted_count": result["inserted"] + replayed,
+                    "updated_count": result.get("updated", 0),
+                    "skipped_count": result.get("skipped", 0),
+                    "failed_count": result["failed"] - replayed,
+                    "replayed_count": replayed
+                }, db=db)
+            self._time("write", time.perf_counter() - started)
+            if self.progress:
+                self.progress.update(self.stats, self.stage_seconds, db=db)
+    
+    def _count(self, key, amount):
+        with self._lock:
+            self.stats[key] += amount
+        INGEST_ROWS.inc(amount, outcome=_ROW_OUTCOMES[key])
+    
+    def _time(self, stage, seconds):
+        with self._lock:
+            self.stage_seconds[stage] += seconds
+    
+    def _timed(self, iterable, stage):
+        """Iterate, adding the time spent producing each item to a stage"""
+        iterator = iter(iterable)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                elapsed = time.perf_counter() - started
+                self._time(stage, elapsed)
+                INGEST_STAGE_SECONDS.observe(elapsed, stage=stage)
+            yield item
+    
+    def _put(self, queue, item):
+        """Put an item on a bounded queue, giving up once the pipeline stops"""
+        while not self._stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+    
+    def _get(self, queue):
+        """Take an item from a queue, returning None once the pipeline stops"""
+        while not self._stop.is_set():
+            try:
+                return queue.get(timeout=0.1)
+            except Empty:
+                continue
+        return None
@@ -0,0 +1,209 @@
+import json
+import threading
+import time
+import redis
+from pymongo.errors import PyMongoError
+from app.config import Config
+from app.database import get_redis_client
+from app.models.process import Process
+
+# Process statuses after which a task publishes nothing more
+TERMINAL_STATUSES = ('completed', 'failed')
+
+# Summed across streams for the progress of a parallel ingest
+_ADDITIVE_FIELDS = ("rows_parsed", "rows_cleaned", "rows_inserted", "bytes_read")
+
+def process_channel(task_id):
+    """Redis pub/sub channel carrying a task's events"""
+    return f"{Config.PROCESS_EVENTS_CHANNEL}:{task_id}"
+
+def publish_process_event(task_id, event):
+    """
+    Publish an event about a task to its subscribers
+
+    Events are a dict with a type: "progress" carries a progress document,
+    "status" a new Process status. Publishing is best effort; the Process
+    document stays the source of truth.
+    """
+    try:
+        get_redis_client().publish(process_channel(task_id), json.dumps(dict(event, task_id=task_id), default=str))
+    except redis.RedisError as e:
+        print(f"Failed to publish event for task {task_id}: {str(e)}")
+
+def publish_status(task_id, status, **fields):
+    """Publish a Process status change"""
+    publish_process_event(task_id, dict(fields, type="status", status=status))
+
+class IngestProgress:
+    """
+    Live progress of an ingest, saved on the task's Process document and
+    published to its channel
+
+    The pipeline calls update after every batch; at most one update per
+    INGEST_PROGRESS_INTERVAL seconds reaches MongoDB and Redis. A stream of
+    a parallel ingest saves under progress.ranges.<stream> without
+    publishing, and the parent combines the streams with update_from_ranges.
+    """
+
+    def __init__(self, task_id, total_bytes=None, stream=None, interval=None):
+        """
+        Args:
+            task_id: Task whose Process document receives the progress
+            total_bytes: Bytes to read, if known, for the percentage and ETA
+            stream: Index of the byte range for one stream of a parallel ingest
+            interval: Minimum seconds between updates
+        """
+        self.task_id = task_id
+        self.total_bytes = total_bytes
+        self.stream = stream
+        self.interval = Config.INGEST_PROGRESS_INTERVAL if interval is None else interval
+        # Set by read_csv_batches as it consumes the file
+        self.bytes_read = 0
+        self._started = time.monotonic()
+        self._reported_at = None
+        self._lock = threading.Lock()
+
+    def update(self, stats, stage_seconds, db=None, final=False):
+        """
+        Save and publish progress if an update is due
+
+        Args:
+            stats: The pipeline's row counters
+            stage_seconds: Seconds spent in each pipeline stage
+            db: Database to save to, for callers outside an app context
+            final: Report even if the last update was too recent
+        """
+        now = time.monotonic()
+        with self._lock:
+            if not final and self._reported_at is not None and now - self._reported_at < self.interval:
+                return
+            self._reported_at = now
+
+        progress = {
+            "rows_parsed": stats["total_rows"],
+            "rows_cleaned": stats["cleaned_rows"],
+            "rows_inserted": stats["inserted_count"],
+            "bytes_read": self.bytes_read,
+            "stage_seconds": {stage: round(seconds, 3) for stage, seconds in stage_seconds.items()}
+        }
+        progress.update(self._rates(progress, now))
+        if self.stream is None:
+            self._save(progress, db)
+        else:
+            self._save({f"ranges.{self.stream}": progress}, db, publish=False)
+
+    def update_from_ranges(self, ranges_completed, ranges_total, db=None):
+        """Combine the saved progress of each stream into the task's progress"""
+        try:
+            streams = Process.get_progress(self.task_id, db).get("ranges", {}).values()
+        except PyMongoError as e:
+            print(f"Failed to read progress for task {self.task_id}: {str(e)}")
+            return
+        progress = {field: sum(stream.get(field, 0) for stream in streams) for field in _ADDITIVE_FIELDS}
+        stage_seconds = {}
+        for stream in streams:
+            for stage, seconds in stream.get("stage_seconds", {}).items():
+                stage_seconds[stage] = round(stage_seconds.get(stage, 0) + seconds, 3)
+        progress["stage_seconds"] = stage_seconds
+        progress["ranges_completed"] = ranges_completed
+        progress["ranges_total"] = ranges_total
+        self.bytes_read = progress["bytes_read"]
+        progress.update(self._rates(progress, time.monotonic()))
+        self._save(progress, db)
+
+    def _rates(self, progress, now):
+        elapsed = now - self._started
+        rates = {
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_sec": round(progress["rows_parsed"] / elapsed, 1) if elapsed > 0 else 0.0,
+            "bytes_total": self.total_bytes,
+            "percent": None,
+            "eta_seconds": None
+        }
+        if self.total_bytes:
+            rates["percent"] = round(min(100.0, 100.0 * progress["bytes_read"] / self.total_bytes), 1)
+            if progress["bytes_read"] and elapsed > 0:
+                remaining = max(0, self.total_bytes - progress["bytes_read"])
+                rates["eta_seconds"] = round(remaining / (progress["bytes_read"] / elapsed), 1)
+        return rates
+
+    def _save(self, progress, db, publish=True):
+        try:
+            Process.update_progress(self.task_id, progress, db=db)
+        except PyMongoError as e:
+            print(f"Failed to save progress for task {self.task_id}: {str(e)}")
+        if publish:
+            publish_process_event(self.task_id, {"type": "progress", "progress": progress})
+
+def stream_process_events(task_id, heartbeat=None):
+    """
+    Server-Sent Events for a task, until it completes or fails
+
+    Starts with a snapshot of the Process document, then relays the task's
+    published events. Whenever heartbeat seconds pass without one, the
+    Process document is read again: a snapshot is sent if it changed (an
+    event may have been missed), a keep-alive comment otherwise. Without
+    Redis this degrades to polling MongoDB every heartbeat seconds.
+
+    Yields:
+        str: SSE frames
+    """
+    heartbeat = heartbeat or Config.PROCESS_EVENTS_HEARTBEAT
+    # Subscribe before reading the snapshot so no event falls in between
+    pubsub = None
+    try:
+        pubsub = get_redis_client().pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(process_channel(task_id))
+    except redis.RedisError as e:
+        print(f"Process events unavailable, polling MongoDB instead: {str(e)}")
+        pubsub = None
+
+    try:
+        snapshot = _process_snapshot(task_id)
+        yield _sse_frame("snapshot", snapshot)
+        deadline = time.monotonic() + heartbeat
+        while snapshot["status"] not in TERMINAL_STATUSES:
+            message = None
+            if pubsub:
+                try:
+                    message = pubsub.get_message(timeout=max(0.0, deadline - time.monotonic()))
+                except redis.RedisError as e:
+                    print(f"Process events unavailable, polling MongoDB instead: {str(e)}")
+                    pubsub = None
+            else:
+                time.sleep(max(0.0, deadline - time.monotonic()))
+
+            if message:
+                event = json.loads(message["data"])
+                yield _sse_frame(event["type"], event)
+                if event["type"] == "status":
+                    snapshot["status"] = event["status"]
+                deadline = time.monotonic() + heartbeat
+                continue
+            if time.monotonic() < deadline:
+                continue
+
+            latest = _process_snapshot(task_id)
+            if latest != snapshot:
+                yield _sse_frame("snapshot", latest)
+            else:
+                yield ": keep-alive\n\n"
+            snapshot = latest
+            deadline = time.monotonic() + heartbeat
+    finally:
+        if pubsub:
+            pubsub.close()
+
+def _process_snapshot(task_id):
+    process = Process.get_process_by_task_id(task_id) or {}
+    return {
+        "type": "snapshot",
+        "task_id": task_id,
+        "status": process.get("status", "failed"),
+        "progress": process.get("progress"),
+        "result": process.get("result"),
+        "last_error": process.get("last_error")
+    }
+
+def _sse_frame(event_type, data):
+    return f"event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
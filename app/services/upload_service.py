@@ -0,0 +1,130 @@
+import os
+import uuid
+import zlib
+import zstandard
+from flask import current_app
+from app.models.upload import Upload
+from app.utils.growing_file import mark_aborted, mark_done
+
+# Content-Encoding values accepted for upload bodies
+UPLOAD_ENCODINGS = ('identity', 'gzip', 'zstd')
+
+def create_upload(mode, filename=None):
+    """
+    Start a resumable upload, creating its empty file in UPLOAD_FOLDER
+
+    Args:
+        mode: Ingest mode for the upload's task
+        filename: Client file name, kept as a suffix for readability
+
+    Returns:
+        dict: The Upload document
+    """
+    upload_id = uuid.uuid4().hex
+    name = os.path.basename(filename or 'upload.csv')
+    file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"{upload_id}_{name}")
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    open(file_path, 'wb').close()
+    return Upload.create_upload(upload_id, file_path, mode)
+
+def append_upload(upload, stream, offset, encoding='identity', complete=False, enqueue=None):
+    """
+    Stream a request body onto the end of an upload's file
+
+    The body is read and decompressed incrementally and written straight to
+    the upload's final location in UPLOAD_CHUNK_SIZE chunks, each fsynced
+    before the Upload's offset moves past it. Anything after offset is
+    first truncated away, so a chunk interrupted mid-write is simply resent.
+    Once the first chunk is durable enqueue is called, so the worker can
+    start parsing while the rest arrives.
+
+    Args:
+        upload: Upload document
+        stream: File-like request body
+        offset: Byte offset the body starts at (the Upload's durable offset)
+        encoding: One of UPLOAD_ENCODINGS; each request body is compressed
+            on its own
+        complete: This is the last part of the upload
+        enqueue: Callable taking the file path and returning a task ID
+
+    Returns:
+        dict: The updated Upload document
+
+    Raises:
+        ValueError: If the encoding is unknown or the body can't be decompressed
+    """
+    decompress, flush = _decompressor(encoding)
+    chunk_size = current_app.config['UPLOAD_CHUNK_SIZE']
+    file_path = upload["file_path"]
+    task_id = upload.get("task_id")
+
+    with open(file_path, 'r+b') as target:
+        target.truncate(offset)
+        target.seek(offset)
+
+        pending = []
+        pending_size = 0
+        while True:
+            raw = stream.read(chunk_size)
+            try:
+                data = decompress(raw) if raw else flush()
+            except zlib.error as e:
+                raise ValueError(f"Invalid gzip body: {str(e)}")
+            except zstandard.ZstdError as e:
+                raise ValueError(f"Invalid zstd body: {str(e)}")
+            if data:
+                pending.append(data)
+                pending_size += len(data)
+
+            if pending_size >= chunk_size or (pending_size and not raw):
+                target.write(b"".join(pending))
+                target.flush()
+                os.fsync(target.fileno())
+                offset += pending_size
+                pending = []
+                pending_size = 0
+                if task_id is None and enqueue:
+                    task_id = enqueue(file_path)
+                Upload.advance(upload["upload_id"], offset, task_id)
+
+            if not raw:
+                break
+
+    if not complete:
+        return Upload.get_upload(upload["upload_id"])
+
+    if task_id is None and enqueue:
+        task_id = enqueue(file_path)
+        Upload.advance(upload["upload_id"], offset, task_id)
+    mark_done(file_path)
+    return Upload.complete(upload["upload_id"])
+
+def abandon_upload(upload_id):
+    """
+    Drop an upload whose request failed and won't be resumed
+
+    If nothing was queued yet the file is removed. Once a task has been
+    queued the file is marked aborted instead, so the worker reading it
+    fails straight away rather than waiting out UPLOAD_STALL_TIMEOUT; the
+    file is kept with the failed task like any other.
+    """
+    upload = Upload.get_upload(upload_id)
+    if not upload:
+        return
+    if upload["task_id"]:
+        mark_aborted(upload["file_path"])
+    elif os.path.exists(upload["file_path"]):
+        os.remove(upload["file_path"])
+    Upload.abort(upload_id)
+
+def _decompressor(encoding):
+    """(decompress, flush) functions for a Content-Encoding"""
+    if encoding == 'gzip':
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        return decompressor.decompress, decompressor.flush
+    if encoding == 'zstd':
+        decompressor = zstandard.ZstdDecompressor().decompressobj()
+        return decompressor.decompress, decompressor.flush
+    if encoding in (None, '', 'identity'):
+        return (lambda data: data), (lambda: b"")
+    raise ValueError(f"Content-Encoding must be one of: {', '.join(UPLOAD_ENCODINGS)}")
@@ -1,7 +1,16 @@
 import os
+import time
 import uuid
+import zmq
+from flask import current_app
 from app.services.csv_service import process_csv_file
+from app.services.cache_service import bump_dataset_generation
+from app.services.cache_warmer import warm_movies_cache
 from app.models.process import Process
+from app.models.task_queue import TaskQueue
+from app.services.progress_service import publish_status
+from app.utils.growing_file import aborted_marker, done_marker
+from app.zmq_instance import get_push_socket
 
 def serialize_task(task_name, **kwargs):
     """
@@ -13,24 +22,93 @@ def serialize_task(task_name, **kwargs):
     return {
         'task_id': task_id,
         'task': task_name,
-        'kwargs': kwargs
+        'kwargs': kwargs,
+        'queued_at': time.time()
     }, task_id
 
-def process_csv_task(file_path,task_id):
+def enqueue_task(task_name, **kwargs):
+    """
+    Store a task in the TaskQueue and wake the worker pool
+
+    The ZeroMQ message is only a wake-up: the task is already durable, and
+    the worker pool also polls the queue, so it is dropped rather than
+    blocking when the worker is down.
+
+    Returns:
+        str: The task ID
+    """
+    task_data, task_id = serialize_task(task_name, **kwargs)
+    TaskQueue.enqueue(task_data)
+    _wake_workers(task_id)
+    return task_id
+
+def resume_task(task_id):
+    """
+    Queue a dead-lettered task again
+
+    A CSV task continues from its last checkpoint, with its original file.
+
+    Returns:
+        dict: The task's Process document, or None if it doesn't exist
+
+    Raises:
+        ValueError: If the task isn't dead-lettered, its file is gone or its
+            upload was aborted
+    """
+    process = Process.get_process_by_task_id(task_id)
+    if not process:
+        return None
+    entry = TaskQueue.get_collection().find_one({"task_id": task_id})
+    if not entry or entry["status"] != "dead":
+        raise ValueError("Only failed tasks can be resumed")
+    file_path = entry["task"].get("kwargs", {}).get("file_path")
+    if file_path and not os.path.exists(file_path):
+        raise ValueError("The task's file no longer exists")
+    if file_path and os.path.exists(aborted_marker(file_path)):
+        raise ValueError("The task's upload was aborted")
+
+    if not TaskQueue.requeue(task_id):
+        raise ValueError("Only failed tasks can be resumed")
+    Process.mark_resumed(task_id)
+    publish_status(task_id, "pending")
+    _wake_workers(task_id)
+    return Process.get_process_by_task_id(task_id)
+
+def _wake_workers(task_id):
+    try:
+        get_push_socket().send_json({'task_id': task_id}, flags=zmq.NOBLOCK)
+    except zmq.Again:
+        pass
+
+def process_csv_task(file_path,task_id, mode='append', streaming=False):
     """
     Process a CSV file and return the results
+    
+    streaming is set for uploads still in progress when the task is queued.
+    The file is kept for retries and resumes; cleanup_csv_task removes it.
     """
     try:
-        Process.update_status( 'processing' , task_id)
-        result = process_csv_file(file_path)
-        
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        result = process_csv_file(file_path, mode=mode, task_id=task_id, streaming=streaming)
+        if result.get('success'):
+            generation = bump_dataset_generation()
+            if generation is not None and current_app.config['CACHE_WARM_ENABLED']:
+                try:
+                    result['cache_warm'] = warm_movies_cache(generation)
+                except Exception as e:
+                    print(f"Cache warming failed: {str(e)}")
+        Process.update_result(task_id, result)
         return result
     except Exception as e:
+        return {'success': False, 'error': str(e)}
 
-        Process.update_status( 'failed' , task_id)
+def cleanup_csv_task(file_path, task_id=None, **kwargs):
+    """Remove a CSV task's file once the task has succeeded"""
+    for path in (file_path, done_marker(file_path)):
+        if os.path.exists(path):
+            os.remove(path)
+            print(f"Temporary file removed: {path}")
 
-        if os.path.exists(file_path):
-            os.remove(file_path)
-        return {'success': False, 'error': str(e)}
+# Task name -> (function, cleanup run once the task has succeeded)
+TASKS = {
+    'process_csv_task': (process_csv_task, cleanup_csv_task),
+}
@@ -0,0 +1,95 @@
+import csv
+import io
+import os
+
+SCAN_CHUNK_SIZE = 16 * 1024 * 1024
+
+def read_csv_header(file_path):
+    """
+    Read the header row of a CSV file
+    
+    Args:
+        file_path: Path to the CSV file
+        
+    Returns:
+        tuple: (column names, byte offset where the first data row starts)
+    """
+    with open(file_path, 'rb') as f:
+        header_end = _next_record_boundary(f, 0, 0)
+        f.seek(0)
+        header = f.read(header_end).decode('utf-8-sig')
+    
+    column_names = next(csv.reader(io.StringIO(header)), [])
+    return column_names, header_end
+
+def split_csv_ranges(file_path, parts, start=0):
+    """
+    Split a CSV file into byte ranges that each hold whole records
+    
+    Boundaries are placed on the first newline after each evenly spaced
+    target offset that is outside a quoted field, so quoted values that
+    contain newlines are never cut in half. Quote parity is tracked with
+    bytes.count over large chunks, which keeps the scan close to disk speed.
+    
+    Args:
+        file_path: Path to the CSV file
+        parts: Number of ranges to aim for
+        start: Offset of the first record, e.g. the end of the header
+        
+    Returns:
+        list: (start, end) byte ranges covering [start, file size); may hold
+        fewer than parts ranges for small files
+    """
+    size = os.path.getsize(file_path)
+    if size <= start:
+        return []
+    
+    boundaries = [start]
+    with open(file_path, 'rb') as f:
+        for part in range(1, max(1, parts)):
+            target = start + (size - start) * part // parts
+            if target <= boundaries[-1]:
+                continue
+            boundary = _next_record_boundary(f, boundaries[-1], target)
+            if boundary >= size:
+                break
+            boundaries.append(boundary)
+    boundaries.append(size)
+    
+    return [(begin, end) for begin, end in zip(boundaries, boundaries[1:]) if end > begin]
+
+def _next_record_boundary(f, record_start, target):
+    """
+    Offset just past the first unquoted newline at or after target
+    
+    record_start must itself be a record boundary; quotes are counted from
+    there to know whether target falls inside a quoted field.
+    
+    Returns:
+        int: Offset of the next record, or the file size if there is none
+    """
+    f.seek(record_start)
+    quotes = 0
+    position = record_start
+    
+    while True:
+        chunk = f.read(SCAN_CHUNK_SIZE)
+        if not chunk:
+            return position
+        
+        search_from = max(0, target - position)
+        if search_from < len(chunk):
+            quotes += chunk.count(b'"', 0, search_from)
+            counted = search_from
+            newline = chunk.find(b'\n', search_from)
+            while newline != -1:
+                quotes += chunk.count(b'"', counted, newline)
+                counted = newline
+                if quotes % 2 == 0:
+                    return position + newline + 1
+                newline = chunk.find(b'\n', newline + 1)
+            quotes += chunk.count(b'"', counted)
+        else:
+            quotes += chunk.count(b'"')
+        
+        position += len(chunk)
@@ -0,0 +1,69 @@
+import msgpack
+import orjson
+import pyarrow as pa
+from flask import Response, request
+from app.utils.metrics import RESPONSE_ENCODE_SECONDS
+
+JSON_MIMETYPE = "application/json"
+MSGPACK_MIMETYPE = "application/msgpack"
+ARROW_MIMETYPE = "application/vnd.apache.arrow.stream"
+
+# Accept values understood by encoded_response; JSON wins on ties and */*
+RESPONSE_FORMATS = (JSON_MIMETYPE, MSGPACK_MIMETYPE, "application/x-msgpack", ARROW_MIMETYPE)
+DOCUMENT_FORMATS = (JSON_MIMETYPE, MSGPACK_MIMETYPE, "application/x-msgpack")
+
+def negotiate_format(formats=RESPONSE_FORMATS):
+    """
+    Pick the response encoding from the request's Accept header
+
+    Args:
+        formats: Mimetypes the endpoint can produce
+
+    Returns:
+        str: The chosen mimetype, JSON if nothing acceptable matches
+    """
+    best = request.accept_mimetypes.best_match(formats, default=JSON_MIMETYPE)
+    return MSGPACK_MIMETYPE if best == "application/x-msgpack" else best
+
+def encode(result, mimetype, records_key="movies"):
+    """
+    Serialize a response body
+
+    JSON goes through orjson, MessagePack through msgpack. Arrow IPC
+    writes result[records_key] as a record batch stream, with the remaining
+    keys (page, totals, next_cursor...) as JSON in the schema metadata
+    under b"response".
+
+    Args:
+        result: Response dict
+        mimetype: One of JSON_MIMETYPE, MSGPACK_MIMETYPE, ARROW_MIMETYPE
+        records_key: Key holding the list of documents (Arrow only)
+
+    Returns:
+        bytes: Encoded body
+    """
+    if mimetype == MSGPACK_MIMETYPE:
+        return msgpack.packb(result, use_bin_type=True)
+    if mimetype == ARROW_MIMETYPE:
+        table = pa.Table.from_pylist(result[records_key])
+        metadata = {k: v for k, v in result.items() if k != records_key}
+        table = table.replace_schema_metadata({b"response": orjson.dumps(metadata)})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    return orjson.dumps(result)
+
+def encoded_response(result, status=200, formats=RESPONSE_FORMATS, records_key="movies"):
+    """
+    Build a Flask response encoded as negotiated with the client
+
+    Returns:
+        Response: Encoded response with Vary: Accept set
+    """
+    mimetype = negotiate_format(formats)
+    with RESPONSE_ENCODE_SECONDS.time(format=mimetype):
+        body = encode(result, mimetype, records_key)
+    response = Response(body, status=status, mimetype=mimetype)
+    response.vary.add("Accept")
+    return response
@@ -0,0 +1,81 @@
+import io
+import os
+import time
+
+DONE_SUFFIX = ".done"
+ABORTED_SUFFIX = ".aborted"
+
+class UploadAborted(Exception):
+    """The upload a GrowingFile is reading was abandoned before it completed"""
+
+def done_marker(file_path):
+    """Path of the marker file created once an upload to file_path is complete"""
+    return file_path + DONE_SUFFIX
+
+def mark_done(file_path):
+    """Signal readers of file_path that no more data will be appended"""
+    with open(done_marker(file_path), 'wb') as marker:
+        os.fsync(marker.fileno())
+
+def aborted_marker(file_path):
+    """Path of the marker file created when an upload to file_path is abandoned"""
+    return file_path + ABORTED_SUFFIX
+
+def mark_aborted(file_path):
+    """Signal readers of file_path that the upload failed and won't be completed"""
+    with open(aborted_marker(file_path), 'wb') as marker:
+        os.fsync(marker.fileno())
+
+class GrowingFile(io.RawIOBase):
+    """
+    Read a file that is still being uploaded
+
+    Reads block at end of file until more data is appended or the upload's
+    done marker appears, so a parser can consume an upload while it is
+    still arriving. The uploader must fsync its data before creating the
+    marker; after seeing the marker one more read picks up anything
+    appended in between. If the aborted marker appears instead, reading
+    fails with UploadAborted rather than waiting out stall_timeout.
+    """
+
+    def __init__(self, file_path, poll_interval=0.2, stall_timeout=300):
+        """
+        Args:
+            file_path: File being written
+            poll_interval: Seconds between checks for new data
+            stall_timeout: Seconds without new data before giving up
+        """
+        super().__init__()
+        self.file_path = file_path
+        self.poll_interval = poll_interval
+        self.stall_timeout = stall_timeout
+        self._file = open(file_path, 'rb')
+        # Bytes handed to the reader so far
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        waited = 0.0
+        while True:
+            read = self._file.readinto(buffer)
+            if not read and os.path.exists(done_marker(self.file_path)):
+                # Last read: 0 is end of file
+                read = self._file.readinto(buffer) or 0
+                self.bytes_read += read
+                return read
+            if read:
+                self.bytes_read += read
+                return read
+            if os.path.exists(aborted_marker(self.file_path)):
+                raise UploadAborted(f"Upload to {self.file_path} was aborted")
+            if waited >= self.stall_timeout:
+                raise TimeoutError(f"No data appended to {self.file_path} for {self.stall_timeout} seconds")
+            time.sleep(self.poll_interval)
+            waited += self.poll_interval
+
+    def close(self):
+        if not self.closed:
+            self._file.close()
+        super().close()
@@ -0,0 +1,305 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app.config import Config
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; Prometheus client defaults
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TASK_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+# Returned by Histogram.time when metrics are off, so a disabled span costs one call
+_NULL_SPAN = nullcontext()
+
+class _Metric:
+    """A named metric with one value per combination of label values"""
+
+    kind = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self):
+        """(suffix, labels, value) for every sample of the metric"""
+        with self._lock:
+            return [("", dict(zip(self.labelnames, key)), value) for key, value in self._values.items()]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts, the last one for +Inf; made cumulative on render
+                state = self._values[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            state["counts"][index] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    def time(self, **labels):
+        """Context manager observing the seconds spent in its block"""
+        if not self.registry.enabled:
+            return _NULL_SPAN
+        return self._span(labels)
+
+    @contextmanager
+    def _span(self, labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, state in self._values.items():
+                labels = dict(zip(self.labelnames, key))
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), state["counts"]):
+                    cumulative += count
+                    samples.append(("_bucket", dict(labels, le=_format_value(bound)), cumulative))
+                samples.append(("_sum", labels, state["sum"]))
+                samples.append(("_count", labels, state["count"]))
+        return samples
+
+class MetricsRegistry:
+    """
+    Counters, gauges and histograms rendered in the Prometheus text format
+
+    When disabled every update returns straight away, so instrumented hot
+    paths cost a single attribute check. Collectors are functions called
+    only when the registry is rendered, for values that are already kept
+    elsewhere (cache counters, queue depth).
+
+    Processes that can't be scraped themselves (task workers, ingest range
+    processes) drain their counters and histograms and send them to a
+    process that merges them into its own registry.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector):
+        """
+        Add a function called on every render
+
+        It returns a list of (name, kind, documentation, samples) with
+        samples a list of (labels, value).
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self):
+        """The registry in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        for metric in metrics:
+            lines += _render_family(metric.name, metric.kind, metric.documentation, [
+                (metric.name + suffix, labels, value) for suffix, labels, value in metric.samples()
+            ])
+        for collector in collectors:
+            try:
+                families = collector()
+            except Exception as e:
+                print(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {str(e)}")
+                continue
+            for name, kind, documentation, samples in families:
+                lines += _render_family(name, kind, documentation, [(name, labels, value) for labels, value in samples])
+        return "\n".join(lines) + "\n"
+
+    def drain(self):
+        """
+        Take the counter and histogram values recorded since the last drain
+
+        Returns:
+            dict: Values to pass to merge in another process, or None if
+            nothing was recorded
+        """
+        drained = {}
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            if metric.kind == "gauge":
+                continue
+            with metric._lock:
+                if metric._values:
+                    drained[metric.name] = [[list(key), value] for key, value in metric._values.items()]
+                    metric._values = {}
+        return drained or None
+
+    def merge(self, drained):
+        """Add values drained from another process's registry"""
+        if not drained or not self.enabled:
+            return
+        for name, values in drained.items():
+            metric = self._metrics.get(name)
+            if metric is None:
+                continue
+            with metric._lock:
+                for key, value in values:
+                    key = tuple(key)
+                    current = metric._values.get(key)
+                    if metric.kind == "counter":
+                        metric._values[key] = (current or 0) + value
+                    elif current is None:
+                        metric._values[key] = value
+                    else:
+                        current["counts"] = [a + b for a, b in zip(current["counts"], value["counts"])]
+                        current["sum"] += value["sum"]
+                        current["count"] += value["count"]
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+def _render_family(name, kind, documentation, samples):
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    for sample_name, labels, value in samples:
+        if labels:
+            rendered = ",".join(f'{label}="{_escape(value)}"' for label, value in labels.items())
+            lines.append(f"{sample_name}{{{rendered}}} {_format_value(value)}")
+        else:
+            lines.append(f"{sample_name} {_format_value(value)}")
+    return lines
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+def start_metrics_server(port, host="0.0.0.0", registry=None):
+    """
+    Serve a registry on /metrics from a daemon thread, for processes that
+    don't run the Flask app
+
+    Returns:
+        ThreadingHTTPServer: The running server
+    """
+    registry = registry or REGISTRY
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+REGISTRY = MetricsRegistry(enabled=Config.METRICS_ENABLED)
+
+# API
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "Time to handle an API request",
+    ("endpoint", "method", "status")
+)
+MOVIES_STAGE_SECONDS = REGISTRY.histogram(
+    "movies_query_stage_seconds", "Time spent in each stage of a movies query: cache lookup, Mongo find, count",
+    ("stage",)
+)
+RESPONSE_ENCODE_SECONDS = REGISTRY.histogram(
+    "response_encode_seconds", "Time to encode a response body",
+    ("format",)
+)
+
+# Ingest
+INGEST_STAGE_SECONDS = REGISTRY.histogram(
+    "ingest_batch_stage_seconds", "Time spent on one batch in each ingest stage: parse, clean, insert, counts",
+    ("stage",)
+)
+INGEST_ROWS = REGISTRY.counter(
+    "ingest_rows_total", "Rows ingested, by outcome",
+    ("outcome",)
+)
+
+# Worker
+TASK_QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "task_queue_wait_seconds", "Time from enqueueing a task to a worker starting it",
+    ("task",), buckets=TASK_BUCKETS
+)
+TASK_DURATION_SECONDS = REGISTRY.histogram(
+    "task_duration_seconds", "Time to run one attempt of a task",
+    ("task", "outcome"), buckets=TASK_BUCKETS
+)
+TASK_OUTCOMES = REGISTRY.counter(
+    "tasks_total", "Task attempts, by outcome: completed, retrying, dead or lost",
+    ("task", "outcome")
+)
+WORKER_RESTARTS = REGISTRY.counter(
+    "worker_restarts_total", "Worker processes replaced after exiting"
+)
@@ -29,3 +29,29 @@ def get_pull_socket():
     # Use 127.0.0.1 instead of localhost
     socket.bind(f"tcp://127.0.0.1:{os.environ.get('ZMQ_PORT', '5557')}")
     return socket, context
+
+def get_broker_sockets():
+    """
+    Get the worker pool broker's sockets
+    
+    The frontend is the PULL socket the API pushes tasks to; the backend is
+    a ROUTER that worker processes connect DEALER sockets to. Sending to a
+    worker that has gone away raises instead of silently dropping the task.
+    """
+    context = zmq.Context()
+    frontend = context.socket(zmq.PULL)
+    frontend.bind(f"tcp://127.0.0.1:{os.environ.get('ZMQ_PORT', '5557')}")
+    backend = context.socket(zmq.ROUTER)
+    backend.setsockopt(zmq.ROUTER_MANDATORY, 1)
+    backend.bind(f"tcp://127.0.0.1:{os.environ.get('ZMQ_BACKEND_PORT', '5558')}")
+    return frontend, backend, context
+
+def get_worker_socket(identity):
+    """
+    Get a DEALER socket connecting a worker process to the broker
+    """
+    context = zmq.Context()
+    socket = context.socket(zmq.DEALER)
+    socket.setsockopt(zmq.IDENTITY, identity.encode())
+    socket.connect(f"tcp://127.0.0.1:{os.environ.get('ZMQ_BACKEND_PORT', '5558')}")
+    return socket, context
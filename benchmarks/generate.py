@@ -0,0 +1,103 @@
+import argparse
+import csv
+import random
+from app.services.csv_service import MOVIE_COLUMN_TYPES
+
+COLUMNS = list(MOVIE_COLUMN_TYPES)
+
+LANGUAGE_CODES = ("en", "en", "en", "fr", "de", "es", "ja", "ko", "hi", "it")
+LANGUAGE_NAMES = ("English", "French", "German", "Spanish", "Japanese", "Korean", "Hindi", "Italian")
+STATUSES = ("Released", "Released", "Released", "Post Production", "Rumored")
+WORDS = (
+    "a", "the", "of", "young", "family", "secret", "war", "love", "city", "journey",
+    "detective", "finds", "must", "against", "old", "world", "friends", "life", "new", "dark"
+)
+# Values clean_movie_record falls back on or rejects: invalid days, bare
+# years, unpadded or trailing-space dates, other formats and junk
+MALFORMED_DATES = ("2010-02-30", "2001", "2010-1-5", "1985-07-03 ", "12/31/1999", "2012-06", "abcd", "0000-01-01")
+
+def generate_movies_csv(path, rows, seed=42, null_rate=0.05, malformed_date_rate=0.05, long_overview_rate=0.01, long_overview_chars=5000):
+    """
+    Write a synthetic movie CSV with the columns of the real dataset
+
+    The same arguments always produce the same file.
+
+    Args:
+        path: File to write
+        rows: Number of data rows
+        seed: Random seed
+        null_rate: Chance of each optional field being empty; an empty
+            title makes the row invalid, as in real uploads
+        malformed_date_rate: Chance of a release_date from MALFORMED_DATES
+        long_overview_rate: Chance of an overview of long_overview_chars
+            characters, with commas, quotes and newlines inside the field
+        long_overview_chars: Length of long overviews
+
+    Returns:
+        str: path
+    """
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(COLUMNS)
+        for index in range(rows):
+            row = _movie_row(rng, index, malformed_date_rate, long_overview_rate, long_overview_chars)
+            writer.writerow("" if rng.random() < null_rate else row[column] for column in COLUMNS)
+    return path
+
+def _movie_row(rng, index, malformed_date_rate, long_overview_rate, long_overview_chars):
+    if rng.random() < malformed_date_rate:
+        release_date = rng.choice(MALFORMED_DATES)
+    else:
+        release_date = f"{rng.randint(1920, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+    return {
+        "homepage": f"https://example.com/movies/{index}",
+        "original_language": rng.choice(LANGUAGE_CODES),
+        "original_title": f"Original Title {index}",
+        "overview": _overview(rng, long_overview_chars if rng.random() < long_overview_rate else 0),
+        "release_date": release_date,
+        "revenue": f"{rng.uniform(0, 1e9):.2f}",
+        "runtime": str(rng.randint(60, 200)),
+        "status": rng.choice(STATUSES),
+        "title": f"Movie {index}",
+        "vote_average": f"{rng.uniform(0, 10):.1f}",
+        "vote_count": str(rng.randint(0, 20000)),
+        "production_company_id": str(rng.randint(1, 5000)),
+        "genre_id": str(rng.randint(1, 20)),
+        "languages": ",".join(rng.sample(LANGUAGE_NAMES, rng.randint(1, 3)))
+    }
+
+def _overview(rng, long_chars):
+    if not long_chars:
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 30))).capitalize() + "."
+    parts = []
+    length = 0
+    while length < long_chars:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(12)).capitalize()
+        # Quoted, comma and newline-bearing text stresses the CSV parser
+        sentence += rng.choice((".", ", \"she said\".", ".\n"))
+        parts.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(parts)[:long_chars]
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic movie CSV for benchmarks")
+    parser.add_argument("path", help="CSV file to write")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--null-rate", type=float, default=0.05)
+    parser.add_argument("--malformed-date-rate", type=float, default=0.05)
+    parser.add_argument("--long-overview-rate", type=float, default=0.01)
+    parser.add_argument("--long-overview-chars", type=int, default=5000)
+    args = parser.parse_args()
+
+    generate_movies_csv(
+        args.path, args.rows, seed=args.seed, null_rate=args.null_rate,
+        malformed_date_rate=args.malformed_date_rate,
+        long_overview_rate=args.long_overview_rate,
+        long_overview_chars=args.long_overview_chars
+    )
+    print(f"Wrote {args.rows} rows to {args.path}")
+
+if __name__ == "__main__":
+    main()
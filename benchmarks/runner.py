@@ -0,0 +1,821 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from dotenv import load_dotenv
+from app.config import Config
+from benchmarks.generate import generate_movies_csv
+
+load_dotenv()
+
+BACKENDS = ("mongo", "mongomock")
+
+# Collection the insert suite writes to, outside the movies data
+INSERT_COLLECTION = "benchmark_inserts"
+
+# Pages the query suite compares skip and cursor pagination at
+QUERY_PAGES = (1, 1000, 10000)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CSV ingestion and movie queries")
+    parser.add_argument("--backend", choices=BACKENDS, default="mongo",
+                        help="mongo uses MONGO_URI and REDIS_URL; mongomock runs in memory")
+    parser.add_argument("--database", default="imdb_content_benchmark",
+                        help="Database for the mongo backend; its movies collections are dropped")
+    parser.add_argument("--suites", default=",".join(BENCHMARKS), help=f"Comma-separated subset of {', '.join(BENCHMARKS)}")
+    parser.add_argument("--rows", type=int, default=250000,
+                        help="Rows in the generated CSV; the query suite needs enough for page 10000 at --limit")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--null-rate", type=float, default=0.05)
+    parser.add_argument("--malformed-date-rate", type=float, default=0.05)
+    parser.add_argument("--long-overview-rate", type=float, default=0.01)
+    parser.add_argument("--csv", help="Benchmark this CSV instead of generating one")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs of each parse, clean, insert and ingest benchmark")
+    parser.add_argument("--iterations", type=int, default=50, help="Calls per query benchmark")
+    parser.add_argument("--limit", type=int, default=20, help="Page size for query benchmarks")
+    parser.add_argument("--concurrency", type=int, default=200, help="Concurrent callers in each stampede burst")
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes compared with a single one")
+    parser.add_argument("--tasks", type=int, default=8, help="Ingest tasks queued at once for the workers benchmark")
+    parser.add_argument("--task-rows", type=int, default=10000, help="Rows in each task's CSV for the workers benchmark")
+    parser.add_argument("--output", help="JSON file for the results (default benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="Earlier results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Slowdown in median time counted as a regression (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    suites = [suite.strip() for suite in args.suites.split(",") if suite.strip()]
+    unknown = set(suites) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"Unknown suites: {', '.join(sorted(unknown))}")
+
+    app = _create_app(args.backend, args.database)
+    csv_path, generated = _prepare_csv(args)
+    csv_bytes = os.path.getsize(csv_path)
+    context = {"app": app, "csv_path": csv_path, "args": args}
+
+    results = {}
+    try:
+        for suite in suites:
+            print(f"Running {suite} benchmarks...")
+            results.update(BENCHMARKS[suite](context))
+    finally:
+        if generated:
+            os.remove(csv_path)
+
+    report = {"meta": _metadata(args, csv_bytes, suites), "results": results}
+    _print_results(results)
+    output = args.output or os.path.join("benchmarks", "results", datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = compare_results(baseline, report, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmarks regressed by more than {args.threshold:.0%}")
+            return 1
+    return 0
+
+def bench_parse(context):
+    """Stream the CSV into Arrow record batches"""
+    from app.services.csv_service import read_csv_batches
+
+    path = context["csv_path"]
+    rows = {}
+
+    def parse():
+        rows["count"] = sum(batch.num_rows for batch in read_csv_batches(path))
+
+    result = _measure(parse, context["args"].repeat)
+    result["rows_per_sec"] = round(rows["count"] / (result["median_ms"] / 1000), 1)
+    result["mb_per_sec"] = round(os.path.getsize(path) / 1e6 / (result["median_ms"] / 1000), 1)
+    return {"parse": result}
+
+def bench_clean(context):
+    """Clean parsed batches column by column, and row by row for comparison"""
+    from app.services.csv_service import clean_movie_batch, clean_movie_record, read_csv_batches
+
+    batches = list(read_csv_batches(context["csv_path"]))
+    rows = sum(batch.num_rows for batch in batches)
+    repeat = context["args"].repeat
+
+    def clean_columnar():
+        for batch in batches:
+            clean_movie_batch(batch)
+
+    def clean_rows():
+        for batch in batches:
+            [clean_movie_record(record) for record in batch.to_pylist()]
+
+    return {
+        "clean.columnar": _with_rate(_measure(clean_columnar, repeat), rows),
+        "clean.rows": _with_rate(_measure(clean_rows, repeat), rows)
+    }
+
+def bench_insert(context):
+    """
+    Bulk-load cleaned batches into an empty collection in each write mode
+
+    Variants cover ordered against unordered inserts, write concerns, and
+    sub-batch sizes by document count and by BSON bytes. Every variant
+    loads the whole CSV in one bulk_load call, so the sub-batch caps alone
+    decide how it is split; the rest use the INGEST_MAX_BATCH_DOCS and
+    INGEST_MAX_BATCH_BYTES defaults.
+    """
+    from pymongo import WriteConcern
+    from app.models.movie import Movie
+    from app.services.csv_service import clean_movie_batch, read_csv_batches
+
+    cleaned = [movie for batch in read_csv_batches(context["csv_path"]) for movie in clean_movie_batch(batch)]
+    rows = len(cleaned)
+    repeat = context["args"].repeat
+    defaults = {"ordered": False, "max_batch_docs": Config.INGEST_MAX_BATCH_DOCS, "max_batch_bytes": Config.INGEST_MAX_BATCH_BYTES}
+    megabyte = 1024 * 1024
+    variants = {
+        "insert.unordered": {},
+        "insert.ordered": {"ordered": True},
+        "insert.w1": {"write_concern": WriteConcern(w=1)},
+        "insert.w1_no_journal": {"write_concern": WriteConcern(w=1, j=False)},
+        "insert.w_majority": {"write_concern": WriteConcern(w="majority")},
+        "insert.batch_docs.100": {"max_batch_docs": 100},
+        "insert.batch_docs.1000": {"max_batch_docs": 1000},
+        "insert.batch_docs.10000": {"max_batch_docs": 10000},
+        # Capped by size only
+        "insert.batch_bytes.1mb": {"max_batch_docs": None, "max_batch_bytes": 1 * megabyte},
+        "insert.batch_bytes.8mb": {"max_batch_docs": None, "max_batch_bytes": 8 * megabyte},
+        "insert.batch_bytes.16mb": {"max_batch_docs": None, "max_batch_bytes": 16 * megabyte}
+    }
+    results = {}
+
+    with context["app"].app_context():
+        for name, options in variants.items():
+            options = dict(defaults, **options)
+            documents = {}
+
+            def reset():
+                Movie.get_collection(name=INSERT_COLLECTION).drop()
+                # insert_many sets _id on the documents it is given
+                documents["copy"] = [dict(movie) for movie in cleaned]
+
+            def insert():
+                Movie.bulk_load(documents["copy"], name=INSERT_COLLECTION, **options)
+
+            results[name] = _with_rate(_measure(insert, repeat, setup=reset), rows)
+        Movie.get_collection(name=INSERT_COLLECTION).drop()
+    return results
+
+def bench_ingest(context):
+    """process_csv_file end to end in each ingest mode, from an empty database"""
+    from app.services.csv_service import process_csv_file
+
+    repeat = context["args"].repeat
+    results = {}
+    with context["app"].app_context():
+        for mode in ("append", "replace", "upsert"):
+            outcome = {}
+
+            def ingest():
+                outcome["result"] = process_csv_file(context["csv_path"], mode=mode)
+
+            result = _measure(ingest, repeat, setup=_reset_movies)
+            context["movies_loaded"] = False
+            if not outcome["result"].get("success"):
+                raise RuntimeError(f"{mode} ingest failed: {outcome['result'].get('error')}")
+            result["rows_per_sec"] = round(outcome["result"]["total_rows"] / (result["median_ms"] / 1000), 1)
+            result["inserted_count"] = outcome["result"]["inserted_count"]
+            results[f"ingest.{mode}"] = result
+    return results
+
+def bench_query(context):
+    """Movie.get_movies latency by page depth, pagination style, filter and count mode"""
+    from app.database import get_db
+    from app.models.movie import Movie
+
+    args = context["args"]
+    limit = args.limit
+    results = {}
+    with context["app"].app_context():
+        _load_movies(context)
+        db = get_db()
+        total = Movie.get_collection(db).estimated_document_count()
+        last_page = max(1, (total + limit - 1) // limit)
+        if last_page < max(QUERY_PAGES):
+            raise RuntimeError(
+                f"The query suite needs page {max(QUERY_PAGES)} at --limit {limit}, but {total} movies "
+                f"only fill {last_page} pages: raise --rows or lower --limit"
+            )
+
+        def get_movies(**query):
+            return lambda: Movie.get_movies(limit=limit, db=db, **query)
+
+        for page in QUERY_PAGES:
+            results[f"query.page.{page}"] = _measure_latency(get_movies(page=page, count="none"), args.iterations)
+            # The page before's next_cursor, as a client paging through would hold
+            cursor = Movie.get_movies(page=page - 1, limit=limit, count="none", db=db)["next_cursor"] if page > 1 else None
+            results[f"query.cursor.{page}"] = _measure_latency(get_movies(cursor=cursor, count="none"), args.iterations)
+
+        year, language = _common_filter(db)
+        filters = {"none": {}, "year": {"year": year}, "language": {"language": language}, "year_language": {"year": year, "language": language}}
+        for name, query in filters.items():
+            for count in ("exact", "approx"):
+                results[f"query.filter.{name}.{count}"] = _measure_latency(get_movies(count=count, **query), args.iterations)
+        results["query.sort.rating"] = _measure_latency(get_movies(sort_by="rating", order=-1, count="approx"), args.iterations)
+        results["query.fields"] = _measure_latency(get_movies(fields=["title", "year", "vote_average"], count="approx"), args.iterations)
+    return results
+
+def bench_encode(context):
+    """
+    Serialize real Movie.get_movies pages in each response encoding, and
+    with flask.jsonify for comparison
+
+    Pages are taken at a few limit and fields settings; bytes is the length
+    of the encoded body.
+    """
+    from flask import jsonify
+    from app.database import get_db
+    from app.models.movie import Movie
+    from app.utils.encoding import ARROW_MIMETYPE, JSON_MIMETYPE, MSGPACK_MIMETYPE, encode
+
+    args = context["args"]
+    encoders = {
+        "jsonify": lambda result: jsonify(result).get_data(),
+        "json": lambda result: encode(result, JSON_MIMETYPE),
+        "msgpack": lambda result: encode(result, MSGPACK_MIMETYPE),
+        "arrow": lambda result: encode(result, ARROW_MIMETYPE)
+    }
+    # As the controller normalises ?fields=title,year,vote_average
+    projections = {"all": None, "fields": ("title", "vote_average", "year")}
+    results = {}
+    with context["app"].app_context():
+        _load_movies(context)
+        db = get_db()
+        for limit in (10, 50, 100):
+            for projection, fields in projections.items():
+                page = Movie.get_movies(page=1, limit=limit, count="approx", fields=fields, db=db)
+                for name, encoder in encoders.items():
+                    result = _measure_latency(lambda: encoder(page), args.iterations)
+                    result["bytes"] = len(encoder(page))
+                    results[f"encode.{limit}.{projection}.{name}"] = result
+    return results
+
+def bench_cache(context):
+    """
+    get_or_compute_movies on cached pages with the in-process tier off and on
+
+    Every timed call is a hit. redis_lookups_per_call is how many of them
+    reached Redis; redis_round_trips_saved_per_call is what the local tier
+    takes off that.
+    """
+    from flask import current_app
+    from app.database import get_db
+    from app.models.movie import Movie
+    from app.services.cache_service import get_or_compute_movies, local_cache
+
+    args = context["args"]
+    results = {}
+    with context["app"].app_context():
+        _load_movies(context)
+        db = get_db()
+        config = current_app.config
+        saved = {key: config[key] for key in ("CACHE_LOCAL_ENABLED", "CACHE_REDIS_ENABLED")}
+        if args.backend == "mongomock":
+            # The shared tier is flask-caching's SimpleCache, standing in for Redis
+            config["CACHE_REDIS_ENABLED"] = True
+        pages = list(range(1, 11))
+
+        def get_page(page):
+            query = lambda: Movie.get_movies(page=page, limit=args.limit, count="approx", db=db)
+            return get_or_compute_movies(query, page, args.limit, None, None, "release_date", 1, count="approx")
+
+        try:
+            for name, local in (("cache.local_off", False), ("cache.local_on", True)):
+                config["CACHE_LOCAL_ENABLED"] = local
+                _new_cache_generation()
+                for page in pages:
+                    get_page(page)
+                cycle = itertools.cycle(pages)
+                lookups = _redis_lookups()
+                result = _measure_latency(lambda: get_page(next(cycle)), args.iterations)
+                # Warmup calls are hits too
+                result["redis_lookups_per_call"] = round((_redis_lookups() - lookups) / (result["iterations"] + 3), 3)
+                results[name] = result
+        finally:
+            config.update(saved)
+            local_cache.clear()
+    results["cache.local_on"]["redis_round_trips_saved_per_call"] = round(
+        results["cache.local_off"]["redis_lookups_per_call"] - results["cache.local_on"]["redis_lookups_per_call"], 3
+    )
+    return results
+
+def bench_stampede(context):
+    """
+    Bursts of concurrent requests for one movies page: uncached through
+    get_or_compute_movies, past MOVIES_CACHE_TTL but still within
+    MOVIES_CACHE_STALE_TTL, and straight to Movie.get_movies
+
+    queries_per_burst is how many times MongoDB was queried per burst,
+    counting the background refresh a stale burst starts. With single-flight
+    a miss should stay at 1, and a stale key at 1 while every caller is
+    served the stale page.
+    """
+    from flask import current_app
+    from app.database import get_db
+    from app.models.movie import Movie
+    from app.services.cache_service import cache_movies_response, get_or_compute_movies, local_cache
+
+    args = context["args"]
+    app = context["app"]
+    results = {}
+    with app.app_context():
+        _load_movies(context)
+        db = get_db()
+        config = current_app.config
+        saved = {key: config[key] for key in ("CACHE_REDIS_ENABLED", "MOVIES_CACHE_TTL")}
+        if args.backend == "mongomock":
+            # Stale entries need a shared tier; SimpleCache stands in for Redis
+            config["CACHE_REDIS_ENABLED"] = True
+        state = {"page": 0, "queries": 0}
+        lock = threading.Lock()
+
+        def query():
+            with lock:
+                state["queries"] += 1
+            return Movie.get_movies(page=state["page"], limit=args.limit, count="approx", db=db)
+
+        def cached():
+            return get_or_compute_movies(query, state["page"], args.limit, None, None, "release_date", 1, count="approx")
+
+        def next_page():
+            # A page no earlier burst has cached
+            _wait_for_refreshes()
+            _new_cache_generation()
+            state["page"] += 1
+
+        def next_stale_page():
+            next_page()
+            # Cached already past its fresh window, without counting a query
+            config["MOVIES_CACHE_TTL"] = 0
+            response = Movie.get_movies(page=state["page"], limit=args.limit, count="approx", db=db)
+            cache_movies_response(response, state["page"], args.limit, None, None, "release_date", 1, count="approx")
+            config["MOVIES_CACHE_TTL"] = saved["MOVIES_CACHE_TTL"]
+
+        bursts = {
+            "cache.stampede.single_flight": (cached, next_page),
+            "cache.stampede.stale": (cached, next_stale_page),
+            "cache.stampede.uncoalesced": (query, next_page)
+        }
+        try:
+            for name, (call, setup) in bursts.items():
+                state["queries"] = 0
+                result = _measure(lambda: _run_concurrently(app, call, args.concurrency), max(args.repeat, 5), setup=setup)
+                _wait_for_refreshes()
+                result["concurrency"] = args.concurrency
+                result["queries_per_burst"] = round(state["queries"] / result["runs"], 2)
+                results[name] = result
+        finally:
+            config.update(saved)
+            local_cache.clear()
+    return results
+
+def bench_workers(context):
+    """
+    Queue wait of a burst of ingest tasks with one worker process and with
+    --workers processes
+
+    Each pool is a worker.Supervisor in its own process, as python worker.py
+    runs it, and is warmed up before the burst is queued. queue_wait is read
+    from the tasks' Process documents; makespan_ms runs from queueing the
+    first task to the last one completing.
+    """
+    from app.models.process import Process
+    from app.tasks import enqueue_task
+
+    args = context["args"]
+    if args.backend != "mongo":
+        print("Skipping workers: worker processes need the mongo backend")
+        return {}
+    results = {}
+    with context["app"].app_context(), tempfile.TemporaryDirectory(prefix="benchmark-tasks-") as directory:
+        task_csv = generate_movies_csv(os.path.join(directory, "task.csv"), args.task_rows, seed=args.seed)
+        probe_csv = generate_movies_csv(os.path.join(directory, "probe.csv"), 10, seed=args.seed)
+        for processes in sorted({1, args.workers}):
+            _reset_movies()
+            _reset_task_queue()
+            pool = _start_worker_pool(processes)
+            try:
+                _warm_worker_pool(pool, probe_csv, processes, directory)
+                paths = [_task_copy(task_csv, directory) for _ in range(args.tasks)]
+                started = time.time()
+                task_ids = [enqueue_task("process_csv_task", file_path=path, mode="append") for path in paths]
+                _wait_for_tasks(pool, task_ids)
+                documents = [Process.get_process_by_task_id(task_id) for task_id in task_ids]
+            finally:
+                _stop_worker_pool(pool)
+            context["movies_loaded"] = False
+
+            failed = [doc["task_id"] for doc in documents if doc["status"] != "completed"]
+            if failed:
+                raise RuntimeError(f"{len(failed)} benchmark tasks failed, e.g. {failed[0]}")
+            waits = sorted(doc["queue_wait_seconds"] * 1000 for doc in documents)
+            makespan = (max(doc["updated_at"].timestamp() for doc in documents) - started) * 1000
+            results[f"workers.queue_wait.{processes}"] = {
+                "tasks": len(waits),
+                "processes": processes,
+                "median_ms": round(statistics.median(waits), 3),
+                "p95_ms": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3),
+                "max_ms": round(waits[-1], 3),
+                "makespan_ms": round(makespan, 3),
+                "rows_per_sec": round(args.task_rows * len(waits) / (makespan / 1000), 1) if makespan > 0 else 0.0
+            }
+    return results
+
+def bench_durability(context):
+    """
+    One ingest task end to end through enqueue_task, the TaskQueue and a
+    one-process worker pool, against the same process_csv_task call made
+    directly
+
+    task.queued runs from enqueue_task to the Process document reading
+    completed, so it includes the lease, the ack and the Process updates.
+    overhead_pct is its median over task.direct's.
+    """
+    from app.models.process import Process
+    from app.tasks import enqueue_task, process_csv_task
+
+    args = context["args"]
+    if args.backend != "mongo":
+        print("Skipping durability: worker processes need the mongo backend")
+        return {}
+    results = {}
+    with context["app"].app_context(), tempfile.TemporaryDirectory(prefix="benchmark-tasks-") as directory:
+        paths = {}
+
+        def setup():
+            _reset_movies()
+            paths["task"] = _task_copy(context["csv_path"], directory)
+
+        def direct():
+            task_id = f"benchmark-{time.time_ns()}"
+            Process.create_process(task_id, status="pending")
+            outcome = process_csv_task(paths["task"], task_id)
+            if not outcome.get("success"):
+                raise RuntimeError(f"Direct task failed: {outcome.get('error')}")
+
+        _reset_task_queue()
+        results["task.direct"] = _measure(direct, args.repeat, setup=setup)
+
+        pool = _start_worker_pool(1)
+        try:
+            _warm_worker_pool(pool, generate_movies_csv(os.path.join(directory, "probe.csv"), 10, seed=args.seed), 1, directory)
+
+            def queued():
+                task_id = enqueue_task("process_csv_task", file_path=paths["task"], mode="append")
+                _wait_for_tasks(pool, [task_id])
+                if Process.get_process_by_task_id(task_id)["status"] != "completed":
+                    raise RuntimeError(f"Queued task {task_id} failed")
+
+            results["task.queued"] = _measure(queued, args.repeat, setup=setup)
+        finally:
+            _stop_worker_pool(pool)
+        context["movies_loaded"] = False
+
+    direct_ms = results["task.direct"]["median_ms"]
+    results["task.queued"]["overhead_pct"] = round(100 * (results["task.queued"]["median_ms"] - direct_ms) / direct_ms, 2) if direct_ms else None
+    return results
+
+BENCHMARKS = {
+    "parse": bench_parse,
+    "clean": bench_clean,
+    "insert": bench_insert,
+    "ingest": bench_ingest,
+    "query": bench_query,
+    "encode": bench_encode,
+    "cache": bench_cache,
+    "stampede": bench_stampede,
+    "workers": bench_workers,
+    "durability": bench_durability
+}
+
+def compare_results(baseline, current, threshold=0.10):
+    """
+    Print the change in median time of every benchmark in both runs
+
+    Returns:
+        list: Names of benchmarks slower than the baseline by more than threshold
+    """
+    regressions = []
+    print(f"{'benchmark':<40} {'baseline ms':>12} {'current ms':>12} {'change':>8}")
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if not before:
+            continue
+        change = (result["median_ms"] - before["median_ms"]) / before["median_ms"] if before["median_ms"] else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<40} {before['median_ms']:>12.3f} {result['median_ms']:>12.3f} {change:>+8.1%}{flag}")
+    return regressions
+
+def _measure(function, repeat, setup=None):
+    """Time whole runs of function; setup runs before each one, untimed"""
+    runs = []
+    for _ in range(max(1, repeat)):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        function()
+        runs.append((time.perf_counter() - started) * 1000)
+    return {
+        "runs": len(runs),
+        "median_ms": round(statistics.median(runs), 3),
+        "min_ms": round(min(runs), 3),
+        "max_ms": round(max(runs), 3)
+    }
+
+def _measure_latency(function, iterations, warmup=3):
+    """Time individual calls of function after a few warmup calls"""
+    for _ in range(warmup):
+        function()
+    samples = []
+    for _ in range(max(1, iterations)):
+        started = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "iterations": len(samples),
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))], 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "max_ms": round(samples[-1], 3)
+    }
+
+def _with_rate(result, rows):
+    result["rows_per_sec"] = round(rows / (result["median_ms"] / 1000), 1) if result["median_ms"] else 0.0
+    return result
+
+def _run_concurrently(app, function, threads):
+    """Call function from threads threads at once, each in an app context"""
+    barrier = threading.Barrier(threads)
+    errors = []
+
+    def run():
+        with app.app_context():
+            barrier.wait()
+            try:
+                function()
+            except Exception as e:
+                errors.append(e)
+
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    if errors:
+        raise errors[0]
+
+def _start_worker_pool(processes):
+    """Run a worker.Supervisor with processes workers in its own process"""
+    import multiprocessing
+
+    pool = multiprocessing.get_context("spawn").Process(target=_run_supervisor, args=(processes,), name="benchmark-supervisor")
+    pool.start()
+    return pool
+
+def _run_supervisor(processes):
+    from worker import Supervisor
+
+    Supervisor(processes=processes).run()
+
+def _stop_worker_pool(pool):
+    """SIGTERM, so the supervisor drains its workers as it would in production"""
+    pool.terminate()
+    pool.join(Config.WORKER_DRAIN_TIMEOUT + 30)
+    if pool.is_alive():
+        pool.kill()
+        pool.join()
+
+def _warm_worker_pool(pool, probe_csv, processes, directory):
+    """Run a tiny task per worker so every worker has started before timing"""
+    from app.tasks import enqueue_task
+
+    _wait_for_tasks(pool, [
+        enqueue_task("process_csv_task", file_path=_task_copy(probe_csv, directory), mode="append")
+        for _ in range(processes)
+    ])
+    # Workers that didn't take a probe finish starting meanwhile
+    time.sleep(2)
+
+def _wait_for_tasks(pool, task_ids, timeout=3600, interval=0.01):
+    """Poll Process documents until every task has completed or failed"""
+    from app.models.process import Process
+
+    pending = set(task_ids)
+    deadline = time.monotonic() + timeout
+    while pending:
+        if not pool.is_alive():
+            raise RuntimeError("The benchmark worker pool exited; is another one bound to ZMQ_PORT and ZMQ_BACKEND_PORT?")
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"{len(pending)} benchmark tasks still running after {timeout}s")
+        finished = Process.get_collection().find(
+            {"task_id": {"$in": list(pending)}, "status": {"$in": ["completed", "failed"]}}, {"task_id": 1}
+        )
+        pending -= {doc["task_id"] for doc in finished}
+        if pending:
+            time.sleep(interval)
+
+def _task_copy(csv_path, directory):
+    """A copy of the CSV for one task, which deletes its file once it succeeds"""
+    descriptor, path = tempfile.mkstemp(suffix=".csv", dir=directory)
+    os.close(descriptor)
+    shutil.copyfile(csv_path, path)
+    return path
+
+def _reset_task_queue():
+    from app.models.process import Process
+    from app.models.task_queue import TaskQueue
+
+    TaskQueue.get_collection().drop()
+    TaskQueue.create_indexes()
+    Process.get_collection().drop()
+
+def _wait_for_refreshes():
+    """Wait for background refreshes of stale cache entries to finish"""
+    for thread in threading.enumerate():
+        if thread.name == "cache-refresh":
+            thread.join()
+
+def _redis_lookups():
+    from app.services.cache_service import get_cache_stats
+
+    stats = get_cache_stats()["redis"]
+    return stats["hits"] + stats["misses"]
+
+def _new_cache_generation():
+    """Make every movies cache key miss, in Redis as well when it is enabled"""
+    from flask import current_app
+    from app.services.cache_service import bump_dataset_generation, local_cache
+
+    if current_app.config["CACHE_REDIS_ENABLED"]:
+        bump_dataset_generation()
+    else:
+        local_cache.clear()
+
+def _common_filter(db):
+    """The most common (year, language) pair, so filtered queries return full pages"""
+    from app.models.movie import Movie
+
+    pipeline = [
+        {"$match": {"year": {"$ne": None}}},
+        {"$group": {"_id": {"year": "$year", "language": "$original_language"}, "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}},
+        {"$limit": 1}
+    ]
+    top = next(Movie.get_collection(db).aggregate(pipeline), None)
+    if not top:
+        return None, None
+    return top["_id"]["year"], top["_id"]["language"]
+
+def _load_movies(context):
+    """Load the CSV into an empty movies collection, once for the suites that read it"""
+    from app.services.csv_service import process_csv_file
+
+    if context.get("movies_loaded"):
+        return
+    _reset_movies()
+    loaded = process_csv_file(context["csv_path"], mode="append")
+    if not loaded.get("success"):
+        raise RuntimeError(f"Loading the query dataset failed: {loaded.get('error')}")
+    context["movies_loaded"] = True
+
+def _reset_movies():
+    from app.models.movie import Movie
+    from app.models.movie_count import MovieCount
+    from app.models.movie_stats import MovieStats
+
+    Movie.get_collection().drop()
+    MovieCount.get_collection().drop()
+    MovieStats.get_collection().drop()
+
+def _create_app(backend, database):
+    if backend == "mongomock":
+        _use_mongomock()
+    else:
+        Config.MONGO_DB = database
+        # Worker processes read their config from the environment
+        os.environ["MONGO_DB"] = database
+    from run import create_app
+    return create_app()
+
+def _use_mongomock():
+    """
+    Point every MongoClient at one in-memory mongomock client
+
+    Useful for comparing the Python side of a change without a mongod; the
+    MongoDB timings are not representative. Runs single-process, since
+    ingest worker processes would each get their own empty database, and
+    without Redis.
+    """
+    try:
+        import mongomock
+    except ImportError:
+        raise SystemExit("The mongomock backend needs mongomock: pip install mongomock")
+    import app.database as database
+
+    client = mongomock.MongoClient()
+    database.MongoClient = lambda *args, **kwargs: client
+
+    create_index = mongomock.collection.Collection.create_index
+
+    def create_index_without_partial_filter(self, keys, **kwargs):
+        # mongomock has no partial indexes, and would enforce the unique
+        # dedup_key index on documents without one
+        if "partialFilterExpression" in kwargs:
+            kwargs.pop("partialFilterExpression")
+            kwargs.pop("unique", None)
+        return create_index(self, keys, **kwargs)
+
+    mongomock.collection.Collection.create_index = create_index_without_partial_filter
+    Config.INGEST_PROCESSES = 1
+    Config.CACHE_TYPE = "SimpleCache"
+    Config.CACHE_REDIS_ENABLED = False
+    Config.CACHE_LOCAL_ENABLED = False
+
+def _prepare_csv(args):
+    if args.csv:
+        return args.csv, False
+    descriptor, path = tempfile.mkstemp(suffix=".csv", prefix="benchmark-movies-")
+    os.close(descriptor)
+    print(f"Generating {args.rows} rows...")
+    generate_movies_csv(
+        path, args.rows, seed=args.seed, null_rate=args.null_rate,
+        malformed_date_rate=args.malformed_date_rate, long_overview_rate=args.long_overview_rate
+    )
+    return path, True
+
+def _metadata(args, csv_bytes, suites):
+    import pyarrow
+    import pymongo
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "backend": args.backend,
+        "suites": suites,
+        "csv": {
+            "path": args.csv,
+            "bytes": csv_bytes,
+            "rows": None if args.csv else args.rows,
+            "seed": args.seed,
+            "null_rate": args.null_rate,
+            "malformed_date_rate": args.malformed_date_rate,
+            "long_overview_rate": args.long_overview_rate
+        },
+        "repeat": args.repeat,
+        "iterations": args.iterations,
+        "limit": args.limit,
+        "concurrency": args.concurrency,
+        "workers": args.workers,
+        "tasks": args.tasks,
+        "task_rows": args.task_rows,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "pyarrow": pyarrow.__version__,
+        "pymongo": pymongo.__version__,
+        "config": {
+            key: getattr(Config, key)
+            for key in (
+                "INGEST_BATCH_SIZE", "CSV_BLOCK_SIZE", "INGEST_WRITERS", "INGEST_PROCESSES", "INGEST_MAX_INFLIGHT_BATCHES", "INGEST_ORDERED_INSERTS",
+                "INGEST_WRITE_CONCERN_W", "INGEST_WRITE_CONCERN_J", "INGEST_MAX_BATCH_DOCS", "INGEST_MAX_BATCH_BYTES"
+            )
+        }
+    }
+
+def _print_results(results):
+    print(f"{'benchmark':<40} {'median ms':>12} {'rows/sec':>12}")
+    for name, result in results.items():
+        rate = result.get("rows_per_sec")
+        print(f"{name:<40} {result['median_ms']:>12.3f} {rate if rate is not None else '':>12}")
+
+if __name__ == "__main__":
+    sys.exit(main())
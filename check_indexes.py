@@ -0,0 +1,30 @@
+import sys
+from dotenv import load_dotenv
+from run import create_app
+
+load_dotenv()
+
+def main():
+    """
+    Create the movie indexes and fail if any get_movies query shape still
+    needs a blocking in-memory SORT
+    """
+    app = create_app()
+    with app.app_context():
+        from app.models.movie import Movie
+        
+        print("Creating indexes...")
+        Movie.create_indexes()
+        
+        blocking = Movie.find_blocking_sorts()
+        for shape in blocking:
+            print(f"Blocking SORT: {shape}")
+        
+        if blocking:
+            print(f"{len(blocking)} query shapes sort in memory")
+            return 1
+        print(f"All {len(Movie.query_shapes())} query shapes are served by an index")
+        return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -27,13 +27,25 @@ def create_app():
     cache.init_app(app)
     app.cache = cache 
     
+    if app.config['CACHE_LOCAL_ENABLED']:
+        from app.services.cache_service import start_invalidation_listener
+        start_invalidation_listener(app)
+    
     from app.database import init_db
     init_db(app)
     
     from app.routes.movie_routes import movie_bp
     from app.routes.process_routes import process_bp
+    from app.routes.stats_routes import stats_bp
+    from app.routes.upload_routes import upload_bp
     app.register_blueprint(movie_bp, url_prefix='/api/v1')
     app.register_blueprint(process_bp, url_prefix='/api/v1')
+    app.register_blueprint(stats_bp, url_prefix='/api/v1')
+    app.register_blueprint(upload_bp, url_prefix='/api/v1')
+    
+    if app.config['METRICS_ENABLED']:
+        from app.routes.metrics_routes import metrics_bp
+        app.register_blueprint(metrics_bp)
     
     return app
 
@@ -0,0 +1,126 @@
+import io
+import math
+import random
+import pyarrow as pa
+import pyarrow.csv as csv
+import pytest
+from app.services.csv_service import MOVIE_COLUMN_TYPES, clean_movie_batch, clean_movie_record
+
+COLUMNS = list(MOVIE_COLUMN_TYPES)
+
+MALFORMED_DATES = [
+    "2010-02-30", "2023-02-29", "0000-01-01", "0999-01-01", "2010-1-5", "2010-13-01",
+    "2010-01-05 ", " 2010-01-05", "2010-01- 5", "12345-01-01", "1985-07-03T00", "12/31/1999",
+    "2012-06", "2001", "abcd", "２０１０-01-01", "9999-12-31", "2024-02-29", "", None
+]
+
+def clean_rows(batch):
+    """The row-by-row reference: clean_movie_record on every row, dropping rejects"""
+    return [movie for movie in (clean_movie_record(record) for record in batch.to_pylist()) if movie]
+
+def same_value(a, b):
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    return type(a) is type(b) and a == b
+
+def assert_equivalent(batch):
+    expected = clean_rows(batch)
+    actual = clean_movie_batch(batch)
+    assert len(actual) == len(expected)
+    for index, (got, want) in enumerate(zip(actual, expected)):
+        assert list(got) == list(want), f"row {index} fields"
+        for field in want:
+            assert same_value(got[field], want[field]), f"row {index} {field}: {got[field]!r} != {want[field]!r}"
+
+def read_csv_text(text):
+    return csv.read_csv(
+        io.BytesIO(text.encode("utf-8")),
+        convert_options=csv.ConvertOptions(column_types=MOVIE_COLUMN_TYPES)
+    )
+
+def movie_row(index, **values):
+    row = {
+        "homepage": f"https://example.com/{index}", "original_language": "en",
+        "original_title": f"Original {index}", "overview": "An overview", "release_date": "2010-01-05",
+        "revenue": "1000.5", "runtime": "90", "status": "Released", "title": f"Title {index}",
+        "vote_average": "6.9", "vote_count": "10", "production_company_id": "1", "genre_id": "2",
+        "languages": "English"
+    }
+    row.update(values)
+    return row
+
+def csv_text(rows):
+    lines = [",".join(COLUMNS)]
+    for row in rows:
+        lines.append(",".join('"' + str(row[column]).replace('"', '""') + '"' if row[column] != "" else "" for column in COLUMNS))
+    return "\n".join(lines) + "\n"
+
+def test_nulls_in_every_column():
+    # Each row leaves a different column empty
+    rows = [movie_row(index, **{column: ""}) for index, column in enumerate(COLUMNS)]
+    assert_equivalent(read_csv_text(csv_text(rows)))
+
+def test_all_optional_columns_null():
+    rows = [movie_row(index, **{column: "" for column in COLUMNS if column != "title"}) for index in range(3)]
+    assert_equivalent(read_csv_text(csv_text(rows)))
+
+@pytest.mark.parametrize("release_date", MALFORMED_DATES)
+def test_malformed_release_date(release_date):
+    batch = pa.table({"title": ["Title"], "release_date": pa.array([release_date], pa.string())})
+    assert_equivalent(batch)
+
+def test_malformed_release_dates_in_one_batch():
+    batch = pa.table({
+        "title": [f"Title {index}" for index in range(len(MALFORMED_DATES))],
+        "release_date": pa.array(MALFORMED_DATES, pa.string())
+    })
+    assert_equivalent(batch)
+
+@pytest.mark.parametrize("column", ["revenue", "runtime", "vote_average", "vote_count"])
+def test_nan_and_infinite_numerics(column):
+    values = [float("nan"), float("inf"), float("-inf"), None, 0.0, -1.5]
+    batch = pa.table({
+        "title": [f"Title {index}" for index in range(len(values))],
+        column: pa.array(values, MOVIE_COLUMN_TYPES[column])
+    })
+    assert_equivalent(batch)
+
+def test_nan_and_infinite_numerics_parsed_from_csv():
+    rows = [movie_row(index, revenue=value, runtime=value, vote_average=value) for index, value in enumerate(["nan", "inf", "-inf", "NaN"])]
+    assert_equivalent(read_csv_text(csv_text(rows)))
+
+@pytest.mark.parametrize("languages", [None, "", ",", "a,,b", ",English", "English,", "English,French"])
+def test_languages(languages):
+    batch = pa.table({"title": ["Title"], "languages": pa.array([languages], pa.string())})
+    assert_equivalent(batch)
+
+def test_rows_without_a_title_are_dropped():
+    batch = pa.table({"title": pa.array(["Title", None, ""], pa.string()), "homepage": ["a", "b", "c"]})
+    assert_equivalent(batch)
+
+def test_missing_columns():
+    assert_equivalent(pa.table({"homepage": ["a"]}))
+    assert_equivalent(pa.table({"title": ["Title"]}))
+
+def test_random_rows():
+    rng = random.Random(7)
+    choices = {
+        "original_language": ["en", "fr", ""],
+        "release_date": MALFORMED_DATES[:-1] + ["2010-01-05", "1999-12-31"],
+        "revenue": ["", "0", "123.45", "nan", "inf"],
+        "runtime": ["", "90", "120.5", "-inf"],
+        "title": ["", "Title", "Title, with \"quotes\""],
+        "vote_average": ["", "6.9", "nan"],
+        "vote_count": ["", "10"],
+        "languages": ["", "English", "English,French", "a,,b", ","]
+    }
+    rows = [
+        movie_row(index, **{column: rng.choice(values) for column, values in choices.items() if rng.random() < 0.5})
+        for index in range(2000)
+    ]
+    table = read_csv_text(csv_text(rows))
+    assert_equivalent(table)
+    # Slices and record batches take the same path as whole tables
+    assert_equivalent(table.slice(17, 500))
+    for batch in table.to_batches(max_chunksize=333):
+        assert_equivalent(batch)
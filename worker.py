@@ -1,61 +1,369 @@
+import json
+import multiprocessing
+import signal
+import time
+from collections import deque
+import zmq
 from dotenv import load_dotenv
-from run import create_app
+from pymongo.errors import PyMongoError
+from app.config import Config
+from app.utils.metrics import REGISTRY, TASK_DURATION_SECONDS, TASK_OUTCOMES, TASK_QUEUE_WAIT_SECONDS, WORKER_RESTARTS, start_metrics_server
 
 
 load_dotenv()
 
-flask_app = create_app()
+def execute_task(task_data, lease_id=None, attempt=None):
+    """
+    Run one attempt of a leased task, then ack, retry or dead-letter it
+    """
+    from app.tasks import TASKS
+    from app.models.process import Process
+    from app.services.progress_service import publish_status
 
-from app.database import get_db_connection
-mongo_client, mongo_db = get_db_connection()
+    task_id = task_data.get('task_id')
+    task_name = task_data.get('task')
+    kwargs = task_data.get('kwargs', {})
+    started = time.perf_counter()
 
-from app.zmq_instance import get_pull_socket
-from app.tasks import process_csv_task
-from app.models.process import Process
-def main():
+    print(f"Received task: {task_name} (ID: {task_id}, attempt {attempt})")
+    Process.mark_started(task_id, task_data.get('queued_at'), attempt)
+    publish_status(task_id, "processing", attempt=attempt)
+    # Later attempts would count their retry backoff as queue wait
+    if task_data.get('queued_at') and attempt in (None, 1):
+        TASK_QUEUE_WAIT_SECONDS.observe(max(0.0, time.time() - task_data['queued_at']), task=task_name)
+    if task_name not in TASKS:
+        print(f"Unknown task: {task_name}")
+        finish_task(task_data, lease_id, {"success": False, "error": f"Unknown task: {task_name}"})
+        return
+
+    # Execute the task
+    try:
+        print(f"Processing task {task_id}...")
+        task_function = TASKS[task_name][0]
+        result = task_function(**kwargs, task_id=task_id)
+    except Exception as e:
+        print(f"Error executing task {task_id}: {str(e)}")
+        result = {"success": False, "error": str(e)}
+    outcome = finish_task(task_data, lease_id, result)
+    TASK_DURATION_SECONDS.observe(time.perf_counter() - started, task=task_name, outcome=outcome)
+
+def finish_task(task_data, lease_id, result):
+    """
+    Record the outcome of an attempt in the TaskQueue and the Process
+
+    A failure is retried only if result is marked retryable. The task's
+    cleanup only runs once it succeeds: a dead-lettered task keeps its file
+    so it can be resumed.
+
+    Returns:
+        str: completed, retrying, dead, or lost if another worker took over
+        the lease
+    """
+    from app.models.process import Process
+    from app.models.task_queue import TaskQueue
+    from app.services.progress_service import publish_status
+
+    task_id = task_data.get('task_id')
+    if result.get('success'):
+        print(f"Task {task_id} completed successfully")
+        print(f"Result: {result}")
+        Process.update_status(task_id, "completed")
+        publish_status(task_id, "completed", result=result)
+        if TaskQueue.ack(task_id, lease_id):
+            cleanup_task(task_data)
+            outcome = "completed"
+        else:
+            print(f"Lease on task {task_id} was lost before it was acked")
+            outcome = "lost"
+        TASK_OUTCOMES.inc(task=task_data.get('task'), outcome=outcome)
+        return outcome
+
+    error = result.get('error', 'Unknown error')
+    entry = TaskQueue.fail(task_id, lease_id, error, retry=result.get('retryable', False))
+    if entry is None:
+        print(f"Lease on task {task_id} was lost before its failure was recorded")
+        outcome = "lost"
+    elif entry["status"] == "dead":
+        print(f"Task {task_id} dead-lettered after {entry['attempts']} attempts: {error}")
+        Process.mark_dead(task_id, error)
+        publish_status(task_id, "failed", error=error, dead_lettered=True)
+        outcome = "dead"
+    else:
+        print(f"Task {task_id} failed, retrying at {entry['available_at']}: {error}")
+        Process.mark_retrying(task_id, error, entry["available_at"])
+        publish_status(task_id, "retrying", error=error, retry_at=entry["available_at"])
+        outcome = "retrying"
+    TASK_OUTCOMES.inc(task=task_data.get('task'), outcome=outcome)
+    return outcome
+
+def cleanup_task(task_data):
+    """Run a task's cleanup once it has succeeded"""
+    from app.tasks import TASKS
+
+    task = TASKS.get(task_data.get('task'))
+    if task:
+        try:
+            task[1](**task_data.get('kwargs', {}), task_id=task_data.get('task_id'))
+        except Exception as e:
+            print(f"Cleanup of task {task_data.get('task_id')} failed: {str(e)}")
+
+def run_worker(identity, prefetch):
     """
-    Main worker function that listens for tasks and processes them
+    Worker process: run tasks handed out by the broker, one at a time
+
+    Asks for up to prefetch tasks, then one more after each task finishes,
+    so no worker holds more than prefetch tasks. A STOP from the broker is
+    queued behind any tasks already sent, so every prefetched task still
+    runs before the worker exits. Metrics recorded while running a task are
+    sent along with its DONE for the supervisor to serve.
     """
-    print("Starting ZeroMQ worker...")
-    socket, context = get_pull_socket()
-    
-    # Map of task names to functions
-    task_map = {
-        'process_csv_task': process_csv_task,
-    }
-    
+    # Shutdown is coordinated by the supervisor, not the terminal's Ctrl+C
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    from run import create_app
+    from app.zmq_instance import get_worker_socket
+
+    flask_app = create_app()
+    socket, context = get_worker_socket(identity)
+    socket.send_multipart([b"READY", str(prefetch).encode()])
+    print(f"Worker {identity} ready (prefetch {prefetch})")
+
     try:
         with flask_app.app_context():
             while True:
-                print("Waiting for tasks...")
-                task_data = socket.recv_json()
-                
-                task_id = task_data.get('task_id')
-                task_name = task_data.get('task')
-                kwargs = task_data.get('kwargs', {})
-                
-                print(f"Received task: {task_name} (ID: {task_id})")
-                Process.create_process(task_id, "processing")
-                # Execute the task
-                if task_name in task_map:
-                    try:
-                        print(f"Processing task {task_id}...")
-                        task_function = task_map[task_name]
-                        result = task_function(**kwargs, task_id=task_id)
-                        print(f"Task {task_id} completed successfully")
-                        print(f"Result: {result}")
-                        Process.update_status(task_id, "completed")
-                    except Exception as e:
-                        print(f"Error executing task {task_id}: {str(e)}")
-                        Process.update_status(task_id, "failed")
-                else:
-                    print(f"Unknown task: {task_name}")
-                    Process.update_status(task_id, "failed")
-    except KeyboardInterrupt:
-        print("Worker shutting down...")
+                frames = socket.recv_multipart()
+                if frames[0] == b"STOP":
+                    break
+                message = json.loads(frames[1])
+                execute_task(message["task"], message["lease_id"], message["attempt"])
+                socket.send_multipart([b"DONE", message["task"].get('task_id', '').encode(), json.dumps(REGISTRY.drain()).encode()])
     finally:
+        print(f"Worker {identity} stopped")
         socket.close()
         context.term()
 
+class Supervisor:
+    """
+    Broker and process supervisor for a pool of task workers
+
+    Tasks are leased from the TaskQueue and handed to workers over a ROUTER
+    backend using credits: each worker announces how many tasks it will
+    take, and a task is only leased once some worker has a free credit.
+    Messages on the PULL frontend just signal that something was queued.
+    The supervisor renews the leases of every task its workers hold, so if
+    the whole pool dies the leases expire and the tasks run again.
+
+    Workers that die are replaced; tasks they had prefetched but not
+    started are released back to the queue, and the task they were running
+    counts as a failed attempt. Whether a task started is read from its
+    Process document rather than from the worker, whose last messages may
+    be lost when it dies.
+
+    With METRICS_ENABLED the supervisor serves the pool's metrics, merged
+    from its workers, on METRICS_WORKER_PORT.
+    """
+
+    def __init__(self, processes=None, prefetch=None, drain_timeout=None):
+        self.processes = max(1, processes or Config.WORKER_PROCESSES)
+        self.prefetch = max(1, prefetch or Config.WORKER_PREFETCH)
+        self.drain_timeout = drain_timeout if drain_timeout is not None else Config.WORKER_DRAIN_TIMEOUT
+        self.visibility_timeout = Config.TASK_VISIBILITY_TIMEOUT
+        self.context = multiprocessing.get_context('spawn')
+        self.workers = {}
+        self.credits = deque()
+        # identity -> {task_id: task message} sent but not finished
+        self.inflight = {}
+        self.draining = False
+        self._spawned = 0
+
+    def run(self):
+        from run import create_app
+
+        self.flask_app = create_app()
+        with self.flask_app.app_context():
+            self._run()
+
+    def _run(self):
+        from app.models.task_queue import TaskQueue
+        from app.zmq_instance import get_broker_sockets
+
+        TaskQueue.create_indexes()
+        if REGISTRY.enabled:
+            REGISTRY.register_collector(self._collect_metrics)
+            start_metrics_server(Config.METRICS_WORKER_PORT)
+            print(f"Serving worker metrics on port {Config.METRICS_WORKER_PORT}")
+        frontend, backend, context = get_broker_sockets()
+        signal.signal(signal.SIGINT, self._drain)
+        signal.signal(signal.SIGTERM, self._drain)
+
+        for _ in range(self.processes):
+            self._spawn()
+        print(f"Supervising {self.processes} workers (prefetch {self.prefetch})")
+
+        poller = zmq.Poller()
+        poller.register(backend, zmq.POLLIN)
+        poller.register(frontend, zmq.POLLIN)
+        drain_deadline = None
+        next_renewal = 0
+        try:
+            while True:
+                if self.draining and drain_deadline is None:
+                    drain_deadline = time.monotonic() + self.drain_timeout
+                    self._stop_workers(backend)
+                if drain_deadline is not None and (not self.workers or time.monotonic() >= drain_deadline):
+                    break
+
+                poller.poll(1000)
+                # Take every pending worker message before _reap, so a task
+                # that finished just before its worker died isn't re-run
+                while backend.poll(0):
+                    self._handle_worker_message(backend.recv_multipart())
+                # Wake-ups only: the tasks themselves are in the TaskQueue
+                while frontend.poll(0):
+                    frontend.recv()
+
+                try:
+                    if time.monotonic() >= next_renewal:
+                        self._renew_leases()
+                        next_renewal = time.monotonic() + self.visibility_timeout / 3
+                    self._dispatch(backend)
+                    self._reap()
+                except PyMongoError as e:
+                    print(f"Task queue unavailable: {str(e)}")
+        finally:
+            for identity, process in self.workers.items():
+                print(f"Drain timeout: terminating worker {identity}")
+                process.terminate()
+                process.join()
+                self._recover(identity, "Worker terminated after drain timeout")
+            frontend.close(linger=0)
+            backend.close(linger=0)
+            context.term()
+            print("Supervisor stopped")
+
+    def _spawn(self):
+        self._spawned += 1
+        identity = f"worker-{self._spawned}"
+        process = self.context.Process(target=run_worker, args=(identity, self.prefetch), name=identity)
+        process.start()
+        self.workers[identity] = process
+        self.inflight[identity] = {}
+
+    def _handle_worker_message(self, frames):
+        identity = frames[0].decode()
+        kind, payload = frames[1], frames[2].decode() if len(frames) > 2 else None
+        if identity not in self.workers:
+            return
+        if kind == b"READY":
+            self.credits.extend([identity] * int(payload))
+        elif kind == b"DONE":
+            self.inflight[identity].pop(payload, None)
+            if len(frames) > 3:
+                REGISTRY.merge(json.loads(frames[3]))
+            if not self.draining:
+                self.credits.append(identity)
+
+    def _dispatch(self, backend):
+        """Lease a task for each free credit"""
+        from app.models.task_queue import TaskQueue
+
+        # Once draining, STOP has been sent and anything sent after it is never read
+        if self.draining:
+            return
+        while self.credits:
+            identity = self.credits[0]
+            if identity not in self.workers:
+                self.credits.popleft()
+                continue
+            entry = TaskQueue.lease(self.visibility_timeout)
+            if entry is None:
+                return
+            self.credits.popleft()
+            message = {"task": entry["task"], "lease_id": entry["lease_id"], "attempt": entry["attempts"]}
+            try:
+                backend.send_multipart([identity.encode(), b"TASK", json.dumps(message).encode()])
+            except zmq.ZMQError:
+                # The worker is gone; _reap will replace it
+                TaskQueue.release(entry["task_id"], entry["lease_id"])
+                continue
+            self.inflight[identity][entry["task_id"]] = message
+
+    def _renew_leases(self):
+        """Keep the leases on held tasks alive, and dead-letter abandoned ones"""
+        from app.models.process import Process
+        from app.models.task_queue import TaskQueue
+        from app.services.progress_service import publish_status
+
+        TaskQueue.renew([message["lease_id"] for messages in self.inflight.values() for message in messages.values()], self.visibility_timeout)
+        for entry in TaskQueue.dead_letter_expired():
+            print(f"Task {entry['task_id']} dead-lettered: its lease expired on the last attempt")
+            Process.mark_dead(entry["task_id"], "Lease expired on the last attempt")
+            publish_status(entry["task_id"], "failed", error="Lease expired on the last attempt", dead_lettered=True)
+
+    def _reap(self):
+        """Replace dead workers and recover the tasks they held"""
+        for identity, process in list(self.workers.items()):
+            if process.is_alive():
+                continue
+            del self.workers[identity]
+            self.credits = deque(credit for credit in self.credits if credit != identity)
+            self._recover(identity, f"Worker exited with code {process.exitcode}")
+            if not self.draining:
+                print(f"Worker {identity} exited with code {process.exitcode}; starting a replacement")
+                WORKER_RESTARTS.inc()
+                self._spawn()
+
+    def _recover(self, identity, error):
+        """Release a dead worker's unstarted tasks and fail the attempt it was running"""
+        from app.models.process import Process
+        from app.models.task_queue import TaskQueue
+
+        released = 0
+        for task_id, message in self.inflight.pop(identity, {}).items():
+            process = Process.get_process_by_task_id(task_id) or {}
+            if process.get("status") == "processing" and process.get("attempts") == message["attempt"]:
+                finish_task(message["task"], message["lease_id"], {"success": False, "error": error, "retryable": True})
+            else:
+                # A no-op if the task finished but its DONE was lost
+                TaskQueue.release(task_id, message["lease_id"])
+                released += 1
+        if released:
+            print(f"Released {released} prefetched tasks from {identity}")
+
+    def _collect_metrics(self):
+        """Queue depth and pool state, read when the metrics are scraped"""
+        from app.models.task_queue import TaskQueue
+
+        # Runs on the metrics server's thread
+        with self.flask_app.app_context():
+            depth = TaskQueue.count_by_status()
+        return [
+            ("task_queue_depth", "gauge", "Tasks in the task queue by status", [({"status": status}, count) for status, count in depth.items()]),
+            ("worker_processes", "gauge", "Live worker processes", [({}, len(self.workers))]),
+            ("worker_inflight_tasks", "gauge", "Tasks handed to workers and not yet finished", [({}, sum(len(tasks) for tasks in list(self.inflight.values())))]),
+            ("worker_free_credits", "gauge", "Tasks the workers are ready to take", [({}, len(self.credits))])
+        ]
+
+    def _stop_workers(self, backend):
+        print(f"Draining: waiting up to {self.drain_timeout}s for {len(self.workers)} workers to finish")
+        for identity in self.workers:
+            try:
+                backend.send_multipart([identity.encode(), b"STOP"])
+            except zmq.ZMQError:
+                pass
+
+    def _drain(self, signum, frame):
+        if self.draining:
+            return
+        print("Worker supervisor shutting down...")
+        self.draining = True
+
+def main():
+    """
+    Start the worker pool: a broker plus WORKER_PROCESSES worker processes
+    """
+    print("Starting ZeroMQ worker pool...")
+    Supervisor().run()
+
 if __name__ == "__main__":
     main()